@@ -0,0 +1,99 @@
+"""
+Code chunking benchmark
+
+Files per second of the previous regex splitter against the AST/brace
+chunkers, serially and across a process pool, on this repository's own
+Python/JavaScript/TypeScript sources (optionally repeated to get a bigger
+corpus). Also times two large generated modules, including a JavaScript
+one where the regex arrow-function lookahead rescans the rest of the file
+at every `const x = (`.
+
+Usage (from backend/):
+    python -m scripts.bench_chunking --root .. --repeat 20 --workers 4
+"""
+
+import os
+import re
+import time
+import click
+
+from src.infrastructure.rag.document_processor import DocumentProcessor
+
+EXTENSIONS = (".py", ".js", ".jsx", ".ts", ".tsx")
+
+
+def _regex_split(code, language, processor):
+    """The regex splitter DocumentProcessor used before the parser chunkers"""
+    if language == "python":
+        pattern = r'((?:^|\n)(?:def|class)\s+\w+.*?(?=\n(?:def|class)\s+|\Z))'
+    else:
+        pattern = r'((?:^|\n)(?:function|class|const\s+\w+\s*=\s*(?:async\s*)?\(.*?\)\s*=>).*?(?=\n(?:function|class|const\s+\w+\s*=)|\Z))'
+    chunks = [m.strip() for m in re.findall(pattern, code, re.DOTALL | re.MULTILINE) if m.strip()]
+    return chunks or processor._split_by_size(code)
+
+
+def _time(fn):
+    start = time.perf_counter()
+    result = fn()
+    return time.perf_counter() - start, result
+
+
+@click.command()
+@click.option("--root", default="..", help="Directory to collect sources from")
+@click.option("--repeat", default=20, help="Times each file is processed")
+@click.option("--workers", default=os.cpu_count() or 1, help="Process pool size")
+@click.option("--large-functions", default=5000, help="Definitions in the generated large module")
+@click.option("--js-constants", default=3000, help="Parenthesised constants in the generated JS module")
+def main(root, repeat, workers, large_functions, js_constants):
+    """Benchmark regex vs parser-based code chunking"""
+    processor = DocumentProcessor()
+    paths = [p for p in processor.iter_source_files(root, EXTENSIONS) if "node_modules" not in p]
+    corpus = []
+    for path in paths:
+        with open(path, encoding="utf-8", errors="replace") as f:
+            corpus.append((path, processor.LANGUAGE_BY_EXTENSION[os.path.splitext(path)[1]], f.read()))
+    files = len(corpus) * repeat
+    click.echo(f"Corpus: {len(corpus)} files x {repeat} = {files} files")
+    
+    elapsed, chunks = _time(lambda: sum(
+        len(_regex_split(code, language, processor))
+        for _ in range(repeat) for _, language, code in corpus
+    ))
+    click.echo(f"  regex            {files / elapsed:9.0f} files/s   {chunks} chunks")
+    
+    elapsed, chunks = _time(lambda: sum(
+        len(list(processor.iter_files([path])))
+        for _ in range(repeat) for path, _, _ in corpus
+    ))
+    click.echo(f"  parser (serial)  {files / elapsed:9.0f} files/s   {chunks} chunks")
+    
+    elapsed, chunks = _time(lambda: sum(
+        len(file_chunks)
+        for _, file_chunks in processor.process_files(
+            (path for _ in range(repeat) for path, _, _ in corpus), workers=workers
+        )
+    ))
+    click.echo(f"  parser ({workers} procs) {files / elapsed:9.0f} files/s   {chunks} chunks")
+    
+    body = "".join(
+        f"def handler_{i}(request):\n    data = request.json()\n    return {{'id': {i}, 'data': data}}\n\n"
+        for i in range(large_functions)
+    )
+    regex_s, regex_chunks = _time(lambda: _regex_split(body, "python", processor))
+    parser_s, parser_chunks = _time(lambda: processor.process_code(body, "python", "large.py"))
+    click.echo(f"\nLarge module ({len(body) / 1024:.0f} KB, {large_functions} functions)")
+    click.echo(f"  regex  {regex_s * 1000:9.1f} ms   {len(regex_chunks)} chunks")
+    click.echo(f"  parser {parser_s * 1000:9.1f} ms   {len(parser_chunks)} chunks")
+    
+    # Every `const x = (` makes the arrow-function lookahead scan to the end
+    js = "".join(f"const total_{i} = (base + {i}) * 2;\n" for i in range(js_constants))
+    js += "function main() {\n  return total_0;\n}\n"
+    regex_s, regex_chunks = _time(lambda: _regex_split(js, "javascript", processor))
+    parser_s, parser_chunks = _time(lambda: processor.process_code(js, "javascript", "large.js"))
+    click.echo(f"\nLarge JS module ({len(js) / 1024:.0f} KB, {js_constants} parenthesised constants)")
+    click.echo(f"  regex  {regex_s * 1000:9.1f} ms   {len(regex_chunks)} chunks")
+    click.echo(f"  parser {parser_s * 1000:9.1f} ms   {len(parser_chunks)} chunks")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+"""
+Embedding backend benchmark
+
+Compares the sentence-transformers backend with ONNX Runtime (fp32 and
+dynamic int8) on chunks of this repository's own source: load time, RSS
+growth, single-text latency, batch throughput, and recall@k of each
+candidate's nearest neighbours against the sentence-transformers results.
+
+Usage (from backend/):
+    python -m scripts.bench_embeddings --onnx-path models/all-MiniLM-L6-v2-onnx
+"""
+
+import gc
+import glob
+import resource
+import time
+import click
+import numpy as np
+
+from src.infrastructure.rag.document_processor import DocumentProcessor
+from src.infrastructure.rag.embedding_backends import OnnxBackend, SentenceTransformerBackend
+
+
+def _rss_mb():
+    with open("/proc/self/statm") as f:
+        return int(f.read().split()[1]) * resource.getpagesize() / 2**20
+
+
+def _corpus(limit):
+    processor = DocumentProcessor()
+    texts = []
+    for path in sorted(glob.glob("src/**/*.py", recursive=True)):
+        with open(path, encoding="utf-8") as f:
+            texts.extend(chunk.content for chunk in processor.process_code(f.read(), "python", path))
+        if len(texts) >= limit:
+            break
+    return texts[:limit]
+
+
+def _neighbours(vectors, queries, k):
+    scores = queries @ vectors.T
+    return [set(row.tolist()) for row in np.argsort(-scores, axis=1)[:, :k]]
+
+
+def _load(name, model_name, onnx_path):
+    if name == "sentence-transformers":
+        from sentence_transformers import SentenceTransformer
+        
+        return SentenceTransformerBackend(SentenceTransformer(model_name, device="cpu"))
+    return OnnxBackend(onnx_path, quantize=name == "onnx-int8")
+
+
+@click.command()
+@click.option("--model-name", default="all-MiniLM-L6-v2", help="sentence-transformers model")
+@click.option("--onnx-path", default="models/all-MiniLM-L6-v2-onnx", help="Exported ONNX model directory")
+@click.option("--backends", default="sentence-transformers,onnx,onnx-int8", help="Comma-separated backends")
+@click.option("--chunks", default=2000, help="Corpus chunks to embed")
+@click.option("--queries", default=100, help="Single-text latency samples / recall queries")
+@click.option("--top-k", default=10, help="Neighbours compared for recall")
+@click.option("--batch-size", default=32, help="Texts per encode call for throughput")
+def main(model_name, onnx_path, backends, chunks, queries, top_k, batch_size):
+    """Benchmark embedding backends"""
+    texts = _corpus(chunks)
+    query_texts = texts[::max(1, len(texts) // queries)][:queries]
+    click.echo(f"Corpus: {len(texts)} chunks, {len(query_texts)} queries")
+    
+    reference = None
+    for name in backends.split(","):
+        gc.collect()
+        rss_before = _rss_mb()
+        start = time.perf_counter()
+        backend = _load(name, model_name, onnx_path)
+        load_s = time.perf_counter() - start
+        
+        backend.encode(texts[:batch_size])  # warm-up
+        latencies = []
+        for text in query_texts:
+            t0 = time.perf_counter()
+            backend.encode([text])
+            latencies.append(time.perf_counter() - t0)
+        
+        start = time.perf_counter()
+        vectors = np.concatenate([
+            backend.encode(texts[i:i + batch_size])
+            for i in range(0, len(texts), batch_size)
+        ])
+        throughput = len(texts) / (time.perf_counter() - start)
+        rss_after = _rss_mb()
+        
+        vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+        query_vectors = vectors[[texts.index(q) for q in query_texts]]
+        neighbours = _neighbours(vectors, query_vectors, top_k)
+        if reference is None:
+            reference = neighbours
+        recall = np.mean([len(a & b) / top_k for a, b in zip(neighbours, reference)])
+        
+        click.echo(f"\n{name}")
+        click.echo(f"  load        {load_s:7.2f} s    RSS +{rss_after - rss_before:.0f} MB")
+        click.echo(f"  latency p50 {np.percentile(latencies, 50) * 1000:7.2f} ms   p99 {np.percentile(latencies, 99) * 1000:7.2f} ms")
+        click.echo(f"  throughput  {throughput:7.1f} texts/s (batch {batch_size})")
+        click.echo(f"  recall@{top_k}   {recall:7.3f} vs {backends.split(',')[0]}")
+        
+        del backend, vectors
+    
+    click.echo(f"\nPeak RSS {resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024:.0f} MB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+"""
+Cross-encoder re-ranking benchmark
+
+CPU latency of re-ranking retrieval candidates drawn from this repository's
+own source: p50/p99 per request with a cold score cache, with a warm cache
+(repeated queries), and how often a given latency budget falls back to the
+retrieval order.
+
+Usage (from backend/):
+    python -m scripts.bench_reranker --candidates 20 --budget-ms 150 --threads 4
+"""
+
+import glob
+import math
+import random
+import time
+import click
+import numpy as np
+
+from src.infrastructure.rag.document_processor import DocumentProcessor
+from src.infrastructure.rag.reranker import CrossEncoderReranker
+
+
+def _corpus():
+    processor = DocumentProcessor()
+    chunks = []
+    for path in sorted(glob.glob("src/**/*.py", recursive=True)):
+        with open(path, encoding="utf-8") as f:
+            chunks.extend(chunk.content for chunk in processor.process_code(f.read(), "python", path))
+    return chunks
+
+
+def _requests(chunks, count, candidates, seed):
+    """(query, candidate results) pairs; queries are a chunk's first line"""
+    rng = random.Random(seed)
+    requests = []
+    for _ in range(count):
+        picked = rng.sample(range(len(chunks)), min(candidates, len(chunks)))
+        query = chunks[picked[0]].splitlines()[0].strip(" :(")
+        results = [{"id": str(i), "content": chunks[i], "metadata": {}, "score": 0.0} for i in picked]
+        requests.append((query, results))
+    return requests
+
+
+def _run(reranker, requests, budget_ms):
+    latencies, fallbacks = [], 0
+    for query, results in requests:
+        start = time.perf_counter()
+        reranked = reranker.rerank(query, [dict(r) for r in results], budget_ms=budget_ms)
+        latencies.append(time.perf_counter() - start)
+        fallbacks += "rerank_score" not in reranked[0]
+    return np.array(latencies) * 1000, fallbacks
+
+
+def _report(label, latencies, fallbacks=None):
+    line = f"  {label:<18} p50 {np.percentile(latencies, 50):8.2f} ms   p99 {np.percentile(latencies, 99):8.2f} ms"
+    if fallbacks is not None:
+        line += f"   fallback {fallbacks / len(latencies):6.1%}"
+    click.echo(line)
+
+
+@click.command()
+@click.option("--model-name", default=CrossEncoderReranker.DEFAULT_MODEL, help="Cross-encoder checkpoint")
+@click.option("--candidates", default=20, help="Chunks re-ranked per request")
+@click.option("--requests", "count", default=100, help="Requests per run")
+@click.option("--budget-ms", default=150.0, help="Latency budget for the fallback run")
+@click.option("--max-length", default=512, help="Tokens per (query, chunk) pair")
+@click.option("--threads", default=0, help="torch intra-op threads (0 = default)")
+def main(model_name, candidates, count, budget_ms, max_length, threads):
+    """Benchmark cross-encoder re-ranking latency"""
+    if threads:
+        import torch
+        
+        torch.set_num_threads(threads)
+    
+    start = time.perf_counter()
+    reranker = CrossEncoderReranker(model_name=model_name, max_length=max_length, cache_size=0)
+    click.echo(f"Model {model_name} loaded in {time.perf_counter() - start:.2f} s")
+    
+    chunks = _corpus()
+    requests = _requests(chunks, count, candidates, seed=0)
+    click.echo(f"Corpus: {len(chunks)} chunks, {count} requests x {candidates} candidates\n")
+    
+    _run(reranker, requests[:5], math.inf)  # warm-up
+    latencies, _ = _run(reranker, requests, math.inf)
+    _report("cold (no budget)", latencies)
+    
+    reranker = CrossEncoderReranker(model=reranker.model)
+    _run(reranker, requests, math.inf)
+    latencies, _ = _run(reranker, requests, math.inf)
+    _report("warm cache", latencies)
+    
+    reranker = CrossEncoderReranker(model=reranker.model)
+    latencies, fallbacks = _run(reranker, _requests(chunks, count, candidates, seed=1), budget_ms)
+    _report(f"budget {budget_ms:.0f} ms", latencies, fallbacks)
+
+
+if __name__ == "__main__":
+    main()
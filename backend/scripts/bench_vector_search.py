@@ -0,0 +1,92 @@
+"""
+Vector search benchmark
+
+Measures top-k latency and recall of the in-process IVF index against an
+exact brute-force scan on synthetic clustered embeddings, plus batched
+(search_batch) throughput against a per-query loop.
+
+Usage (from backend/):
+    python -m scripts.bench_vector_search --chunks 1000000 --queries 200
+"""
+
+import time
+import click
+import numpy as np
+
+from src.infrastructure.rag.ann_index import IVFIndex
+
+
+def _clustered_vectors(rng, centers, count, noise):
+    labels = rng.integers(0, len(centers), size=count)
+    vectors = centers[labels] + noise * rng.standard_normal((count, centers.shape[1]), dtype=np.float32)
+    return vectors.astype(np.float32)
+
+
+def _percentile_ms(samples, pct):
+    return float(np.percentile(samples, pct) * 1000)
+
+
+@click.command()
+@click.option("--chunks", default=1_000_000, help="Number of indexed chunks")
+@click.option("--dimension", default=384, help="Embedding dimension")
+@click.option("--queries", default=200, help="Number of timed queries")
+@click.option("--top-k", default=5, help="Results per query")
+@click.option("--nprobe", default=8, help="IVF lists scanned per query")
+@click.option("--clusters", default=2000, help="Synthetic topic clusters")
+@click.option("--batch-size", default=64, help="Queries per search_batch call")
+def main(chunks, dimension, queries, top_k, nprobe, clusters, batch_size):
+    """Benchmark IVF top-k search"""
+    rng = np.random.default_rng(0)
+    centers = rng.standard_normal((clusters, dimension), dtype=np.float32)
+    
+    index = IVFIndex(dimension=dimension, nprobe=nprobe)
+    start = time.perf_counter()
+    for offset in range(0, chunks, 100_000):
+        count = min(100_000, chunks - offset)
+        vectors = _clustered_vectors(rng, centers, count, noise=0.3)
+        index.add_batch([f"chunk_{i}" for i in range(offset, offset + count)], vectors)
+    click.echo(f"Loaded {chunks} x {dimension} vectors in {time.perf_counter() - start:.1f}s")
+    
+    start = time.perf_counter()
+    index.train()
+    click.echo(f"Trained IVF ({len(index._lists)} lists) in {time.perf_counter() - start:.1f}s")
+    
+    query_vectors = _clustered_vectors(rng, centers, queries, noise=0.3)
+    
+    # Warm list caches so timings reflect steady state
+    for q in query_vectors[:10]:
+        index.search(q, top_k=top_k)
+    
+    ann_times, ann_results = [], []
+    for q in query_vectors:
+        t0 = time.perf_counter()
+        rows, _ = index.search(q, top_k=top_k)
+        ann_times.append(time.perf_counter() - t0)
+        ann_results.append(set(rows.tolist()))
+    
+    exact_times, hits = [], 0
+    matrix = index._vectors[:index.size]
+    for q, found in zip(query_vectors, ann_results):
+        t0 = time.perf_counter()
+        scores = matrix @ (q / np.linalg.norm(q))
+        exact = np.argpartition(-scores, top_k - 1)[:top_k]
+        exact_times.append(time.perf_counter() - t0)
+        hits += len(found & set(exact.tolist()))
+    
+    click.echo(f"\nTop-{top_k} over {chunks} chunks ({queries} queries)")
+    click.echo(f"  IVF   p50 {_percentile_ms(ann_times, 50):7.2f} ms   p99 {_percentile_ms(ann_times, 99):7.2f} ms")
+    click.echo(f"  Exact p50 {_percentile_ms(exact_times, 50):7.2f} ms   p99 {_percentile_ms(exact_times, 99):7.2f} ms")
+    click.echo(f"  Recall@{top_k}: {hits / (queries * top_k):.3f}")
+    
+    t0 = time.perf_counter()
+    for start in range(0, queries, batch_size):
+        index.search_batch(query_vectors[start:start + batch_size], top_k=top_k)
+    batch_elapsed = time.perf_counter() - t0
+    
+    click.echo(f"\nThroughput ({queries} queries)")
+    click.echo(f"  search loop   {queries / sum(ann_times):9.0f} queries/s")
+    click.echo(f"  search_batch  {queries / batch_elapsed:9.0f} queries/s (batch {batch_size})")
+
+
+if __name__ == "__main__":
+    main()
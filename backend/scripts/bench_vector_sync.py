@@ -0,0 +1,101 @@
+"""
+Vector store sync benchmark
+
+Measures, against the Redis at REDIS_URL, how a replica's local index
+follows writes made by another process: a full reload from Redis (first
+load), catching up from the changelog after each indexing batch, and
+search latency while a background reload runs. The store is cleared at
+the end, so point REDIS_URL at a scratch instance.
+
+Usage (from backend/):
+    REDIS_URL=redis://localhost:6379/15 python -m scripts.bench_vector_sync --chunks 100000
+"""
+
+import threading
+import time
+import click
+import numpy as np
+
+from src.infrastructure.rag.vector_store import VectorStore
+
+
+def _documents(rng, offset, count, dimension):
+    vectors = rng.standard_normal((count, dimension), dtype=np.float32)
+    return [
+        (f"chunk_{i}", f"def handler_{i}(request): return process_{i % 997}(request)", vector, {"language": "python"})
+        for i, vector in zip(range(offset, offset + count), vectors)
+    ]
+
+
+def _percentile_ms(samples, pct):
+    return float(np.percentile(samples, pct) * 1000)
+
+
+def _wait_for_reload():
+    for thread in threading.enumerate():
+        if thread.name == "vector-reload":
+            thread.join()
+
+
+@click.command()
+@click.option("--chunks", default=100_000, help="Chunks in the store before measuring")
+@click.option("--dimension", default=384, help="Embedding dimension")
+@click.option("--batch-size", default=256, help="Chunks per write (RetrievalService.INDEX_BATCH_SIZE)")
+@click.option("--batches", default=20, help="Writes followed by a replica search")
+def main(chunks, dimension, batch_size, batches):
+    """Benchmark replica sync: full reload vs changelog catch-up"""
+    rng = np.random.default_rng(0)
+    writer = VectorStore()
+    if writer.count():
+        raise click.ClickException("REDIS_URL already holds documents; use an empty scratch instance")
+    
+    try:
+        start = time.perf_counter()
+        for offset in range(0, chunks, 1000):
+            writer.add_many(_documents(rng, offset, min(1000, chunks - offset), dimension))
+        click.echo(f"Wrote {chunks} x {dimension} chunks in {time.perf_counter() - start:.1f}s")
+        
+        query = rng.standard_normal(dimension).astype(np.float32)
+        replica = VectorStore()
+        start = time.perf_counter()
+        replica.search(query, top_k=5)
+        click.echo(f"\nFull reload (first search on a new replica): {time.perf_counter() - start:.2f}s")
+        
+        catch_up = []
+        for i in range(batches):
+            writer.add_many(_documents(rng, chunks + i * batch_size, batch_size, dimension))
+            t0 = time.perf_counter()
+            replica.search(query, top_k=5)
+            catch_up.append(time.perf_counter() - t0)
+        steady = []
+        for _ in range(batches):
+            t0 = time.perf_counter()
+            replica.search(query, top_k=5)
+            steady.append(time.perf_counter() - t0)
+        
+        click.echo(f"\nReplica search after another process writes {batch_size} chunks ({batches} writes)")
+        click.echo(f"  catch-up  p50 {_percentile_ms(catch_up, 50):8.2f} ms   p99 {_percentile_ms(catch_up, 99):8.2f} ms")
+        click.echo(f"  no change p50 {_percentile_ms(steady, 50):8.2f} ms   p99 {_percentile_ms(steady, 99):8.2f} ms")
+        
+        # Drop the changelog so the last write cannot be replayed
+        writer.add_many(_documents(rng, chunks + batches * batch_size, batch_size, dimension))
+        writer.client.delete(VectorStore.CHANGES_KEY)
+        target = writer.generation()
+        during = []
+        start = time.perf_counter()
+        while replica._generation != target:
+            t0 = time.perf_counter()
+            replica.search(query, top_k=5)
+            during.append(time.perf_counter() - t0)
+        _wait_for_reload()
+        click.echo(f"\nTrimmed changelog: background reload took {time.perf_counter() - start:.2f}s")
+        click.echo(
+            f"  {len(during)} searches meanwhile, p50 {_percentile_ms(during, 50):.2f} ms, "
+            f"max {max(during) * 1000:.2f} ms"
+        )
+    finally:
+        writer.clear()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+"""
+LLM path load test
+
+Concurrent requests one worker sustains when handlers call the blocking
+provider client (generate_answer) versus the async one (agenerate_answer).
+Both endpoints run in a single in-process app, as one uvicorn worker
+would. By default the provider is simulated with a fixed latency, so no
+API key or network is needed; --live calls the real provider.
+
+Usage (from backend/):
+    python -m scripts.load_test_llm --requests 200 --concurrency 50 --latency-ms 800
+"""
+
+import asyncio
+import time
+from types import SimpleNamespace
+import click
+import httpx
+import numpy as np
+from fastapi import FastAPI
+
+from src.infrastructure.llm.chain_validator_service import ChainValidatorService
+from src.infrastructure.llm.junior_llm_service import JuniorLLMService
+from src.infrastructure.llm.senior_llm_service import SeniorLLMService
+
+
+class _SimulatedClient:
+    """Provider client stand-in: fixed latency, blocking or awaitable"""
+    
+    def __init__(self, latency: float):
+        self.latency = latency
+        self.models = SimpleNamespace(generate_content=self._generate)
+        self.aio = SimpleNamespace(models=SimpleNamespace(generate_content=self._agenerate))
+    
+    def _generate(self, **request):
+        time.sleep(self.latency)
+        return SimpleNamespace(text="simulated answer")
+    
+    async def _agenerate(self, **request):
+        await asyncio.sleep(self.latency)
+        return SimpleNamespace(text="simulated answer")
+
+
+def _app(llm_service: ChainValidatorService) -> FastAPI:
+    app = FastAPI()
+    
+    @app.post("/sync")
+    async def sync_path(body: dict):
+        return llm_service.generate_answer(body["question"])
+    
+    @app.post("/async")
+    async def async_path(body: dict):
+        return await llm_service.agenerate_answer(body["question"])
+    
+    return app
+
+
+async def _load(app: FastAPI, path: str, count: int, concurrency: int):
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies = []
+    
+    async def one(client, i):
+        async with semaphore:
+            start = time.perf_counter()
+            response = await client.post(path, json={"question": f"Question {i}: how do I use asyncio?"})
+            response.raise_for_status()
+            latencies.append(time.perf_counter() - start)
+    
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test", timeout=None) as client:
+        start = time.perf_counter()
+        await asyncio.gather(*(one(client, i) for i in range(count)))
+        elapsed = time.perf_counter() - start
+    return np.array(latencies), elapsed
+
+
+def _report(label, latencies, elapsed):
+    # Requests in flight on average = total time spent in requests / wall time
+    in_flight = latencies.sum() / elapsed
+    click.echo(
+        f"  {label:<22} {len(latencies) / elapsed:8.1f} req/s   in flight {in_flight:6.1f}   "
+        f"p50 {np.percentile(latencies, 50) * 1000:8.0f} ms   p99 {np.percentile(latencies, 99) * 1000:8.0f} ms"
+    )
+
+
+@click.command()
+@click.option("--requests", "count", default=100, help="Requests per path")
+@click.option("--concurrency", default=50, help="Requests in flight at once")
+@click.option("--latency-ms", default=800.0, help="Simulated provider latency")
+@click.option("--live", is_flag=True, help="Call the real provider (uses GEMINI_API_KEY)")
+def main(count, concurrency, latency_ms, live):
+    """Compare blocking and async LLM paths on one worker"""
+    client = None if live else _SimulatedClient(latency_ms / 1000)
+    llm_service = ChainValidatorService(JuniorLLMService(client), SeniorLLMService(client))
+    app = _app(llm_service)
+    
+    provider = "live provider" if live else f"simulated provider, {latency_ms:.0f} ms"
+    click.echo(f"{count} requests per path, concurrency {concurrency} ({provider})\n")
+    for label, path in (("blocking (before)", "/sync"), ("async (after)", "/async")):
+        latencies, elapsed = asyncio.run(_load(app, path, count, concurrency))
+        _report(label, latencies, elapsed)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,45 @@
+"""
+Vector index snapshots
+
+Save the RAG vector index to a directory that API replicas load at
+warm-up (RAG_SNAPSHOT_PATH), or load one to refill a flushed Redis.
+
+Usage (from backend/):
+    python -m scripts.vector_snapshot save snapshots/rag
+    python -m scripts.vector_snapshot load snapshots/rag
+"""
+
+import time
+import click
+
+from src.infrastructure.rag.vector_store import VectorStore
+
+
+@click.group()
+def main():
+    """Save or load vector index snapshots"""
+
+
+@main.command()
+@click.argument("path")
+def save(path):
+    """Write the current index to PATH"""
+    start = time.perf_counter()
+    manifest = VectorStore().save(path)
+    click.echo(f"Saved {manifest['documents']} documents (generation {manifest['generation']}) "
+               f"in {time.perf_counter() - start:.2f} s")
+
+
+@main.command()
+@click.argument("path")
+@click.option("--no-mmap", is_flag=True, help="Read arrays into memory instead of mapping them")
+def load(path, no_mmap):
+    """Load PATH, restoring Redis if it has no documents"""
+    start = time.perf_counter()
+    manifest = VectorStore().load(path, mmap=not no_mmap)
+    click.echo(f"Loaded {manifest['documents']} documents ({manifest['status']}) "
+               f"in {time.perf_counter() - start:.2f} s")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,10 +1,13 @@
+import asyncio
+import hashlib
+from typing import AsyncIterator, Optional
 from src.domain.qa import Question, Answer
 from src.domain.learning_session import SessionStatus
 from src.infrastructure.database.session_repository import SessionRepository
 from src.infrastructure.database.qa_repository import QuestionRepository, AnswerRepository
 from src.infrastructure.cache.redis_service import CacheService
+from src.infrastructure.cache.single_flight import SingleFlight
 from src.infrastructure.llm.chain_validator_service import ChainValidatorService
-import hashlib
 
 class AskQuestionUseCase:
     def __init__(
@@ -13,15 +16,117 @@ class AskQuestionUseCase:
         question_repository: QuestionRepository,
         answer_repository: AnswerRepository,
         cache_service: CacheService,
-        llm_service: ChainValidatorService
+        llm_service: ChainValidatorService,
+        single_flight: Optional[SingleFlight] = None
     ):
         self.session_repository = session_repository
         self.question_repository = question_repository
         self.answer_repository = answer_repository
         self.cache_service = cache_service
         self.llm_service = llm_service
+        self.single_flight = single_flight
     
     def execute(self, session_id: str, user_id: str, content: str, debug_mode: bool = False, language: str = "pt-BR") -> dict:
+        cached_result = self._begin(session_id, user_id, content, debug_mode, language)
+        if cached_result is not None:
+            return cached_result
+        
+        try:
+            created_question = self._start(session_id, content)
+            llm_response, shared = self._generate_answer(content, debug_mode, language)
+            # A shared answer was cached by the caller that ran the LLM
+            return self._complete(session_id, user_id, content, debug_mode, language, created_question, llm_response, cache_result=not shared)
+        
+        finally:
+            self.cache_service.release_lock(session_id)
+    
+    async def aexecute(self, session_id: str, user_id: str, content: str, debug_mode: bool = False, language: str = "pt-BR") -> dict:
+        """
+        execute for async handlers
+        
+        The LLM call is awaited; the cache lookup and write run in a worker
+        thread, since the semantic tier embeds the question.
+        """
+        cached_result = await asyncio.to_thread(self._begin, session_id, user_id, content, debug_mode, language)
+        if cached_result is not None:
+            return cached_result
+        
+        try:
+            created_question = self._start(session_id, content)
+            llm_response, shared = await self._agenerate_answer(content, debug_mode, language)
+            # A shared answer was cached by the caller that ran the LLM
+            return await asyncio.to_thread(
+                self._complete, session_id, user_id, content, debug_mode, language,
+                created_question, llm_response, cache_result=not shared
+            )
+        
+        finally:
+            self.cache_service.release_lock(session_id)
+    
+    def execute_stream(self, session_id: str, user_id: str, content: str, debug_mode: bool = False, language: str = "pt-BR") -> AsyncIterator[dict]:
+        """
+        Answer as a stream of ChainValidatorService.astream_answer events
+        
+        Validation and the cache lookup happen here, before the stream
+        starts, so they raise ValueError like execute. The session lock is
+        taken when the stream is first iterated and released when it ends
+        or is closed, so a stream that is never consumed (e.g. the client
+        left first) holds no lock; losing the lock to a concurrent request
+        in between raises ValueError from the stream. The "done" event
+        carries execute's result, saved and cached from the assembled
+        text, plus "incomplete" when the provider failed (then nothing is
+        cached). Streamed answers are not shared through single_flight.
+        """
+        cached_result = self._lookup(session_id, user_id, content, debug_mode, language)
+        if cached_result is not None:
+            return self._replay(cached_result)
+        return self._stream(session_id, user_id, content, debug_mode, language)
+    
+    async def aexecute_stream(self, session_id: str, user_id: str, content: str, debug_mode: bool = False, language: str = "pt-BR") -> AsyncIterator[dict]:
+        """execute_stream for async handlers, with the cache lookup in a worker thread"""
+        cached_result = await asyncio.to_thread(self._lookup, session_id, user_id, content, debug_mode, language)
+        if cached_result is not None:
+            return self._replay(cached_result)
+        return self._stream(session_id, user_id, content, debug_mode, language)
+    
+    async def _stream(self, session_id: str, user_id: str, content: str, debug_mode: bool, language: str) -> AsyncIterator[dict]:
+        self._lock(session_id)
+        try:
+            created_question = self._start(session_id, content)
+            llm_response = None
+            async for event in self.llm_service.astream_answer(content, debug_mode=debug_mode, language=language):
+                if event["type"] == "done":
+                    llm_response = event
+                else:
+                    yield event
+            
+            # An interrupted answer is saved to the session, but not cached for other askers
+            incomplete = llm_response.get("incomplete", False)
+            result = await asyncio.to_thread(
+                self._complete, session_id, user_id, content, debug_mode, language,
+                created_question, llm_response, cache_result=not incomplete
+            )
+            yield {"type": "done", **result, "incomplete": incomplete}
+        
+        finally:
+            self.cache_service.release_lock(session_id)
+    
+    @staticmethod
+    async def _replay(result: dict) -> AsyncIterator[dict]:
+        """A cached answer as a one-chunk stream"""
+        yield {"type": "start", "model": result["model"]}
+        yield {"type": "delta", "content": result["content"]}
+        yield {"type": "done", **result}
+    
+    def _begin(self, session_id: str, user_id: str, content: str, debug_mode: bool, language: str) -> Optional[dict]:
+        """Validate the request; return the cached answer, or take the session lock"""
+        cached_result = self._lookup(session_id, user_id, content, debug_mode, language)
+        if cached_result is None:
+            self._lock(session_id)
+        return cached_result
+    
+    def _lookup(self, session_id: str, user_id: str, content: str, debug_mode: bool, language: str) -> Optional[dict]:
+        """Validate the request; return the cached answer, if any"""
         session = self.session_repository.get_by_id(session_id)
         if not session:
             raise ValueError("Session not found")
@@ -32,8 +137,7 @@ class AskQuestionUseCase:
         if self.cache_service.is_locked(session_id):
             raise ValueError("Session is processing another question")
         
-        question_hash = hashlib.sha256(content.lower().strip().encode()).hexdigest()
-        cached_answer = self.cache_service.get_cached_answer(question_hash)
+        cached_answer = self.cache_service.get_cached_answer(content, language=language, debug_mode=debug_mode)
         
         if cached_answer:
             question = Question(session_id=session_id, content=content)
@@ -46,6 +150,9 @@ class AskQuestionUseCase:
                 edge_cases=""
             )
             created_answer = self.answer_repository.create(answer)
+            if "semantic_similarity" in cached_answer:
+                # Lets feedback on this answer flag a false semantic hit
+                self.cache_service.mark_semantic_answer(created_answer.id)
             
             return {
                 "content": created_answer.content,
@@ -54,47 +161,78 @@ class AskQuestionUseCase:
                 "used_senior": cached_answer.get("used_senior", False),
                 "thinking_process": []
             }
-        
+        return None
+    
+    def _lock(self, session_id: str):
         if not self.cache_service.acquire_lock(session_id, ttl=180):
             raise ValueError("Failed to acquire lock")
+    
+    def _start(self, session_id: str, content: str):
+        self.session_repository.update_status(session_id, SessionStatus.PROCESSING)
         
-        try:
-            self.session_repository.update_status(session_id, SessionStatus.PROCESSING)
-            
-            question = Question(session_id=session_id, content=content)
-            created_question = self.question_repository.create(question)
-            
-            llm_response = self.llm_service.generate_answer(content, debug_mode=debug_mode, language=language)
-            
-            answer = Answer(
-                question_id=created_question.id,
-                content=llm_response["content"],
-                explanation="",
-                edge_cases=""
-            )
-            created_answer = self.answer_repository.create(answer)
-            
-            self.cache_service.cache_answer(question_hash, {
+        question = Question(session_id=session_id, content=content)
+        return self.question_repository.create(question)
+    
+    def _complete(
+        self,
+        session_id: str,
+        user_id: str,
+        content: str,
+        debug_mode: bool,
+        language: str,
+        created_question,
+        llm_response: dict,
+        cache_result: bool
+    ) -> dict:
+        answer = Answer(
+            question_id=created_question.id,
+            content=llm_response["content"],
+            explanation="",
+            edge_cases=""
+        )
+        created_answer = self.answer_repository.create(answer)
+        
+        if cache_result:
+            self.cache_service.cache_answer(content, {
                 "content": created_answer.content,
                 "model": llm_response["model"],
                 "used_senior": llm_response["used_senior"]
-            })
-            
-            # Gerar processo de pensamento
-            thinking_process = self._generate_thinking_process(content, llm_response)
-            
-            self.session_repository.update_status(session_id, SessionStatus.ACTIVE)
-            
-            return {
-                "content": created_answer.content,
-                "answer_id": created_answer.id,
-                "model": llm_response["model"],
-                "used_senior": llm_response["used_senior"],
-                "thinking_process": thinking_process
-            }
+            }, language=language, debug_mode=debug_mode, user_id=user_id)
         
-        finally:
-            self.cache_service.release_lock(session_id)
+        # Gerar processo de pensamento
+        thinking_process = self._generate_thinking_process(content, llm_response)
+        
+        self.session_repository.update_status(session_id, SessionStatus.ACTIVE)
+        
+        return {
+            "content": created_answer.content,
+            "answer_id": created_answer.id,
+            "model": llm_response["model"],
+            "used_senior": llm_response["used_senior"],
+            "thinking_process": thinking_process
+        }
+    
+    def _generate_answer(self, content: str, debug_mode: bool, language: str) -> tuple:
+        """LLM answer, shared with concurrent identical questions when single_flight is set"""
+        def generate():
+            return self.llm_service.generate_answer(content, debug_mode=debug_mode, language=language)
+        
+        if self.single_flight is None:
+            return generate(), False
+        return self.single_flight.do(self._flight_key(content, debug_mode, language), generate)
+    
+    async def _agenerate_answer(self, content: str, debug_mode: bool, language: str) -> tuple:
+        def generate():
+            return self.llm_service.agenerate_answer(content, debug_mode=debug_mode, language=language)
+        
+        if self.single_flight is None:
+            return await generate(), False
+        return await self.single_flight.ado(self._flight_key(content, debug_mode, language), generate)
+    
+    @staticmethod
+    def _flight_key(content: str, debug_mode: bool, language: str) -> str:
+        question_hash = hashlib.sha256(content.lower().strip().encode()).hexdigest()
+        return f"{question_hash}:{language}:{'debug' if debug_mode else 'default'}"
     
     def _generate_thinking_process(self, question: str, llm_response: dict) -> list:
         """Gera processo de pensamento estilo Gemini"""
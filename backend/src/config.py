@@ -13,6 +13,40 @@ class Settings(BaseSettings):
     GEMINI_API_KEY: str
     GOOGLE_CLIENT_ID: str = ""
     CONFIDENCE_THRESHOLD: int = 70
+    RAG_ENABLED: bool = True
+    RAG_WARM_UP: bool = True
+    RAG_HYBRID_SEARCH: bool = True
+    RAG_RERANKER_ENABLED: bool = False
+    RAG_RERANKER_MODEL: str = "cross-encoder/ms-marco-MiniLM-L-6-v2"
+    RAG_RERANKER_BUDGET_MS: float = 150.0
+    RAG_RERANKER_CANDIDATES: int = 20
+    RAG_RERANKER_CACHE_SIZE: int = 20000
+    RAG_CONTEXT_CACHE_SIZE: int = 1024
+    RAG_CONTEXT_CACHE_TTL: int = 3600
+    RAG_SNAPSHOT_PATH: str = ""  # VectorStore.save directory loaded at warm-up
+    SEMANTIC_CACHE_ENABLED: bool = True
+    SEMANTIC_CACHE_THRESHOLD: float = 0.92
+    SEMANTIC_CACHE_MAX_ENTRIES: int = 20000
+    CACHE_L1_ENABLED: bool = False  # In-process copy of hot answer/context/lock keys
+    CACHE_L1_MAX_ENTRIES: int = 10000
+    CACHE_L1_TTL: float = 30.0
+    CACHE_L1_LOCK_TTL: float = 1.0
+    CACHE_CODEC_SERIALIZER: str = "auto"  # json, msgpack or auto
+    CACHE_CODEC_COMPRESSOR: str = "auto"  # zstd, lz4, zlib, none or auto
+    CACHE_CODEC_THRESHOLD: int = 1024
+    SINGLE_FLIGHT_ENABLED: bool = True  # Share one LLM call among identical in-flight questions
+    SINGLE_FLIGHT_TIMEOUT: float = 90.0
+    SPECULATIVE_EXECUTION_ENABLED: bool = True  # Junior+Senior in parallel near the complexity threshold (per plan, see APIKey)
+    LLM_HTTP_POOL_SIZE: int = 20  # Keep-alive connections to the LLM provider
+    EMBEDDINGS_BACKEND: str = "sentence-transformers"  # or "onnx"
+    EMBEDDINGS_ONNX_PATH: str = "models/all-MiniLM-L6-v2-onnx"
+    EMBEDDINGS_ONNX_QUANTIZE: bool = True
+    EMBEDDINGS_ONNX_THREADS: int = 0
+    EMBEDDING_CACHE_SIZE: int = 10000
+    EMBEDDING_CACHE_REDIS: bool = False
+    EMBEDDING_MICRO_BATCHING: bool = True
+    EMBEDDING_BATCH_MAX_SIZE: int = 32
+    EMBEDDING_BATCH_MAX_LATENCY_MS: float = 5.0
     
     class Config:
         env_file = ".env"
@@ -30,6 +30,14 @@ class APIKey:
         PLAN_ENTERPRISE: None  # Unlimited
     }
     
+    # Speculative Junior+Senior execution: complexity points below the
+    # Senior threshold in which both run at once (None = never)
+    SPECULATIVE_MARGINS = {
+        PLAN_FREE: None,
+        PLAN_PRO: 1,
+        PLAN_ENTERPRISE: 2
+    }
+    
     def __init__(
         self,
         key: str,
@@ -60,6 +68,10 @@ class APIKey:
         """Get daily limit for this key's plan"""
         return self.DAILY_LIMITS.get(self.plan)
     
+    def get_speculative_margin(self) -> Optional[int]:
+        """Get speculative execution margin for this key's plan"""
+        return self.SPECULATIVE_MARGINS.get(self.plan)
+    
     def is_valid(self) -> bool:
         """Check if key is valid"""
         if not self.is_active:
@@ -0,0 +1,171 @@
+"""
+Local Cache
+
+Process-wide L1 in front of Redis, kept coherent across replicas over pub/sub
+"""
+
+import redis
+import json
+import threading
+import time
+import uuid
+from functools import lru_cache
+from typing import Callable, Iterable, Optional
+from src.config import get_settings
+from src.infrastructure.cache.lru_cache import LRUCache
+from src.infrastructure.monitoring.metrics_service import MetricsService
+import logging
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+# Cached "key does not exist in Redis" (LRUCache uses None for missing)
+_ABSENT = object()
+
+
+class LocalCache:
+    """
+    Size-bounded LRU/TTL copy of hot Redis string keys
+    
+    Every write through CacheService publishes the keys it changed on
+    CHANNEL; each replica's listener thread drops them from its copy. A
+    fill is discarded when an invalidation arrived while Redis was being
+    read, so a slow read never re-caches a value that was just replaced.
+    The copy is bypassed until the subscription is confirmed and cleared
+    whenever it drops, since invalidations may have been missed. Keys
+    expiring in Redis publish nothing, so the TTL bounds how long an
+    expired value can still be served.
+    """
+    
+    CHANNEL = "cache:invalidate"
+    RECONNECT_DELAY = 1.0
+    
+    def __init__(self, client, max_entries: int = 10000, ttl: float = 30.0, listen: bool = True):
+        """
+        Args:
+            client: Redis client (decode_responses=True)
+            max_entries: Keys kept before the least recently used is evicted
+            ttl: Seconds a key is served without asking Redis
+            listen: Start the invalidation listener thread
+        """
+        self.client = client
+        self._cache = LRUCache(max_entries=max_entries, ttl=ttl)
+        self._origin = uuid.uuid4().hex
+        self._epoch = 0  # Bumped on every invalidation
+        self._lock = threading.Lock()
+        self._subscribed = threading.Event()
+        self._closed = False
+        self._counts = {"l1": 0, "l2": 0, "miss": 0}
+        if listen:
+            threading.Thread(target=self._listen, name="cache-invalidation", daemon=True).start()
+    
+    def get(self, key: str, load: Callable[[], Optional[str]], ttl: Optional[float] = None) -> Optional[str]:
+        """
+        Value of key, from the local copy or else `load` (a Redis read)
+        
+        Args:
+            key: Redis key
+            load: Reads the key from Redis
+            ttl: Override the default TTL for this key
+        """
+        if self._subscribed.is_set():
+            value = self._cache.get(key)
+            if value is not None:
+                self._track("l1")
+                return None if value is _ABSENT else value
+        
+        epoch = self._epoch
+        value = load()
+        self._track("miss" if value is None else "l2")
+        with self._lock:
+            if self._subscribed.is_set() and epoch == self._epoch:
+                self._cache.set(key, _ABSENT if value is None else value, ttl)
+        return value
+    
+    def invalidate(self, *keys: str):
+        """Drop keys here and on every other replica"""
+        self._drop(keys)
+        self._publish(list(keys))
+    
+    def invalidate_all(self):
+        """Drop every key here and on every other replica"""
+        self._drop(None)
+        self._publish(None)
+    
+    def stats(self) -> dict:
+        """Lookups served by each tier since start"""
+        total = sum(self._counts.values())
+        return {
+            **{f"{tier}_lookups": count for tier, count in self._counts.items()},
+            "l1_hit_rate": round(self._counts["l1"] / total * 100 if total else 0, 2),
+            "l2_hit_rate": round(self._counts["l2"] / total * 100 if total else 0, 2),
+            "entries": len(self._cache)
+        }
+    
+    def close(self):
+        """Stop the listener thread (after its current wait)"""
+        self._closed = True
+    
+    def _track(self, tier: str):
+        self._counts[tier] += 1
+        MetricsService.track_cache_tier(tier)
+    
+    def _drop(self, keys: Optional[Iterable[str]]):
+        with self._lock:
+            self._epoch += 1
+            if keys is None:
+                self._cache.clear()
+            else:
+                for key in keys:
+                    self._cache.delete(key)
+    
+    def _publish(self, keys: Optional[list]):
+        try:
+            self.client.publish(self.CHANNEL, json.dumps({"origin": self._origin, "keys": keys}))
+        except redis.RedisError as e:
+            # Other replicas fall back on the TTL
+            logger.warning(f"Cache invalidation publish failed: {e}")
+    
+    def _handle(self, message: dict):
+        """Apply an invalidation published by another replica"""
+        if message["type"] == "subscribe":
+            self._drop(None)
+            self._subscribed.set()
+            logger.info("Local cache invalidation channel subscribed")
+            return
+        
+        try:
+            payload = json.loads(message["data"])
+        except (TypeError, ValueError):
+            logger.warning(f"Ignoring malformed cache invalidation: {message['data']!r}")
+            return
+        if payload.get("origin") != self._origin:
+            self._drop(payload.get("keys"))
+    
+    def _listen(self):
+        while not self._closed:
+            try:
+                pubsub = self.client.pubsub()
+                pubsub.subscribe(self.CHANNEL)
+                while not self._closed:
+                    message = pubsub.get_message(timeout=self.RECONNECT_DELAY)
+                    if message is not None:
+                        self._handle(message)
+                pubsub.close()
+            except Exception as e:
+                logger.warning(f"Cache invalidation listener disconnected: {e}")
+            
+            self._subscribed.clear()
+            self._drop(None)
+            if not self._closed:
+                time.sleep(self.RECONNECT_DELAY)
+
+
+@lru_cache()
+def get_local_cache() -> LocalCache:
+    """Process-wide LocalCache shared by every CacheService"""
+    return LocalCache(
+        redis.from_url(settings.REDIS_URL, decode_responses=True),
+        max_entries=settings.CACHE_L1_MAX_ENTRIES,
+        ttl=settings.CACHE_L1_TTL
+    )
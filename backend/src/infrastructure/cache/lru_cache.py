@@ -0,0 +1,68 @@
+"""
+LRU Cache
+
+Thread-safe, size-bounded in-process cache with optional TTL
+"""
+
+from collections import OrderedDict
+from typing import Any, Hashable, Optional
+import threading
+import time
+
+
+class LRUCache:
+    """Least-recently-used cache with an optional per-entry TTL"""
+    
+    def __init__(self, max_entries: int = 1024, ttl: Optional[float] = None):
+        """
+        Args:
+            max_entries: Entries kept before the least recently used is evicted
+            ttl: Default time-to-live in seconds (None = no expiry)
+        """
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._data: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+    
+    def __len__(self) -> int:
+        return len(self._data)
+    
+    def __contains__(self, key: Hashable) -> bool:
+        return self.get(key) is not None
+    
+    def get(self, key: Hashable) -> Optional[Any]:
+        """Get value (None if missing or expired)"""
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return None
+            
+            value, expires_at = entry
+            if expires_at is not None and expires_at <= time.monotonic():
+                del self._data[key]
+                return None
+            
+            self._data.move_to_end(key)
+            return value
+    
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None):
+        """Set value, evicting the least recently used entry when full"""
+        if self.max_entries <= 0:
+            return
+        
+        ttl = ttl if ttl is not None else self.ttl
+        expires_at = time.monotonic() + ttl if ttl else None
+        
+        with self._lock:
+            self._data[key] = (value, expires_at)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+    
+    def delete(self, key: Hashable) -> bool:
+        with self._lock:
+            return self._data.pop(key, None) is not None
+    
+    def clear(self):
+        with self._lock:
+            self._data.clear()
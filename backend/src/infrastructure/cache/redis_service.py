@@ -1,8 +1,12 @@
 import redis
-from typing import Optional, List
-import json
+from typing import Iterable, Iterator, Optional, List, Union
 import hashlib
+import time
 from src.config import get_settings
+from src.infrastructure.cache.local_cache import LocalCache, get_local_cache
+from src.infrastructure.cache.semantic_cache import SemanticCache, get_semantic_cache
+from src.infrastructure.cache.value_codec import CodecError, ValueCodec, get_value_codec
+from src.infrastructure.monitoring.metrics_service import MetricsService
 import logging
 
 logger = logging.getLogger(__name__)
@@ -18,8 +22,37 @@ class CacheService:
     TTL_CONTEXT = 3600       # 1 hour
     TTL_SESSION = 86400      # 24 hours
     
-    def __init__(self):
+    # Ratings at or below this on a semantic-tier answer count as false hits
+    FALSE_HIT_RATING = 2
+    
+    # Keys per SCAN/SSCAN page and per pipelined delete
+    SCAN_BATCH_SIZE = 500
+    
+    def __init__(
+        self,
+        semantic_cache: Optional[SemanticCache] = None,
+        local_cache: Optional[LocalCache] = None,
+        codec: Optional[ValueCodec] = None
+    ):
+        """
+        Args:
+            semantic_cache: Near-duplicate question tier (default: the
+                process-wide one when SEMANTIC_CACHE_ENABLED)
+            local_cache: In-process L1 for answers, contexts and locks
+                (default: the process-wide one when CACHE_L1_ENABLED)
+            codec: Encoding of cached answers and contexts
+                (default: the process-wide one)
+        """
         self.client = redis.from_url(settings.REDIS_URL, decode_responses=True)
+        # Encoded answers and contexts are binary
+        self.raw_client = redis.from_url(settings.REDIS_URL, decode_responses=False)
+        self.codec = codec or get_value_codec()
+        self.semantic = semantic_cache
+        if self.semantic is None and settings.SEMANTIC_CACHE_ENABLED:
+            self.semantic = get_semantic_cache()
+        self.local = local_cache
+        if self.local is None and settings.CACHE_L1_ENABLED:
+            self.local = get_local_cache()
     
     # Distributed Lock
     def acquire_lock(self, key: str, ttl: int = None) -> bool:
@@ -27,6 +60,7 @@ class CacheService:
         ttl = ttl or self.TTL_LOCK
         acquired = self.client.set(f"lock:{key}", "1", nx=True, ex=ttl)
         if acquired:
+            self._invalidate_local(f"lock:{key}")
             logger.info(f"Lock acquired: {key}")
         return acquired
     
@@ -34,12 +68,15 @@ class CacheService:
         """Release distributed lock"""
         released = self.client.delete(f"lock:{key}") > 0
         if released:
+            self._invalidate_local(f"lock:{key}")
             logger.info(f"Lock released: {key}")
         return released
     
     def is_locked(self, key: str) -> bool:
-        """Check if key is locked"""
-        return self.client.exists(f"lock:{key}") > 0
+        """Check if key is locked (the L1 may lag by CACHE_L1_LOCK_TTL; acquire_lock is authoritative)"""
+        if self.local is None:
+            return self.client.exists(f"lock:{key}") > 0
+        return self._get_cached(f"lock:{key}", ttl=settings.CACHE_L1_LOCK_TTL) is not None
     
     # Generic Cache
     def set(self, key: str, value: str, ttl: Optional[int] = None):
@@ -48,6 +85,7 @@ class CacheService:
             self.client.setex(key, ttl, value)
         else:
             self.client.set(key, value)
+        self._invalidate_local(key)
     
     def get(self, key: str) -> Optional[str]:
         """Get cache value"""
@@ -55,38 +93,140 @@ class CacheService:
     
     def delete(self, key: str) -> bool:
         """Delete cache key"""
-        return self.client.delete(key) > 0
+        deleted = self.client.delete(key) > 0
+        self._invalidate_local(key)
+        return deleted
     
     # Answer Cache
-    def cache_answer(self, question: str, answer: dict, ttl: int = None):
-        """Cache LLM answer with hash key"""
+    def cache_answer(
+        self,
+        question: str,
+        answer: dict,
+        ttl: int = None,
+        language: Optional[str] = None,
+        debug_mode: bool = False,
+        user_id: Optional[str] = None
+    ):
+        """
+        Cache LLM answer with hash key
+        
+        The answer is registered in the tag sets of its model, language
+        and user (see invalidate_by_tag) and for semantic lookups. Tag
+        sets are sorted sets scored by each answer's expiry: every write
+        drops the members that have expired, so hot tags stay as small
+        as their live answers, and idle tags expire with their
+        longest-lived answer.
+        """
         ttl = ttl or self.TTL_ANSWER
         question_hash = self._hash_question(question)
-        self.client.setex(f"answer:{question_hash}", ttl, json.dumps(answer))
+        key = self._answer_key(question_hash, language, debug_mode)
+        tags = {"model": answer.get("model"), "language": language, "user": user_id}
+        tag_keys = [self._tag_key(tag, value) for tag, value in tags.items() if value]
+        now = time.time()
+        
+        pipe = self.raw_client.pipeline(transaction=True)
+        pipe.setex(key, ttl, self.codec.encode(answer))
+        for tag_key in tag_keys:
+            pipe.zremrangebyscore(tag_key, "-inf", now)
+            pipe.zadd(tag_key, {key: now + ttl})
+            pipe.expire(tag_key, ttl, nx=True)
+            pipe.expire(tag_key, ttl, gt=True)
+        # Lets invalidate_by_tag remove the answer from its other tags
+        pipe.delete(self._answer_tags_key(key))
+        if tag_keys:
+            pipe.sadd(self._answer_tags_key(key), *tag_keys)
+            pipe.expire(self._answer_tags_key(key), ttl)
+        pipe.execute()
+        self._invalidate_local(key)
         logger.info(f"Answer cached: {question_hash[:8]}... (TTL: {ttl}s)")
+        
+        if self.semantic is not None:
+            try:
+                self.semantic.add(question, question_hash, SemanticCache.scope(language, debug_mode))
+            except redis.RedisError as e:
+                logger.warning(f"Semantic cache add failed: {e}")
     
-    def get_cached_answer(self, question: str) -> Optional[dict]:
-        """Get cached answer by question hash"""
+    def get_cached_answer(
+        self,
+        question: str,
+        language: Optional[str] = None,
+        debug_mode: bool = False
+    ) -> Optional[dict]:
+        """Get cached answer by question hash, falling back to the nearest cached question"""
         question_hash = self._hash_question(question)
-        cached = self.client.get(f"answer:{question_hash}")
+        cached = self._decode(self._get_cached(self._answer_key(question_hash, language, debug_mode), raw=True))
         if cached:
             logger.info(f"Cache hit: {question_hash[:8]}...")
-            return json.loads(cached)
-        return None
+            return cached
+        return self.get_similar_answer(question, language, debug_mode)
+    
+    def get_similar_answer(
+        self,
+        question: str,
+        language: Optional[str] = None,
+        debug_mode: bool = False
+    ) -> Optional[dict]:
+        """
+        Answer of the closest cached question in the same language/debug scope
+        
+        Returns:
+            Cached answer plus "semantic_similarity", or None below
+            SEMANTIC_CACHE_THRESHOLD (or while embeddings are unavailable)
+        """
+        if self.semantic is None:
+            return None
+        
+        try:
+            match = self.semantic.lookup(question, SemanticCache.scope(language, debug_mode))
+        except redis.RedisError as e:
+            logger.warning(f"Semantic cache lookup failed: {e}")
+            return None
+        
+        # Entries outlive their answers (TTL): an expired answer is a miss
+        cached = self._decode(self._get_cached(self._answer_key(match[0], language, debug_mode), raw=True)) if match else None
+        if not cached:
+            MetricsService.track_semantic_cache("miss")
+            return None
+        
+        question_hash, similarity = match
+        MetricsService.track_semantic_cache("hit", similarity)
+        logger.info(f"Semantic cache hit: {question_hash[:8]}... (similarity {similarity:.3f})")
+        cached["semantic_similarity"] = round(similarity, 4)
+        return cached
+    
+    def mark_semantic_answer(self, answer_id: str, ttl: int = None):
+        """Remember that an answer was served by the semantic tier"""
+        self.client.setex(f"semantic_hit:{answer_id}", ttl or self.TTL_ANSWER, "1")
+    
+    def record_answer_feedback(self, answer_id: str, rating: int) -> bool:
+        """
+        Count a poorly rated semantic-tier answer as a false hit
+        
+        Returns:
+            True if it was recorded as a false hit
+        """
+        if rating > self.FALSE_HIT_RATING:
+            return False
+        if self.client.delete(f"semantic_hit:{answer_id}") > 0:
+            MetricsService.track_semantic_cache("false_hit")
+            logger.info(f"Semantic cache false hit: answer {answer_id} rated {rating}")
+            return True
+        return False
     
     # Context Cache
     def cache_context(self, session_id: str, messages: List[dict], ttl: int = None):
         """Cache conversation context"""
         ttl = ttl or self.TTL_CONTEXT
-        self.client.setex(f"context:{session_id}", ttl, json.dumps(messages))
+        self.raw_client.setex(f"context:{session_id}", ttl, self.codec.encode(messages))
+        self._invalidate_local(f"context:{session_id}")
         logger.info(f"Context cached: {session_id} ({len(messages)} messages)")
     
     def get_cached_context(self, session_id: str) -> Optional[List[dict]]:
         """Get cached conversation context"""
-        cached = self.client.get(f"context:{session_id}")
+        cached = self._decode(self._get_cached(f"context:{session_id}", raw=True))
         if cached:
             logger.info(f"Context hit: {session_id}")
-            return json.loads(cached)
+            return cached
         return None
     
     def invalidate_context(self, session_id: str) -> bool:
@@ -94,20 +234,118 @@ class CacheService:
         return self.delete(f"context:{session_id}")
     
     # Cache Invalidation
+    def invalidate_by_tag(self, tag: str, value: str) -> int:
+        """
+        Delete every cached answer registered under a tag
+        
+        The answers are also removed from their other tag sets.
+        
+        Args:
+            tag: model, language or user
+            value: Tag value (e.g. a public model name or user id)
+        
+        Returns:
+            Number of answers deleted
+        """
+        tag_key = self._tag_key(tag, value)
+        now = time.time()
+        live = (key for key, expires_at in self.client.zscan_iter(tag_key, count=self.SCAN_BATCH_SIZE) if expires_at > now)
+        deleted = sum(self._unlink_answers(batch, tag_key) for batch in self._batches(live))
+        self.client.unlink(tag_key)
+        logger.info(f"Invalidated {deleted} answers tagged {tag}={value}")
+        return deleted
+    
     def invalidate_by_pattern(self, pattern: str) -> int:
-        """Invalidate all keys matching pattern"""
-        keys = self.client.keys(pattern)
-        if keys:
-            deleted = self.client.delete(*keys)
+        """Invalidate all keys matching pattern (SCAN, so Redis is never blocked)"""
+        keys = self.client.scan_iter(match=pattern, count=self.SCAN_BATCH_SIZE)
+        deleted = sum(self._unlink(batch) for batch in self._batches(keys))
+        if deleted:
+            if self.local is not None:
+                self.local.invalidate_all()
             logger.info(f"Invalidated {deleted} keys matching: {pattern}")
-            return deleted
-        return 0
+        return deleted
+    
+    def invalidate_by_model(self, model: str) -> int:
+        """Invalidate answers generated by a model (its public name, as cached with the answer)"""
+        return self.invalidate_by_tag("model", model)
     
-    def invalidate_by_version(self, version: str):
-        """Invalidate cache by model version"""
-        return self.invalidate_by_pattern(f"answer:*:v{version}")
+    def _batches(self, keys: Iterable[str]) -> Iterator[List[str]]:
+        """keys in lists of SCAN_BATCH_SIZE"""
+        batch = []
+        for key in keys:
+            batch.append(key)
+            if len(batch) >= self.SCAN_BATCH_SIZE:
+                yield batch
+                batch = []
+        if batch:
+            yield batch
+    
+    def _unlink(self, keys: List[str]) -> int:
+        # One command per key keeps batches valid on Redis Cluster
+        pipe = self.client.pipeline(transaction=False)
+        for key in keys:
+            pipe.unlink(key)
+        return sum(pipe.execute())
+    
+    def _unlink_answers(self, keys: List[str], tag_key: str) -> int:
+        """UNLINK answers and drop them from their other tag sets"""
+        pipe = self.client.pipeline(transaction=False)
+        for key in keys:
+            pipe.smembers(self._answer_tags_key(key))
+        siblings = pipe.execute()
+        
+        pipe = self.client.pipeline(transaction=False)
+        unlinked_at, queued = [], 0  # Positions of the answers' UNLINK results
+        for key, tag_keys in zip(keys, siblings):
+            others = set(tag_keys) - {tag_key}
+            unlinked_at.append(queued)
+            pipe.unlink(key)
+            pipe.unlink(self._answer_tags_key(key))
+            for other in others:
+                pipe.zrem(other, key)
+            queued += 2 + len(others)
+        results = pipe.execute()
+        
+        deleted = sum(results[i] for i in unlinked_at)
+        if self.local is not None:
+            self.local.invalidate(*keys)
+        return deleted
+    
+    @staticmethod
+    def _tag_key(tag: str, value: str) -> str:
+        return f"tag:{tag}:{value}"
+    
+    @staticmethod
+    def _answer_key(question_hash: str, language: Optional[str], debug_mode: bool) -> str:
+        """Answers are per language and debug mode, like the semantic tier"""
+        return f"answer:{question_hash}:{SemanticCache.scope(language, debug_mode)}"
+    
+    @staticmethod
+    def _answer_tags_key(key: str) -> str:
+        return f"tags:{key}"
     
     # Helpers
+    def _get_cached(self, key: str, ttl: Optional[float] = None, raw: bool = False) -> Optional[Union[str, bytes]]:
+        """Read a key through the L1, when enabled (raw: as stored bytes)"""
+        client = self.raw_client if raw else self.client
+        if self.local is None:
+            return client.get(key)
+        return self.local.get(key, lambda: client.get(key), ttl)
+    
+    def _decode(self, cached: Optional[Union[str, bytes]]):
+        """Decoded value, or None if missing or undecodable here"""
+        if not cached:
+            return None
+        try:
+            return self.codec.decode(cached)
+        except CodecError as e:
+            logger.warning(f"Ignoring cached value: {e}")
+            return None
+    
+    def _invalidate_local(self, key: str):
+        if self.local is not None:
+            self.local.invalidate(key)
+    
     def _hash_question(self, question: str) -> str:
         """Generate hash for question (cache key)"""
         return hashlib.sha256(question.lower().strip().encode()).hexdigest()
@@ -115,11 +353,15 @@ class CacheService:
     def get_stats(self) -> dict:
         """Get cache statistics"""
         info = self.client.info("stats")
-        return {
+        stats = {
             "hits": info.get("keyspace_hits", 0),
             "misses": info.get("keyspace_misses", 0),
-            "hit_rate": self._calculate_hit_rate(info)
+            "hit_rate": self._calculate_hit_rate(info),
+            "codec": self.codec.stats()
         }
+        if self.local is not None:
+            stats["local"] = self.local.stats()
+        return stats
     
     def _calculate_hit_rate(self, info: dict) -> float:
         """Calculate cache hit rate"""
@@ -0,0 +1,210 @@
+"""
+Semantic Cache
+
+Nearest cached question lookup, so rephrased questions reuse answers
+"""
+
+import redis
+import threading
+import numpy as np
+from functools import lru_cache
+from typing import Callable, Dict, List, Optional, Tuple
+from src.config import get_settings
+import logging
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+
+class _ScopeIndex:
+    """In-process copy of one scope's entries"""
+    
+    def __init__(self):
+        self.hashes: List[str] = []
+        self.vectors: Optional[np.ndarray] = None
+        self.seen = 0  # Entries ever pushed to the scope that this copy reflects
+    
+    def reset(self, hashes: List[str], vectors: Optional[np.ndarray]):
+        self.hashes, self.vectors = hashes, vectors
+    
+    def append(self, hashes: List[str], vectors: np.ndarray, limit: int):
+        if self.vectors is None:
+            self.reset(hashes, vectors)
+        else:
+            self.hashes = self.hashes + hashes
+            self.vectors = np.concatenate((self.vectors, vectors))
+        if len(self.hashes) > limit:
+            self.hashes, self.vectors = self.hashes[-limit:], self.vectors[-limit:]
+
+
+class SemanticCache:
+    """
+    Find the cached question closest to a new one
+    
+    Each scope (language + debug mode) is a Redis list of entries (64-char
+    question hash followed by the normalised float32 embedding), trimmed
+    to the newest `max_entries`, plus a counter of entries ever pushed.
+    Pushes update both atomically, so a process pulls only the entries it
+    has not seen, and an unchanged scope costs one GET per lookup. Matching
+    is a single matrix-vector product over the scope.
+    
+    Question embeddings come from `embed`, which may return None (e.g.
+    while the model is still loading): the tier then simply misses. Each
+    embedding size gets its own entries, and any failure other than a
+    Redis error is a miss.
+    """
+    
+    HASH_SIZE = 64
+    # Extra entries read on incremental syncs to absorb concurrent pushes
+    SYNC_SLACK = 64
+    
+    def __init__(
+        self,
+        client,
+        embed: Callable[[str], Optional[List[float]]],
+        threshold: float = 0.92,
+        max_entries: int = 20000
+    ):
+        """
+        Args:
+            client: Redis client (decode_responses=False)
+            embed: Question text to embedding (None when unavailable)
+            threshold: Minimum cosine similarity for a hit
+            max_entries: Entries kept per scope
+        """
+        self.client = client
+        self.embed = embed
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self._scopes: Dict[str, _ScopeIndex] = {}
+        self._lock = threading.Lock()
+    
+    @staticmethod
+    def scope(language: Optional[str], debug_mode: bool) -> str:
+        return f"{language or 'any'}:{'debug' if debug_mode else 'default'}"
+    
+    def lookup(self, question: str, scope: str) -> Optional[Tuple[str, float]]:
+        """
+        Closest cached question in scope
+        
+        Returns:
+            (question hash, similarity) when above threshold, else None
+        """
+        vector = self._vector(question)
+        if vector is None:
+            return None
+        
+        scope = self._dimension_scope(scope, vector)
+        with self._lock:
+            try:
+                index = self._sync(scope)
+                if index.vectors is None or not len(index.hashes):
+                    return None
+                scores = index.vectors @ vector
+            except redis.RedisError:
+                raise
+            except Exception as e:
+                # Corrupt or foreign entries: rebuild from Redis next time
+                self._scopes.pop(scope, None)
+                logger.warning(f"Semantic cache lookup failed, treating as a miss: {e}")
+                return None
+            best = int(np.argmax(scores))
+            question_hash, similarity = index.hashes[best], float(scores[best])
+        
+        if similarity < self.threshold:
+            return None
+        return question_hash, similarity
+    
+    def add(self, question: str, question_hash: str, scope: str):
+        """Register a cached answer's question under scope"""
+        vector = self._vector(question)
+        if vector is None:
+            return
+        
+        scope = self._dimension_scope(scope, vector)
+        pipe = self.client.pipeline(transaction=True)
+        pipe.rpush(self._list_key(scope), question_hash.encode() + vector.tobytes())
+        pipe.ltrim(self._list_key(scope), -self.max_entries, -1)
+        pipe.incr(self._count_key(scope))
+        pipe.execute()
+    
+    def _vector(self, question: str) -> Optional[np.ndarray]:
+        embedding = self.embed(question)
+        if embedding is None:
+            return None
+        vector = np.asarray(embedding, dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+    
+    def _sync(self, scope: str) -> _ScopeIndex:
+        """Pull entries pushed since the last sync"""
+        index = self._scopes.setdefault(scope, _ScopeIndex())
+        count = int(self.client.get(self._count_key(scope)) or 0)
+        if count == index.seen:
+            return index
+        
+        incremental = 0 < index.seen < count < index.seen + self.max_entries
+        if incremental:
+            count, entries = self._read(scope, count - index.seen + self.SYNC_SLACK)
+            new = count - index.seen
+            if 0 <= new <= len(entries):
+                if new:
+                    index.append(*self._unpack(entries[len(entries) - new:]), self.max_entries)
+                index.seen = count
+                return index
+        
+        # First sync, flushed counter or too far behind: read the whole list
+        count, entries = self._read(scope, 0)
+        if entries:
+            index.reset(*self._unpack(entries))
+        else:
+            index.reset([], None)
+        index.seen = count
+        return index
+    
+    def _read(self, scope: str, tail: int) -> Tuple[int, List[bytes]]:
+        """Counter and the last `tail` entries (0 = all), read atomically"""
+        pipe = self.client.pipeline(transaction=True)
+        pipe.get(self._count_key(scope))
+        pipe.lrange(self._list_key(scope), -tail if tail else 0, -1)
+        count, entries = pipe.execute()
+        return int(count or 0), entries
+    
+    def _unpack(self, entries: List[bytes]) -> Tuple[List[str], np.ndarray]:
+        hashes = [entry[:self.HASH_SIZE].decode() for entry in entries]
+        vectors = np.frombuffer(b"".join(entry[self.HASH_SIZE:] for entry in entries), dtype=np.float32)
+        return hashes, vectors.reshape(len(entries), -1)
+    
+    @staticmethod
+    def _dimension_scope(scope: str, vector: np.ndarray) -> str:
+        """Scope per embedding size, so switching models never mixes vectors"""
+        return f"{scope}:{vector.shape[0]}d"
+    
+    @staticmethod
+    def _list_key(scope: str) -> str:
+        return f"semantic:{scope}"
+    
+    @staticmethod
+    def _count_key(scope: str) -> str:
+        return f"semantic:{scope}:count"
+
+
+def _rag_embedding(question: str) -> Optional[List[float]]:
+    """Embed with the RAG model, once it has loaded"""
+    from src.infrastructure.rag.retrieval_service import get_retrieval_service
+    
+    retrieval = get_retrieval_service()
+    if not retrieval.is_ready:
+        return None
+    return retrieval.embeddings.embed(question)
+
+
+@lru_cache()
+def get_semantic_cache() -> SemanticCache:
+    """Process-wide SemanticCache sharing the RAG embeddings model"""
+    return SemanticCache(
+        redis.from_url(settings.REDIS_URL, decode_responses=False),
+        _rag_embedding,
+        threshold=settings.SEMANTIC_CACHE_THRESHOLD,
+        max_entries=settings.SEMANTIC_CACHE_MAX_ENTRIES
+    )
@@ -0,0 +1,395 @@
+"""
+Single Flight
+
+Coalesce concurrent identical calls, within a process and across replicas
+"""
+
+import redis
+import asyncio
+import json
+import threading
+import time
+from functools import lru_cache
+from typing import Any, Awaitable, Callable, Dict, List, Tuple
+from src.config import get_settings
+from src.infrastructure.monitoring.metrics_service import MetricsService
+import logging
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+# No shared result: the caller runs the call itself
+_MISSING = object()
+# Lock holder still running
+_PENDING = object()
+
+
+class _Call:
+    """A call in flight in this process"""
+    
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+        self.cancelled = False
+        self._futures: List[Tuple[asyncio.AbstractEventLoop, asyncio.Future]] = []
+        self._lock = threading.Lock()
+    
+    def finish(self):
+        with self._lock:
+            self.done.set()
+            futures, self._futures = self._futures, []
+        for loop, future in futures:
+            loop.call_soon_threadsafe(_resolve, future)
+    
+    async def wait_async(self, timeout: float) -> bool:
+        """Wait for finish() without holding a thread; False on timeout"""
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        with self._lock:
+            if self.done.is_set():
+                return True
+            self._futures.append((loop, future))
+        try:
+            await asyncio.wait_for(future, timeout)
+            return True
+        except asyncio.TimeoutError:
+            return self.done.is_set()
+        finally:
+            with self._lock:
+                if (loop, future) in self._futures:
+                    self._futures.remove((loop, future))
+
+
+def _resolve(future: asyncio.Future):
+    if not future.done():
+        future.set_result(None)
+
+
+class _LoopEvent:
+    """threading.Event stand-in for a coroutine: set() from any thread wakes it"""
+    
+    def __init__(self):
+        self._loop = asyncio.get_running_loop()
+        self._future = self._loop.create_future()
+    
+    def set(self):
+        try:
+            self._loop.call_soon_threadsafe(_resolve, self._future)
+        except RuntimeError:
+            pass  # Loop closed; nobody is waiting
+    
+    async def wait(self, timeout: float) -> bool:
+        try:
+            await asyncio.wait_for(asyncio.shield(self._future), timeout)
+            return True
+        except asyncio.TimeoutError:
+            return False
+
+
+class SingleFlight:
+    """
+    Run a call once for all concurrent callers with the same key
+    
+    Callers in the same process wait for the first one (the leader) and
+    share its result or exception. Across replicas, the leader of each
+    process races for a Redis lock; the winner runs the call, stores the
+    result for a short while and publishes it on CHANNEL, and the other
+    replicas' leaders wait for it. Waiters also poll the stored result and
+    the lock, so they neither depend on the publish arriving nor wait
+    long for a leader that died: when the lock disappears without a
+    result, or the wait times out, they run the call themselves, and so do
+    waiters in the same process after wait_timeout. Results must be
+    JSON-serialisable.
+    """
+    
+    CHANNEL = "single_flight:done"
+    POLL_INTERVAL = 0.5
+    
+    def __init__(
+        self,
+        client,
+        lock_ttl: int = 120,
+        wait_timeout: float = 90.0,
+        result_ttl: int = 30,
+        listen: bool = True
+    ):
+        """
+        Args:
+            client: Redis client (decode_responses=True)
+            lock_ttl: Seconds a replica may hold a key (longer than the call)
+            wait_timeout: Seconds to wait for another caller before running the call
+            result_ttl: Seconds a result stays readable for late waiters
+            listen: Start the result listener thread
+        """
+        self.client = client
+        self.lock_ttl = lock_ttl
+        self.wait_timeout = wait_timeout
+        self.result_ttl = result_ttl
+        self._calls: Dict[str, _Call] = {}
+        self._waiters: Dict[str, List[Tuple[threading.Event, dict]]] = {}
+        self._lock = threading.Lock()
+        if listen:
+            threading.Thread(target=self._listen, name="single-flight", daemon=True).start()
+    
+    def do(self, key: str, fn: Callable[[], Any]) -> Tuple[Any, bool]:
+        """
+        Result of fn, shared with concurrent callers of the same key
+        
+        Args:
+            key: Identifies identical calls
+            fn: The call
+        
+        Returns:
+            (result, shared): shared is True when another caller ran fn
+        
+        Raises:
+            Whatever fn raised, in the caller that ran it and its
+            in-process waiters
+        """
+        call, leader = self._join(key)
+        if not leader:
+            if call.done.wait(self.wait_timeout):
+                return self._shared(call)
+            self._leader_timed_out(key)
+            return fn(), False
+        
+        try:
+            call.result, shared = self._run(key, fn)
+            return call.result, shared
+        except Exception as e:
+            call.error = e
+            raise
+        finally:
+            self._leave(key, call)
+    
+    async def ado(self, key: str, fn: Callable[[], Awaitable[Any]]) -> Tuple[Any, bool]:
+        """
+        do() for a coroutine function; waiting never blocks the event loop
+        
+        When the caller running fn is cancelled (e.g. its client went
+        away), its waiters start over instead of failing with it.
+        """
+        deadline = time.monotonic() + self.wait_timeout
+        while True:
+            call, leader = self._join(key)
+            if leader:
+                break
+            if not await call.wait_async(deadline - time.monotonic()):
+                self._leader_timed_out(key)
+                return await fn(), False
+            if not call.cancelled:
+                return self._shared(call)
+        
+        try:
+            call.result, shared = await self._arun(key, fn)
+            return call.result, shared
+        except asyncio.CancelledError:
+            call.cancelled = True
+            raise
+        except Exception as e:
+            call.error = e
+            raise
+        finally:
+            self._leave(key, call)
+    
+    def _join(self, key: str) -> Tuple[_Call, bool]:
+        """The call in flight for key, and whether the caller leads it"""
+        with self._lock:
+            call = self._calls.get(key)
+            if call is not None:
+                return call, False
+            call = self._calls[key] = _Call()
+            return call, True
+    
+    def _leave(self, key: str, call: _Call):
+        with self._lock:
+            del self._calls[key]
+        call.finish()
+    
+    @staticmethod
+    def _leader_timed_out(key: str):
+        """The caller leading key in this process ran past wait_timeout"""
+        logger.warning(f"Single flight leader timed out, running call locally: {key[:8]}...")
+        MetricsService.track_single_flight("fallback")
+    
+    @staticmethod
+    def _shared(call: _Call) -> Tuple[Any, bool]:
+        MetricsService.track_single_flight("shared_local")
+        if call.error is not None:
+            raise call.error
+        return call.result, True
+    
+    def _run(self, key: str, fn: Callable[[], Any]) -> Tuple[Any, bool]:
+        """Run fn under the cross-replica lock, or wait for its holder"""
+        try:
+            owner = self.client.set(self._lock_key(key), "1", nx=True, ex=self.lock_ttl)
+        except redis.RedisError as e:
+            logger.warning(f"Single flight lock failed, running call locally: {e}")
+            return fn(), False
+        
+        if owner:
+            MetricsService.track_single_flight("leader")
+            try:
+                result = fn()
+            except Exception:
+                self._finish(key, None, ok=False)
+                raise
+            self._finish(key, result, ok=True)
+            return result, False
+        
+        result = self._wait(key)
+        if result is not _MISSING:
+            MetricsService.track_single_flight("shared_remote")
+            return result, True
+        
+        MetricsService.track_single_flight("fallback")
+        return fn(), False
+    
+    async def _arun(self, key: str, fn: Callable[[], Awaitable[Any]]) -> Tuple[Any, bool]:
+        """_run for a coroutine function; Redis calls run in the executor"""
+        try:
+            owner = await asyncio.to_thread(self.client.set, self._lock_key(key), "1", nx=True, ex=self.lock_ttl)
+        except redis.RedisError as e:
+            logger.warning(f"Single flight lock failed, running call locally: {e}")
+            return await fn(), False
+        
+        if owner:
+            MetricsService.track_single_flight("leader")
+            try:
+                result = await fn()
+            except BaseException:
+                # Runs to the end in its thread even if cancelled again
+                await asyncio.to_thread(self._finish, key, None, False)
+                raise
+            await asyncio.to_thread(self._finish, key, result, True)
+            return result, False
+        
+        result = await self._await(key)
+        if result is not _MISSING:
+            MetricsService.track_single_flight("shared_remote")
+            return result, True
+        
+        MetricsService.track_single_flight("fallback")
+        return await fn(), False
+    
+    def _finish(self, key: str, result: Any, ok: bool):
+        """Store and publish the result, then release the lock"""
+        try:
+            pipe = self.client.pipeline(transaction=True)
+            if ok:
+                pipe.setex(self._result_key(key), self.result_ttl, json.dumps(result))
+            pipe.publish(self.CHANNEL, json.dumps({"key": key, "ok": ok, "result": result}))
+            pipe.delete(self._lock_key(key))
+            pipe.execute()
+        except (redis.RedisError, TypeError, ValueError) as e:
+            # Waiters run the call themselves once the lock expires
+            logger.warning(f"Single flight result not shared: {e}")
+    
+    def _wait(self, key: str) -> Any:
+        """Result published by the lock holder, or _MISSING"""
+        event, slot = threading.Event(), {}
+        self._add_waiter(key, event, slot)
+        try:
+            deadline = time.monotonic() + self.wait_timeout
+            while time.monotonic() < deadline:
+                if event.wait(self.POLL_INTERVAL):
+                    return self._published(slot)
+                result = self._poll(key)
+                if result is not _PENDING:
+                    return result
+            logger.warning(f"Single flight wait timed out: {key[:8]}...")
+            return _MISSING
+        except redis.RedisError as e:
+            logger.warning(f"Single flight wait failed: {e}")
+            return _MISSING
+        finally:
+            self._remove_waiter(key, event, slot)
+    
+    async def _await(self, key: str) -> Any:
+        """_wait on the event loop, holding a thread only while polling"""
+        event, slot = _LoopEvent(), {}
+        self._add_waiter(key, event, slot)
+        try:
+            deadline = time.monotonic() + self.wait_timeout
+            while time.monotonic() < deadline:
+                if await event.wait(self.POLL_INTERVAL):
+                    return self._published(slot)
+                result = await asyncio.to_thread(self._poll, key)
+                if result is not _PENDING:
+                    return result
+            logger.warning(f"Single flight wait timed out: {key[:8]}...")
+            return _MISSING
+        except redis.RedisError as e:
+            logger.warning(f"Single flight wait failed: {e}")
+            return _MISSING
+        finally:
+            self._remove_waiter(key, event, slot)
+    
+    def _add_waiter(self, key: str, event, slot: dict):
+        with self._lock:
+            self._waiters.setdefault(key, []).append((event, slot))
+    
+    def _remove_waiter(self, key: str, event, slot: dict):
+        with self._lock:
+            waiters = self._waiters.get(key, [])
+            waiters.remove((event, slot))
+            if not waiters:
+                self._waiters.pop(key, None)
+    
+    @staticmethod
+    def _published(slot: dict) -> Any:
+        return slot["result"] if slot["ok"] else _MISSING
+    
+    def _poll(self, key: str) -> Any:
+        """Stored result, _MISSING once the lock is gone without one, else _PENDING"""
+        pipe = self.client.pipeline(transaction=False)
+        pipe.get(self._result_key(key))
+        pipe.exists(self._lock_key(key))
+        stored, locked = pipe.execute()
+        if stored is not None:
+            return json.loads(stored)
+        return _PENDING if locked else _MISSING
+    
+    def _handle(self, message: dict):
+        """Hand a published result to this process's waiters"""
+        if message["type"] != "message":
+            return
+        try:
+            payload = json.loads(message["data"])
+        except (TypeError, ValueError):
+            return
+        with self._lock:
+            waiters = list(self._waiters.get(payload.get("key"), []))
+        for event, slot in waiters:
+            slot.update(ok=payload.get("ok", False), result=payload.get("result"))
+            event.set()
+    
+    def _listen(self):
+        while True:
+            try:
+                pubsub = self.client.pubsub()
+                pubsub.subscribe(self.CHANNEL)
+                for message in pubsub.listen():
+                    self._handle(message)
+            except Exception as e:
+                # Waiters keep polling meanwhile
+                logger.warning(f"Single flight listener disconnected: {e}")
+            time.sleep(self.POLL_INTERVAL)
+    
+    @staticmethod
+    def _lock_key(key: str) -> str:
+        return f"flight:{key}"
+    
+    @staticmethod
+    def _result_key(key: str) -> str:
+        return f"flight:{key}:result"
+
+
+@lru_cache()
+def get_single_flight() -> SingleFlight:
+    """Process-wide SingleFlight for LLM answers"""
+    return SingleFlight(
+        redis.from_url(settings.REDIS_URL, decode_responses=True),
+        wait_timeout=settings.SINGLE_FLIGHT_TIMEOUT
+    )
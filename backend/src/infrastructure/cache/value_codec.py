@@ -0,0 +1,214 @@
+"""
+Value Codec
+
+Versioned, optionally compressed encoding of cached values
+"""
+
+import json
+import threading
+import time
+import zlib
+from functools import lru_cache
+from typing import Any, Union
+from src.config import get_settings
+from src.infrastructure.monitoring.metrics_service import MetricsService
+import logging
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+# Optional speed-ups, used when installed
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+try:
+    import lz4.frame as lz4_frame
+except ImportError:
+    lz4_frame = None
+
+
+class CodecError(ValueError):
+    """Stored value uses a format this process cannot decode"""
+
+
+class ValueCodec:
+    """
+    Encode cached values as MAGIC, a format byte and the payload
+    
+    The format byte names the serializer (high nibble) and compressor
+    (low nibble), so values written by replicas with other optional
+    libraries installed, or before the codec existed (plain JSON, which
+    never starts with MAGIC), still decode. Payloads are compressed only
+    from `threshold` bytes on, and stored compressed only when smaller.
+    """
+    
+    MAGIC = 0xFF  # Never appears in UTF-8, so never starts legacy JSON
+    
+    SERIALIZERS = {"json": 0x10, "msgpack": 0x20}
+    COMPRESSORS = {"none": 0x0, "zlib": 0x1, "zstd": 0x2, "lz4": 0x3}
+    
+    def __init__(self, serializer: str = "auto", compressor: str = "auto", threshold: int = 1024):
+        """
+        Args:
+            serializer: json, msgpack or auto (msgpack when installed; json
+                uses orjson when installed)
+            compressor: zstd, lz4, zlib, none or auto (best installed)
+            threshold: Smallest serialized size that is compressed
+        
+        Raises:
+            ValueError: Unknown or unavailable serializer/compressor
+        """
+        if serializer == "auto":
+            serializer = "msgpack" if msgpack is not None else "json"
+        if compressor == "auto":
+            compressor = "zstd" if zstandard is not None else "lz4" if lz4_frame is not None else "zlib"
+        if serializer not in self.SERIALIZERS or compressor not in self.COMPRESSORS:
+            raise ValueError(f"Unknown cache codec: {serializer}/{compressor}")
+        if not self._available(serializer, compressor):
+            raise ValueError(f"Cache codec {serializer}/{compressor} is not installed")
+        
+        self.serializer = serializer
+        self.compressor = compressor
+        self.threshold = threshold
+        self._counts = {"encoded": 0, "decoded": 0, "legacy": 0, "raw_bytes": 0, "stored_bytes": 0}
+        self._seconds = {"encode": 0.0, "decode": 0.0}
+        self._lock = threading.Lock()
+    
+    @property
+    def name(self) -> str:
+        return f"{self.serializer}+{self.compressor}"
+    
+    def encode(self, value: Any) -> bytes:
+        """Serialize and, above the threshold, compress value"""
+        start = time.perf_counter()
+        payload = self._serialize(value)
+        raw_size = len(payload)
+        compressor = "none"
+        if self.compressor != "none" and raw_size >= self.threshold:
+            compressed = self._compress(payload)
+            if len(compressed) < raw_size:
+                payload, compressor = compressed, self.compressor
+        
+        fmt = self.SERIALIZERS[self.serializer] | self.COMPRESSORS[compressor]
+        encoded = bytes((self.MAGIC, fmt)) + payload
+        duration = time.perf_counter() - start
+        with self._lock:
+            self._counts["encoded"] += 1
+            self._counts["raw_bytes"] += raw_size
+            self._counts["stored_bytes"] += len(encoded)
+            self._seconds["encode"] += duration
+        MetricsService.track_cache_codec("encode", duration, raw_size, len(encoded))
+        return encoded
+    
+    def decode(self, data: Union[str, bytes]) -> Any:
+        """
+        Value from encode() output or a legacy JSON string
+        
+        Raises:
+            CodecError: Unknown format, missing library or corrupt payload
+        """
+        start = time.perf_counter()
+        legacy = isinstance(data, str) or not data or data[0] != self.MAGIC
+        try:
+            if legacy:
+                value = json.loads(data)
+            else:
+                value = self._decode_versioned(data)
+        except CodecError:
+            raise
+        except Exception as e:
+            raise CodecError(f"Corrupt cache value: {e}") from e
+        
+        duration = time.perf_counter() - start
+        with self._lock:
+            self._counts["decoded"] += 1
+            self._counts["legacy"] += legacy
+            self._seconds["decode"] += duration
+        MetricsService.track_cache_codec("decode", duration)
+        return value
+    
+    def stats(self) -> dict:
+        """Compression ratio and mean timings since start"""
+        with self._lock:
+            counts, seconds = dict(self._counts), dict(self._seconds)
+        return {
+            "codec": self.name,
+            "encoded": counts["encoded"],
+            "decoded": counts["decoded"],
+            "legacy_decoded": counts["legacy"],
+            "compression_ratio": round(counts["raw_bytes"] / counts["stored_bytes"], 3) if counts["stored_bytes"] else 1.0,
+            "avg_encode_us": round(seconds["encode"] / counts["encoded"] * 1e6, 1) if counts["encoded"] else 0.0,
+            "avg_decode_us": round(seconds["decode"] / counts["decoded"] * 1e6, 1) if counts["decoded"] else 0.0
+        }
+    
+    def _decode_versioned(self, data: bytes) -> Any:
+        if len(data) < 2:
+            raise CodecError("Truncated cache value")
+        fmt = data[1]
+        serializer = self._name(self.SERIALIZERS, fmt & 0xF0)
+        compressor = self._name(self.COMPRESSORS, fmt & 0x0F)
+        if not self._available(serializer, compressor):
+            raise CodecError(f"Cache value uses {serializer}/{compressor}, which is not installed")
+        
+        payload = data[2:]
+        if compressor == "zlib":
+            payload = zlib.decompress(payload)
+        elif compressor == "zstd":
+            payload = zstandard.ZstdDecompressor().decompress(payload)
+        elif compressor == "lz4":
+            payload = lz4_frame.decompress(payload)
+        
+        if serializer == "msgpack":
+            return msgpack.unpackb(payload, raw=False)
+        return orjson.loads(payload) if orjson is not None else json.loads(payload)
+    
+    def _serialize(self, value: Any) -> bytes:
+        if self.serializer == "msgpack":
+            return msgpack.packb(value, use_bin_type=True)
+        if orjson is not None:
+            return orjson.dumps(value)
+        return json.dumps(value, separators=(",", ":")).encode()
+    
+    def _compress(self, payload: bytes) -> bytes:
+        if self.compressor == "zstd":
+            return zstandard.ZstdCompressor(level=3).compress(payload)
+        if self.compressor == "lz4":
+            return lz4_frame.compress(payload)
+        return zlib.compress(payload, 6)
+    
+    @staticmethod
+    def _name(table: dict, code: int) -> str:
+        for name, value in table.items():
+            if value == code:
+                return name
+        raise CodecError(f"Unknown cache value format: {code:#x}")
+    
+    @staticmethod
+    def _available(serializer: str, compressor: str) -> bool:
+        return not (
+            (serializer == "msgpack" and msgpack is None)
+            or (compressor == "zstd" and zstandard is None)
+            or (compressor == "lz4" and lz4_frame is None)
+        )
+
+
+@lru_cache()
+def get_value_codec() -> ValueCodec:
+    """Process-wide ValueCodec (its stats cover every CacheService)"""
+    return ValueCodec(
+        serializer=settings.CACHE_CODEC_SERIALIZER,
+        compressor=settings.CACHE_CODEC_COMPRESSOR,
+        threshold=settings.CACHE_CODEC_THRESHOLD
+    )
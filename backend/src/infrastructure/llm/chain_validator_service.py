@@ -1,49 +1,202 @@
+import asyncio
+import time
+from functools import lru_cache
+from typing import AsyncIterator
 from src.infrastructure.llm.junior_llm_service import JuniorLLMService
 from src.infrastructure.llm.senior_llm_service import SeniorLLMService
 from src.infrastructure.identity import (
     MODEL_JUNIOR, MODEL_SENIOR, MODEL_DEBUG,
     get_public_model_name, sanitize_log
 )
+from src.infrastructure.monitoring.metrics_service import MetricsService
+from src.infrastructure.rag.retrieval_service import RetrievalService, get_retrieval_service
 import logging
 
 logger = logging.getLogger(__name__)
 
 class ChainValidatorService:
-    def __init__(self):
-        self.junior = JuniorLLMService()
-        self.senior = SeniorLLMService()
+    def __init__(self, junior: JuniorLLMService = None, senior: SeniorLLMService = None, retrieval: RetrievalService = None):
+        self.junior = junior or JuniorLLMService()
+        self.senior = senior or SeniorLLMService()
+        self.retrieval = retrieval or get_retrieval_service()
     
     def generate_answer(self, question: str, conversation_history: list = None, debug_mode: bool = False, language: str = "pt-BR") -> dict:
         logger.info(sanitize_log(f"Processing question: {question[:50]}... [DEBUG={debug_mode}] [LANG={language}]"))
+        question = self._with_context(question)
         
         # Debug Mode: Sempre usa Senior com prompt especializado
         if debug_mode:
             logger.info("Debug Mode activated - using Senior directly")
-            senior_result = self.senior.generate_debug(question, conversation_history, language)
-            return {
-                "content": senior_result["content"],
-                "model": get_public_model_name(MODEL_DEBUG),
-                "used_senior": True
-            }
+            return self._debug_answer(self.senior.generate_debug(question, conversation_history, language))
         
         # Junior responde primeiro
         junior_result = self.junior.generate(question, conversation_history, language)
         
         # Se confidence alta, retorna direto
         if not junior_result["needs_validation"]:
-            logger.info(f"High confidence ({junior_result['confidence']}%) - skipping Senior")
-            return {
-                "content": junior_result["content"],
-                "model": get_public_model_name(MODEL_JUNIOR),
-                "used_senior": False
-            }
+            return self._junior_answer(junior_result)
         
         # Se confidence baixa, Senior valida
         logger.info(f"Low confidence ({junior_result['confidence']}%) - calling Senior")
-        senior_result = self.senior.validate(question, junior_result["content"], conversation_history, language)
+        return self._senior_answer(self.senior.validate(question, junior_result["content"], conversation_history, language))
+    
+    async def agenerate_answer(
+        self,
+        question: str,
+        conversation_history: list = None,
+        debug_mode: bool = False,
+        language: str = "pt-BR",
+        speculative: bool = False
+    ) -> dict:
+        """
+        generate_answer on the async provider clients (for async handlers)
+        
+        Args:
+            speculative: Start a direct Senior answer alongside Junior instead
+                of validating after it (see _aspeculate)
+        """
+        logger.info(sanitize_log(f"Processing question: {question[:50]}... [DEBUG={debug_mode}] [LANG={language}]"))
+        question = await asyncio.to_thread(self._with_context, question)
+        
+        if debug_mode:
+            logger.info("Debug Mode activated - using Senior directly")
+            return self._debug_answer(await self.senior.agenerate_debug(question, conversation_history, language))
+        
+        if speculative:
+            return await self._aspeculate(question, conversation_history, language)
+        
+        junior_result = await self.junior.agenerate(question, conversation_history, language)
+        
+        if not junior_result["needs_validation"]:
+            return self._junior_answer(junior_result)
+        
+        logger.info(f"Low confidence ({junior_result['confidence']}%) - calling Senior")
+        return self._senior_answer(await self.senior.avalidate(question, junior_result["content"], conversation_history, language))
+    
+    async def _aspeculate(self, question: str, conversation_history: list, language: str) -> dict:
+        """
+        Race Junior against a direct Senior answer and cancel the loser
+        
+        Junior finishing first with high confidence cancels Senior; Senior
+        finishing first is used as is and cancels Junior. Latency is the
+        faster of the two instead of Junior plus Senior, at the cost of
+        Senior tokens whenever Junior would have been enough. The SDK's
+        async client runs requests in worker threads, so a cancelled
+        request still completes and is billed; only the wait is saved.
+        """
+        junior = asyncio.create_task(self.junior.agenerate(question, conversation_history, language))
+        senior = asyncio.create_task(self.senior.agenerate(question, conversation_history, language))
+        try:
+            done, _ = await asyncio.wait((junior, senior), return_when=asyncio.FIRST_COMPLETED)
+            
+            if senior in done and senior.result()["validated"]:
+                MetricsService.track_speculation("senior_won")
+                return self._senior_answer(senior.result())
+            
+            junior_result = await junior
+            if not junior_result["needs_validation"]:
+                MetricsService.track_speculation("junior_won")
+                return self._junior_answer(junior_result)
+            
+            logger.info(f"Low confidence ({junior_result['confidence']}%) - using speculative Senior")
+            senior_result = await senior
+            if senior_result["validated"]:
+                MetricsService.track_speculation("senior_needed")
+                return self._senior_answer(senior_result)
+            
+            MetricsService.track_speculation("fallback")
+            return self._senior_answer(await self.senior.avalidate(question, junior_result["content"], conversation_history, language))
+        finally:
+            for task in (junior, senior):
+                task.cancel()
+    
+    async def astream_answer(self, question: str, conversation_history: list = None, debug_mode: bool = False, language: str = "pt-BR") -> AsyncIterator[dict]:
+        """
+        agenerate_answer as events, streamed from the provider
+        
+        Yields {"type": "start", "model"}, then {"type": "delta", "content"}
+        per text chunk, then {"type": "done", "content", "model",
+        "used_senior", "incomplete"} with the full text. Senior validation
+        needs the whole draft, so streamed answers come from Junior (or
+        from Senior in debug mode) unreviewed. When the provider fails,
+        "done" carries the text sent so far (or, if nothing was sent, an
+        error message sent as the only delta) with incomplete set, so it
+        is not cached.
+        """
+        logger.info(sanitize_log(f"Streaming question: {question[:50]}... [DEBUG={debug_mode}] [LANG={language}]"))
+        question = await asyncio.to_thread(self._with_context, question)
+        
+        if debug_mode:
+            model, chunks = MODEL_DEBUG, self.senior.astream_debug(question, conversation_history, language)
+        else:
+            model, chunks = MODEL_JUNIOR, self.junior.astream(question, conversation_history, language)
         
+        model = get_public_model_name(model)
+        yield {"type": "start", "model": model}
+        
+        parts, incomplete = [], False
+        try:
+            async for text in chunks:
+                parts.append(text)
+                yield {"type": "delta", "content": text}
+        except Exception as e:
+            logger.error(sanitize_log(f"Stream interrupted after {len(parts)} chunks: {e}"))
+            incomplete = True
+            if not parts:
+                parts.append(f"Erro: {str(e)}")
+                yield {"type": "delta", "content": parts[0]}
+        
+        yield {"type": "done", "content": "".join(parts), "model": model, "used_senior": debug_mode, "incomplete": incomplete}
+    
+    def _with_context(self, question: str) -> str:
+        """
+        Question prefixed with relevant indexed documentation
+        
+        RAG is best effort: while it is disabled or loading, or when
+        retrieval fails, the question is sent as is. Blocking (embedding
+        and search), so async callers run it in a worker thread.
+        """
+        try:
+            context = self.retrieval.build_context(question)
+        except Exception as e:
+            logger.warning(f"RAG context unavailable: {e}")
+            return question
+        return f"{context}\n\n{question}" if context else question
+    
+    @staticmethod
+    def _debug_answer(senior_result: dict) -> dict:
+        return {
+            "content": senior_result["content"],
+            "model": get_public_model_name(MODEL_DEBUG),
+            "used_senior": True
+        }
+    
+    @staticmethod
+    def _junior_answer(junior_result: dict) -> dict:
+        logger.info(f"High confidence ({junior_result['confidence']}%) - skipping Senior")
+        return {
+            "content": junior_result["content"],
+            "model": get_public_model_name(MODEL_JUNIOR),
+            "used_senior": False
+        }
+    
+    @staticmethod
+    def _senior_answer(senior_result: dict) -> dict:
         return {
             "content": senior_result["content"],
             "model": get_public_model_name(MODEL_SENIOR),
             "used_senior": True
         }
+
+
+@lru_cache()
+def _shared_llm_service() -> ChainValidatorService:
+    return ChainValidatorService()
+
+
+def get_llm_service() -> ChainValidatorService:
+    """FastAPI dependency: the process-wide ChainValidatorService"""
+    start = time.perf_counter()
+    service = _shared_llm_service()
+    MetricsService.track_llm_setup(time.perf_counter() - start)
+    return service
@@ -0,0 +1,134 @@
+"""
+LLM Client Registry
+
+Process-wide provider clients that reuse pooled keep-alive connections
+"""
+
+import asyncio
+import json
+import requests
+import threading
+from functools import lru_cache
+from typing import AsyncIterator, Callable, Iterator, TypeVar
+from google import genai
+from google.genai import errors
+from google.genai._api_client import ApiClient, HttpRequest, HttpResponse
+from requests.adapters import HTTPAdapter
+from src.config import get_settings
+import logging
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+T = TypeVar("T")
+
+# Marks the end of a stream_in_thread queue
+_END = object()
+
+
+class _PooledApiClient(ApiClient):
+    """
+    ApiClient sending API-key requests over one pooled requests.Session
+    
+    Overrides a private SDK method, so google-genai is pinned in
+    requirements.txt; check this class when upgrading it.
+    """
+    
+    def __init__(self, *args, pool_size: int = 20, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+    
+    def _request_unauthorized(self, http_request: HttpRequest, stream: bool = False) -> HttpResponse:
+        # Same as the SDK's, which opens a new Session (and TLS connection)
+        # per call; the async client runs this in worker threads, and a
+        # Session's connection pool is safe to share between them
+        data = http_request.data
+        if data and not isinstance(data, bytes):
+            data = json.dumps(data)
+        response = self.session.request(
+            method=http_request.method,
+            url=http_request.url,
+            headers=http_request.headers,
+            data=data or None,
+            timeout=http_request.timeout,
+            stream=stream
+        )
+        errors.APIError.raise_for_response(response)
+        return HttpResponse(response.headers, response if stream else [response.text])
+
+
+class PooledClient(genai.Client):
+    """genai.Client whose sync and async calls share a keep-alive connection pool"""
+    
+    def __init__(self, *, pool_size: int = 20, **kwargs):
+        """
+        Args:
+            pool_size: Connections kept open to the provider
+            **kwargs: genai.Client arguments
+        """
+        self._pool_size = pool_size
+        super().__init__(**kwargs)
+    
+    def _get_api_client(self, debug_config=None, **kwargs):
+        if debug_config and debug_config.client_mode in ("record", "replay", "auto"):
+            return genai.Client._get_api_client(debug_config=debug_config, **kwargs)
+        return _PooledApiClient(pool_size=self._pool_size, **kwargs)
+
+
+@lru_cache()
+def get_llm_client() -> PooledClient:
+    """Process-wide provider client shared by the Junior and Senior services"""
+    logger.info(f"Creating LLM provider client (pool size {settings.LLM_HTTP_POOL_SIZE})")
+    return PooledClient(api_key=settings.GEMINI_API_KEY, pool_size=settings.LLM_HTTP_POOL_SIZE)
+
+
+async def stream_in_thread(start: Callable[[], Iterator[T]]) -> AsyncIterator[T]:
+    """
+    Items of a blocking iterator, read on a dedicated thread
+    
+    The SDK's async streams read the HTTP response with blocking calls on
+    the event loop, stalling every other request for the whole generation.
+    Here a producer thread (not the shared default executor, which the
+    SDK's other async calls need) runs start() and iterates it, handing
+    items to the loop. Whatever start() or the iterator raises is raised
+    here. When the consumer stops early, the producer stops at the next
+    item.
+    
+    Args:
+        start: Opens the stream, e.g. a client.models.generate_content_stream call
+    """
+    loop = asyncio.get_running_loop()
+    queue: asyncio.Queue = asyncio.Queue()
+    stop = threading.Event()
+    
+    def hand_over(item, error=None):
+        try:
+            loop.call_soon_threadsafe(queue.put_nowait, (item, error))
+        except RuntimeError:
+            stop.set()  # Loop closed
+    
+    def produce():
+        try:
+            for item in start():
+                if stop.is_set():
+                    return
+                hand_over(item)
+        except Exception as e:
+            hand_over(_END, e)
+            return
+        hand_over(_END)
+    
+    threading.Thread(target=produce, name="llm-stream", daemon=True).start()
+    try:
+        while True:
+            item, error = await queue.get()
+            if error is not None:
+                raise error
+            if item is _END:
+                return
+            yield item
+    finally:
+        stop.set()
@@ -0,0 +1,80 @@
+"""
+Confidence Estimator
+
+Cheap 0-100 confidence score for Junior answers, deciding Senior validation
+"""
+
+import ast
+import math
+import re
+from typing import Optional, Tuple
+from google.genai import types
+
+# Score when the provider returns no log-probs
+HEURISTIC_BASE = 85
+
+MIN_ANSWER_CHARS = 40
+SHORT_ANSWER_PENALTY = 40
+TRUNCATED_PENALTY = 30
+UNCLOSED_CODE_PENALTY = 20
+SYNTAX_ERROR_PENALTY = 25
+
+PYTHON_LABELS = {"python", "python3", "py"}
+CODE_BLOCK = re.compile(r"```([\w+-]*)[^\n]*\n(.*?)```", re.DOTALL)
+
+
+def provider_signals(response) -> Tuple[Optional[float], bool]:
+    """
+    (avg_logprobs, truncated) of a generate_content response
+    
+    avg_logprobs is None when the provider or model does not return it.
+    """
+    candidates = getattr(response, "candidates", None)
+    if not isinstance(candidates, list) or not candidates:
+        return None, False
+    
+    candidate = candidates[0]
+    avg_logprobs = candidate.avg_logprobs if isinstance(candidate.avg_logprobs, (int, float)) else None
+    return avg_logprobs, candidate.finish_reason == types.FinishReason.MAX_TOKENS
+
+
+def estimate_confidence(text: str, avg_logprobs: Optional[float] = None, truncated: bool = False) -> int:
+    """
+    Confidence (0-100) that an answer needs no review
+    
+    Starts from the mean token probability (exp of avg_logprobs) when
+    available, else HEURISTIC_BASE, and subtracts penalties for answers
+    that are very short, cut off at the token limit, leave a code block
+    open, or contain Python blocks that do not parse.
+    
+    Args:
+        text: Answer text
+        avg_logprobs: Mean token log-probability from the provider
+        truncated: Generation stopped at max_output_tokens
+    """
+    if avg_logprobs is not None:
+        score = 100 * math.exp(min(avg_logprobs, 0.0))
+    else:
+        score = HEURISTIC_BASE
+    
+    stripped = (text or "").strip()
+    if len(stripped) < MIN_ANSWER_CHARS:
+        score -= SHORT_ANSWER_PENALTY
+    if truncated:
+        score -= TRUNCATED_PENALTY
+    if stripped.count("```") % 2:
+        score -= UNCLOSED_CODE_PENALTY
+    
+    for label, code in CODE_BLOCK.findall(stripped):
+        if label.lower() in PYTHON_LABELS and not _parses(code):
+            score -= SYNTAX_ERROR_PENALTY
+    
+    return int(max(0, min(100, round(score))))
+
+
+def _parses(code: str) -> bool:
+    try:
+        ast.parse(code)
+        return True
+    except (SyntaxError, ValueError):
+        return False
@@ -1,6 +1,9 @@
-from google import genai
+from typing import AsyncIterator
 from google.genai import types
 from src.config import get_settings
+from src.infrastructure.llm.client_registry import get_llm_client, stream_in_thread
+from src.infrastructure.llm.confidence import estimate_confidence, provider_signals
+from src.infrastructure.monitoring.metrics_service import MetricsService
 from src.infrastructure.identity import (
     PRODUCT_NAME, COMPANY_NAME, MODEL_JUNIOR,
     get_provider_model, sanitize_log
@@ -11,8 +14,8 @@ logger = logging.getLogger(__name__)
 settings = get_settings()
 
 class JuniorLLMService:
-    def __init__(self):
-        self.client = genai.Client(api_key=settings.GEMINI_API_KEY)
+    def __init__(self, client=None):
+        self.client = client or get_llm_client()
         self.model_name = get_provider_model(MODEL_JUNIOR)
         self.system_instruction = f"""Você é o {PRODUCT_NAME}, um assistente de programação criado pela {COMPANY_NAME}.
 
@@ -29,40 +32,71 @@ Você é {PRODUCT_NAME}, criada pela {COMPANY_NAME}."""
     
     def generate(self, question: str, conversation_history: list = None, language: str = "pt-BR") -> dict:
         try:
-            # Mapeia idioma para instrução
-            lang_instruction = {
-                "pt-BR": "Responda em Português do Brasil.",
-                "en-US": "Answer in English.",
-                "es-ES": "Responde en Español."
-            }.get(language, "Responda em Português do Brasil.")
+            response = self.client.models.generate_content(**self._request(question, language))
+            return self._result(response)
             
-            system_with_lang = f"{self.system_instruction}\n\n{lang_instruction}"
-            
-            response = self.client.models.generate_content(
-                model=self.model_name,
-                contents=question,
-                config=types.GenerateContentConfig(
-                    temperature=0.7,
-                    top_p=0.95,
-                    top_k=40,
-                    max_output_tokens=2048,
-                    system_instruction=system_with_lang
-                )
-            )
-            
-            content = response.text
-            confidence = 95
-            
-            return {
-                "content": content,
-                "confidence": confidence,
-                "needs_validation": False
-            }
+        except Exception as e:
+            return self._error(e)
+    
+    async def agenerate(self, question: str, conversation_history: list = None, language: str = "pt-BR") -> dict:
+        """generate on the SDK's async client, without blocking the event loop"""
+        try:
+            response = await self.client.aio.models.generate_content(**self._request(question, language))
+            return self._result(response)
             
         except Exception as e:
-            logger.error(sanitize_log(f"Junior LLM error: {e}"))
-            return {
-                "content": f"Erro: {str(e)}",
-                "confidence": 0,
-                "needs_validation": False
-            }
+            return self._error(e)
+    
+    async def astream(self, question: str, conversation_history: list = None, language: str = "pt-BR") -> AsyncIterator[str]:
+        """
+        agenerate as text chunks, as the provider produces them
+        
+        Raises:
+            Exception: The provider failed, before or during the answer
+        """
+        request = self._request(question, language)
+        async for chunk in stream_in_thread(lambda: self.client.models.generate_content_stream(**request)):
+            if chunk.text:
+                yield chunk.text
+    
+    def _request(self, question: str, language: str) -> dict:
+        # Mapeia idioma para instrução
+        lang_instruction = {
+            "pt-BR": "Responda em Português do Brasil.",
+            "en-US": "Answer in English.",
+            "es-ES": "Responde en Español."
+        }.get(language, "Responda em Português do Brasil.")
+        
+        system_with_lang = f"{self.system_instruction}\n\n{lang_instruction}"
+        
+        return {
+            "model": self.model_name,
+            "contents": question,
+            "config": types.GenerateContentConfig(
+                temperature=0.7,
+                top_p=0.95,
+                top_k=40,
+                max_output_tokens=2048,
+                system_instruction=system_with_lang
+            )
+        }
+    
+    def _result(self, response) -> dict:
+        content = response.text
+        avg_logprobs, truncated = provider_signals(response)
+        confidence = estimate_confidence(content, avg_logprobs, truncated)
+        MetricsService.track_junior_confidence(confidence, "heuristic" if avg_logprobs is None else "logprobs")
+        
+        return {
+            "content": content,
+            "confidence": confidence,
+            "needs_validation": confidence < settings.CONFIDENCE_THRESHOLD
+        }
+    
+    def _error(self, e: Exception) -> dict:
+        logger.error(sanitize_log(f"Junior LLM error: {e}"))
+        return {
+            "content": f"Erro: {str(e)}",
+            "confidence": 0,
+            "needs_validation": False
+        }
@@ -1,6 +1,7 @@
-from google import genai
+from typing import AsyncIterator
 from google.genai import types
 from src.config import get_settings
+from src.infrastructure.llm.client_registry import get_llm_client, stream_in_thread
 from src.infrastructure.identity import (
     PRODUCT_NAME, COMPANY_NAME, MODEL_SENIOR, MODEL_DEBUG,
     get_provider_model, sanitize_log
@@ -11,8 +12,8 @@ logger = logging.getLogger(__name__)
 settings = get_settings()
 
 class SeniorLLMService:
-    def __init__(self):
-        self.client = genai.Client(api_key=settings.GEMINI_API_KEY)
+    def __init__(self, client=None):
+        self.client = client or get_llm_client()
         self.model_name = get_provider_model(MODEL_SENIOR)
         self.debug_model_name = get_provider_model(MODEL_DEBUG)
         
@@ -47,76 +48,144 @@ Você é {PRODUCT_NAME}, criada pela {COMPANY_NAME}."""
     
     def validate(self, question: str, junior_response: str, conversation_history: list = None, language: str = "pt-BR") -> dict:
         try:
-            lang_instruction = {
-                "pt-BR": "Responda em Português do Brasil.",
-                "en-US": "Answer in English.",
-                "es-ES": "Responde en Español."
-            }.get(language, "Responda em Português do Brasil.")
+            response = self.client.models.generate_content(**self._validate_request(question, junior_response, language))
+            return self._validate_result(response)
             
-            system_with_lang = f"{self.system_instruction}\n\n{lang_instruction}"
-            
-            prompt = f"""Pergunta original: {question}
-
-Resposta inicial: {junior_response}
-
-Revise e melhore esta resposta se necessário. Se estiver boa, confirme. Se precisar melhorar, forneça a versão aprimorada."""
-            
-            response = self.client.models.generate_content(
-                model=self.model_name,
-                contents=prompt,
-                config=types.GenerateContentConfig(
-                    temperature=0.3,
-                    top_p=0.95,
-                    top_k=40,
-                    max_output_tokens=4096,
-                    system_instruction=system_with_lang
-                )
-            )
-            
-            logger.info("Senior validation completed")
+        except Exception as e:
+            return self._validate_error(e, junior_response)
+    
+    async def avalidate(self, question: str, junior_response: str, conversation_history: list = None, language: str = "pt-BR") -> dict:
+        """validate on the SDK's async client, without blocking the event loop"""
+        try:
+            response = await self.client.aio.models.generate_content(**self._validate_request(question, junior_response, language))
+            return self._validate_result(response)
             
-            return {
-                "content": response.text,
-                "validated": True
-            }
+        except Exception as e:
+            return self._validate_error(e, junior_response)
+    
+    async def agenerate(self, question: str, conversation_history: list = None, language: str = "pt-BR") -> dict:
+        """Answer directly, without a Junior draft (speculative execution)"""
+        try:
+            response = await self.client.aio.models.generate_content(**self._answer_request(question, language))
+            return self._validate_result(response)
             
         except Exception as e:
-            logger.error(sanitize_log(f"Senior LLM error: {e}"))
-            return {
-                "content": junior_response,
-                "validated": False
-            }
+            return self._validate_error(e, "")
     
     def generate_debug(self, question: str, conversation_history: list = None, language: str = "pt-BR") -> dict:
         """Modo Debug: Análise técnica profunda para programação"""
         try:
-            lang_instruction = {
-                "pt-BR": "Responda em Português do Brasil.",
-                "en-US": "Answer in English.",
-                "es-ES": "Responde en Español."
-            }.get(language, "Responda em Português do Brasil.")
-            
-            system_with_lang = f"{self.debug_instruction}\n\n{lang_instruction}"
+            response = self.client.models.generate_content(**self._debug_request(question, language))
+            return self._debug_result(response)
             
-            response = self.client.models.generate_content(
-                model=self.debug_model_name,
-                contents=question,
-                config=types.GenerateContentConfig(
-                    temperature=0.2,
-                    top_p=0.95,
-                    top_k=40,
-                    max_output_tokens=8192,
-                    system_instruction=system_with_lang
-                )
-            )
-            
-            logger.info("Debug mode generation completed")
+        except Exception as e:
+            logger.error(sanitize_log(f"Debug LLM error: {e}"))
+            return self.validate(question, "", conversation_history)
+    
+    async def agenerate_debug(self, question: str, conversation_history: list = None, language: str = "pt-BR") -> dict:
+        """generate_debug on the SDK's async client"""
+        try:
+            response = await self.client.aio.models.generate_content(**self._debug_request(question, language))
+            return self._debug_result(response)
             
-            return {
-                "content": response.text,
-                "debug_mode": True
-            }
+        except Exception as e:
+            logger.error(sanitize_log(f"Debug LLM error: {e}"))
+            return await self.avalidate(question, "", conversation_history)
+    
+    async def astream_debug(self, question: str, conversation_history: list = None, language: str = "pt-BR") -> AsyncIterator[str]:
+        """
+        agenerate_debug as text chunks, as the provider produces them
+        
+        Falls back to a non-streamed Senior answer when the debug model
+        fails before sending anything.
+        
+        Raises:
+            Exception: The provider failed during the answer, or the
+                fallback failed too
+        """
+        request = self._debug_request(question, language)
+        produced = False
+        try:
+            async for chunk in stream_in_thread(lambda: self.client.models.generate_content_stream(**request)):
+                if chunk.text:
+                    produced = True
+                    yield chunk.text
             
         except Exception as e:
             logger.error(sanitize_log(f"Debug LLM error: {e}"))
-            return self.validate(question, "", conversation_history)
+            if produced:
+                raise
+            fallback = await self.avalidate(question, "", conversation_history)
+            if not fallback["validated"]:
+                raise
+            yield fallback["content"]
+    
+    @staticmethod
+    def _lang_instruction(language: str) -> str:
+        return {
+            "pt-BR": "Responda em Português do Brasil.",
+            "en-US": "Answer in English.",
+            "es-ES": "Responde en Español."
+        }.get(language, "Responda em Português do Brasil.")
+    
+    def _validate_request(self, question: str, junior_response: str, language: str) -> dict:
+        prompt = f"""Pergunta original: {question}
+
+Resposta inicial: {junior_response}
+
+Revise e melhore esta resposta se necessário. Se estiver boa, confirme. Se precisar melhorar, forneça a versão aprimorada."""
+        
+        return self._answer_request(prompt, language)
+    
+    def _answer_request(self, contents: str, language: str) -> dict:
+        system_with_lang = f"{self.system_instruction}\n\n{self._lang_instruction(language)}"
+        
+        return {
+            "model": self.model_name,
+            "contents": contents,
+            "config": types.GenerateContentConfig(
+                temperature=0.3,
+                top_p=0.95,
+                top_k=40,
+                max_output_tokens=4096,
+                system_instruction=system_with_lang
+            )
+        }
+    
+    def _validate_result(self, response) -> dict:
+        logger.info("Senior validation completed")
+        
+        return {
+            "content": response.text,
+            "validated": True
+        }
+    
+    def _validate_error(self, e: Exception, junior_response: str) -> dict:
+        logger.error(sanitize_log(f"Senior LLM error: {e}"))
+        return {
+            "content": junior_response,
+            "validated": False
+        }
+    
+    def _debug_request(self, question: str, language: str) -> dict:
+        system_with_lang = f"{self.debug_instruction}\n\n{self._lang_instruction(language)}"
+        
+        return {
+            "model": self.debug_model_name,
+            "contents": question,
+            "config": types.GenerateContentConfig(
+                temperature=0.2,
+                top_p=0.95,
+                top_k=40,
+                max_output_tokens=8192,
+                system_instruction=system_with_lang
+            )
+        }
+    
+    def _debug_result(self, response) -> dict:
+        logger.info("Debug mode generation completed")
+        
+        return {
+            "content": response.text,
+            "debug_mode": True
+        }
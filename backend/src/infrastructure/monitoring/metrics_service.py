@@ -29,6 +29,32 @@ request_duration = Histogram(
     ['model', 'endpoint']
 )
 
+time_to_first_token = Histogram(
+    'cerberus_time_to_first_token_seconds',
+    'Time from request to the first streamed answer token',
+    ['model', 'endpoint'],
+    buckets=(0.1, 0.25, 0.5, 0.75, 1.0, 1.5, 2.0, 3.0, 5.0, 10.0)
+)
+
+llm_setup_duration = Histogram(
+    'cerberus_llm_setup_seconds',
+    'Per-request time to obtain the LLM service and its provider clients',
+    buckets=(0.00001, 0.0001, 0.001, 0.01, 0.05, 0.1, 0.5, 1.0)
+)
+
+junior_confidence = Histogram(
+    'cerberus_junior_confidence',
+    'Estimated confidence of Junior answers (below CONFIDENCE_THRESHOLD goes to Senior)',
+    ['source'],
+    buckets=(10, 20, 30, 40, 50, 60, 70, 80, 90, 100)
+)
+
+speculative_answers = Counter(
+    'cerberus_speculative_answers_total',
+    'Speculative Junior+Senior answers by which result was used',
+    ['outcome']
+)
+
 # Cache metrics
 cache_hits = Counter(
     'cerberus_cache_hits_total',
@@ -40,6 +66,78 @@ cache_misses = Counter(
     'Total cache misses'
 )
 
+cache_tier_lookups = Counter(
+    'cerberus_cache_tier_lookups_total',
+    'Redis cache lookups by serving tier (l1, l2, miss)',
+    ['tier']
+)
+
+cache_codec_duration = Histogram(
+    'cerberus_cache_codec_duration_seconds',
+    'Cache value encode/decode time',
+    ['operation'],
+    buckets=(0.00001, 0.00005, 0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05)
+)
+
+cache_codec_bytes = Counter(
+    'cerberus_cache_codec_bytes_total',
+    'Cache value bytes before (raw) and after (stored) encoding',
+    ['kind']
+)
+
+single_flight_calls = Counter(
+    'cerberus_single_flight_total',
+    'Deduplicated LLM calls by outcome (leader, shared_local, shared_remote, fallback)',
+    ['outcome']
+)
+
+semantic_cache_lookups = Counter(
+    'cerberus_semantic_cache_lookups_total',
+    'Semantic answer cache lookups by result (hit, miss, false_hit)',
+    ['result']
+)
+
+semantic_cache_similarity = Histogram(
+    'cerberus_semantic_cache_similarity',
+    'Similarity of semantic cache hits to the cached question',
+    buckets=(0.85, 0.88, 0.9, 0.92, 0.94, 0.96, 0.98, 0.99, 1.0)
+)
+
+embedding_cache_lookups = Counter(
+    'cerberus_embedding_cache_lookups_total',
+    'Embedding cache lookups by result',
+    ['result']
+)
+
+embedding_queue_depth = Gauge(
+    'cerberus_embedding_queue_depth',
+    'Embedding requests waiting for a micro-batch'
+)
+
+embedding_batch_size = Histogram(
+    'cerberus_embedding_batch_size',
+    'Texts per embedding encode call',
+    buckets=(1, 2, 4, 8, 16, 32, 64, 128)
+)
+
+rag_context_cache_lookups = Counter(
+    'cerberus_rag_context_cache_lookups_total',
+    'RAG prompt-context cache lookups by result',
+    ['result']
+)
+
+rerank_duration = Histogram(
+    'cerberus_rerank_duration_seconds',
+    'Cross-encoder re-ranking time per request',
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0)
+)
+
+rerank_outcomes = Counter(
+    'cerberus_rerank_outcomes_total',
+    'Cross-encoder re-ranking outcomes',
+    ['outcome']
+)
+
 # Model usage
 model_usage = Counter(
     'cerberus_model_usage_total',
@@ -77,6 +175,26 @@ class MetricsService:
         request_duration.labels(model=model, endpoint=endpoint).observe(duration)
         logger.debug(f"Tracked request: model={model}, status={status}, duration={duration:.3f}s")
     
+    @staticmethod
+    def track_time_to_first_token(model: str, endpoint: str, duration: float):
+        """Track time to the first streamed token"""
+        time_to_first_token.labels(model=model, endpoint=endpoint).observe(duration)
+    
+    @staticmethod
+    def track_llm_setup(duration: float):
+        """Track per-request LLM service setup time"""
+        llm_setup_duration.observe(duration)
+    
+    @staticmethod
+    def track_junior_confidence(confidence: int, source: str):
+        """Track Junior answer confidence (source: logprobs or heuristic)"""
+        junior_confidence.labels(source=source).observe(confidence)
+    
+    @staticmethod
+    def track_speculation(outcome: str):
+        """Track a speculative answer (junior_won, senior_won, senior_needed, fallback)"""
+        speculative_answers.labels(outcome=outcome).inc()
+    
     @staticmethod
     def track_cache_hit():
         """Track cache hit"""
@@ -87,6 +205,57 @@ class MetricsService:
         """Track cache miss"""
         cache_misses.inc()
     
+    @staticmethod
+    def track_cache_tier(tier: str):
+        """Track which tier served a cache lookup (l1, l2, miss)"""
+        cache_tier_lookups.labels(tier=tier).inc()
+    
+    @staticmethod
+    def track_cache_codec(operation: str, duration: float, raw_bytes: int = 0, stored_bytes: int = 0):
+        """Track a cache value encode/decode (raw/stored bytes on encode)"""
+        cache_codec_duration.labels(operation=operation).observe(duration)
+        if raw_bytes:
+            cache_codec_bytes.labels(kind="raw").inc(raw_bytes)
+            cache_codec_bytes.labels(kind="stored").inc(stored_bytes)
+    
+    @staticmethod
+    def track_single_flight(outcome: str):
+        """Track a single-flight call (leader, shared_local, shared_remote, fallback)"""
+        single_flight_calls.labels(outcome=outcome).inc()
+    
+    @staticmethod
+    def track_semantic_cache(result: str, similarity: float = None):
+        """Track semantic answer cache lookups (hit, miss, false_hit)"""
+        semantic_cache_lookups.labels(result=result).inc()
+        if similarity is not None:
+            semantic_cache_similarity.observe(similarity)
+    
+    @staticmethod
+    def track_embedding_cache(result: str, count: int = 1):
+        """Track embedding cache lookups (l1_hit, l2_hit, miss)"""
+        embedding_cache_lookups.labels(result=result).inc(count)
+    
+    @staticmethod
+    def set_embedding_queue_depth(depth: int):
+        """Set embedding micro-batch queue depth"""
+        embedding_queue_depth.set(depth)
+    
+    @staticmethod
+    def track_embedding_batch(size: int):
+        """Track texts per embedding encode call"""
+        embedding_batch_size.observe(size)
+    
+    @staticmethod
+    def track_context_cache(result: str):
+        """Track RAG prompt-context cache lookups (hit, miss)"""
+        rag_context_cache_lookups.labels(result=result).inc()
+    
+    @staticmethod
+    def track_rerank(outcome: str, duration: float):
+        """Track a re-ranking request (scored, cached, skipped, timeout, error)"""
+        rerank_outcomes.labels(outcome=outcome).inc()
+        rerank_duration.observe(duration)
+    
     @staticmethod
     def track_model_usage(model: str):
         """Track model usage"""
@@ -33,21 +33,29 @@ class ModelRouter:
             "total_requests": 0,
             "junior_used": 0,
             "senior_used": 0,
+            "speculative_used": 0,
             "cache_hits": 0,
             "total_cost": 0.0
         }
     
     def route(self, question: str, debug_mode: bool = False, 
-              force_model: Optional[str] = None) -> Dict[str, Any]:
+              force_model: Optional[str] = None,
+              speculative_margin: Optional[int] = None) -> Dict[str, Any]:
         """
         Route request to appropriate model
         
+        Args:
+            speculative_margin: Junior-routed questions scoring within this
+                many points of COMPLEXITY_HIGH are marked speculative (None
+                disables speculation)
+        
         Returns:
             {
                 "model": str,
                 "use_cache": bool,
                 "reason": str,
-                "estimated_cost": float
+                "estimated_cost": float,
+                "speculative": bool
             }
         """
         self.metrics["total_requests"] += 1
@@ -76,8 +84,9 @@ class ModelRouter:
         
         if complexity >= self.COMPLEXITY_HIGH:
             return self._route_senior(complexity)
-        else:
-            return self._route_junior(complexity)
+        
+        speculative = speculative_margin is not None and complexity >= self.COMPLEXITY_HIGH - speculative_margin
+        return self._route_junior(complexity, speculative)
     
     def _calculate_complexity(self, question: str) -> int:
         """
@@ -116,19 +125,23 @@ class ModelRouter:
         
         return min(score, 10)
     
-    def _route_junior(self, complexity: int) -> Dict[str, Any]:
-        """Route to junior model"""
+    def _route_junior(self, complexity: int, speculative: bool = False) -> Dict[str, Any]:
+        """Route to junior model (and, if speculative, senior alongside)"""
         self.metrics["junior_used"] += 1
         cost = self._estimate_cost(MODEL_JUNIOR)
+        if speculative:
+            self.metrics["speculative_used"] += 1
+            cost += self._estimate_cost(MODEL_SENIOR)
         self.metrics["total_cost"] += cost
         
-        logger.info(f"Routing to JUNIOR (complexity: {complexity})")
+        logger.info(f"Routing to JUNIOR (complexity: {complexity}, speculative: {speculative})")
         
         return {
             "model": MODEL_JUNIOR,
             "use_cache": False,
             "reason": f"low_complexity_{complexity}",
-            "estimated_cost": cost
+            "estimated_cost": cost,
+            "speculative": speculative
         }
     
     def _route_senior(self, complexity: int) -> Dict[str, Any]:
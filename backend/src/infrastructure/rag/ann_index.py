@@ -0,0 +1,475 @@
+"""
+ANN Index
+
+In-process IVF (inverted file) index for approximate nearest neighbour search
+"""
+
+import numpy as np
+from typing import List, Dict, Optional, Sequence, Tuple
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class IVFIndex:
+    """
+    Inverted-file index over L2-normalised float32 vectors
+    
+    Cosine similarity is a plain dot product because vectors are normalised
+    on insert. Small indexes are searched exactly; once the index grows past
+    `train_threshold` vectors a k-means coarse quantizer is trained and each
+    query only scores the `nprobe` closest lists.
+    
+    Rows are append-only: removing a key tombstones its row, so row numbers
+    stay stable until the index is rebuilt.
+    """
+    
+    def __init__(
+        self,
+        dimension: Optional[int] = None,
+        nlist: Optional[int] = None,
+        nprobe: int = 8,
+        train_threshold: int = 20000,
+        kmeans_iterations: int = 10,
+        seed: int = 42
+    ):
+        """
+        Args:
+            dimension: Vector dimension (inferred from the first insert if omitted)
+            nlist: Number of inverted lists (default: sqrt(N) at training time)
+            nprobe: Lists scanned per query
+            train_threshold: Minimum vectors before the coarse quantizer is trained
+            kmeans_iterations: Lloyd iterations when training
+            seed: Random seed for training sample and centroid init
+        """
+        self.dimension = dimension
+        self.nlist = nlist
+        self.nprobe = nprobe
+        self.train_threshold = train_threshold
+        self.kmeans_iterations = kmeans_iterations
+        self.seed = seed
+        
+        self._vectors = np.empty((0, dimension or 0), dtype=np.float32)
+        self._alive = np.empty(0, dtype=bool)
+        self._size = 0
+        self._keys: List[Optional[str]] = []
+        self._rows: Dict[str, int] = {}
+        
+        self._centroids: Optional[np.ndarray] = None
+        self._assignments = np.empty(0, dtype=np.int32)
+        self._lists: List[List[int]] = []
+        self._list_cache: Dict[int, np.ndarray] = {}
+        self._trained_size = 0
+    
+    def __len__(self) -> int:
+        return len(self._rows)
+    
+    def __contains__(self, key: str) -> bool:
+        return key in self._rows
+    
+    @property
+    def is_trained(self) -> bool:
+        return self._centroids is not None
+    
+    def add(self, key: str, vector: Sequence[float]) -> int:
+        """Add (or replace) a vector, returning its row"""
+        return self.add_batch([key], np.asarray([vector], dtype=np.float32))[0]
+    
+    def add_batch(self, keys: List[str], vectors: np.ndarray) -> List[int]:
+        """Add (or replace) many vectors at once, returning their rows"""
+        if not keys:
+            return []
+        if len(set(keys)) != len(keys):
+            raise ValueError("Duplicate keys in batch")
+        vectors = self._normalize(np.asarray(vectors, dtype=np.float32).reshape(len(keys), -1))
+        
+        if self.dimension is None:
+            self.dimension = vectors.shape[1]
+            self._vectors = np.empty((0, self.dimension), dtype=np.float32)
+        elif vectors.shape[1] != self.dimension:
+            raise ValueError(f"Expected {self.dimension}-dim vectors, got {vectors.shape[1]}")
+        
+        for key in keys:
+            self.remove(key)
+        
+        start = self._size
+        self._reserve(start + len(keys))
+        self._vectors[start:start + len(keys)] = vectors
+        self._alive[start:start + len(keys)] = True
+        self._size += len(keys)
+        
+        rows = list(range(start, start + len(keys)))
+        for key, row in zip(keys, rows):
+            self._keys.append(key)
+            self._rows[key] = row
+        
+        if self.is_trained:
+            self._assign(np.asarray(rows, dtype=np.int64))
+        
+        return rows
+    
+    def remove(self, key: str) -> bool:
+        """Tombstone the row holding key"""
+        row = self._rows.pop(key, None)
+        if row is None:
+            return False
+        self._alive[row] = False
+        self._keys[row] = None
+        return True
+    
+    def key_at(self, row: int) -> Optional[str]:
+        """Key stored at row (None if removed)"""
+        return self._keys[row]
+    
+    def row_of(self, key: str) -> Optional[int]:
+        """Row holding key (None if absent)"""
+        return self._rows.get(key)
+    
+    @property
+    def size(self) -> int:
+        """Number of allocated rows, including tombstones"""
+        return self._size
+    
+    @property
+    def centroids(self) -> Optional[np.ndarray]:
+        return self._centroids
+    
+    def live_rows(self) -> np.ndarray:
+        """Rows not tombstoned, ascending"""
+        return np.flatnonzero(self._alive[:self._size])
+    
+    def vectors_at(self, rows: np.ndarray) -> np.ndarray:
+        """Normalised vectors stored at rows"""
+        return self._vectors[rows]
+    
+    def assignments_at(self, rows: np.ndarray) -> Optional[np.ndarray]:
+        """Coarse list of each row (None until trained)"""
+        return self._assignments[rows] if self.is_trained else None
+    
+    @classmethod
+    def from_arrays(
+        cls,
+        keys: List[str],
+        vectors: np.ndarray,
+        centroids: Optional[np.ndarray] = None,
+        assignments: Optional[np.ndarray] = None,
+        **params
+    ) -> "IVFIndex":
+        """
+        Build an index over already-normalised vectors without copying them
+        
+        `vectors` may be a read-only memory map: rows are only ever written
+        after growing into a fresh buffer, so the mapped pages stay shared
+        until the first insert.
+        
+        Args:
+            keys: Key of each row
+            vectors: Normalised float32 matrix, one row per key
+            centroids: Trained coarse quantizer, if any
+            assignments: List of each row under those centroids
+            **params: Constructor arguments (nlist, nprobe, ...)
+        """
+        index = cls(dimension=vectors.shape[1] or None, **params)
+        index._vectors = vectors
+        index._alive = np.ones(len(keys), dtype=bool)
+        index._size = len(keys)
+        index._keys = list(keys)
+        index._rows = {key: row for row, key in enumerate(keys)}
+        
+        if centroids is not None and assignments is not None:
+            index._centroids = np.asarray(centroids, dtype=np.float32)
+            index._assignments = np.array(assignments, dtype=np.int32)
+            order = np.argsort(index._assignments, kind="stable")
+            starts = np.searchsorted(index._assignments[order], np.arange(len(index._centroids) + 1))
+            index._lists = [order[starts[i]:starts[i + 1]].tolist() for i in range(len(index._centroids))]
+            index._trained_size = len(keys)
+        return index
+    
+    def search(
+        self,
+        query: Sequence[float],
+        top_k: int = 5,
+        mask: Optional[np.ndarray] = None
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Find the top_k rows closest to query
+        
+        Args:
+            query: Query vector
+            top_k: Number of results
+            mask: Optional boolean array over rows restricting the candidates
+        
+        Returns:
+            (rows, scores) sorted by descending cosine similarity
+        """
+        if not self._rows or top_k <= 0:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32)
+        
+        q = self._normalize(np.asarray(query, dtype=np.float32).reshape(1, -1))[0]
+        self._maybe_train()
+        
+        if self.is_trained:
+            candidates = self._probe(q)
+            if mask is not None:
+                candidates = candidates[mask[candidates]]
+            rows, scores = self._score(q, candidates, top_k)
+            if len(rows) >= top_k or mask is None:
+                return rows, scores
+            # Selective filter left the probed lists short: fall back to exact
+        
+        alive = self._alive[:self._size]
+        if mask is not None:
+            alive = alive & mask[:self._size]
+        return self._score(q, np.flatnonzero(alive), top_k)
+    
+    def search_batch(
+        self,
+        queries: Sequence[Sequence[float]],
+        top_k: int = 5,
+        mask: Optional[np.ndarray] = None
+    ) -> List[Tuple[np.ndarray, np.ndarray]]:
+        """
+        Find the top_k rows for many queries at once
+        
+        Scoring is done with matrix-matrix products (one per probed list, or
+        one per block of rows when searching exactly) so throughput follows
+        BLAS instead of a per-query Python loop.
+        
+        Args:
+            queries: Query vectors (one per row)
+            top_k: Number of results per query
+            mask: Optional boolean array over rows restricting the candidates
+        
+        Returns:
+            One (rows, scores) pair per query, sorted by descending similarity
+        """
+        queries = np.asarray(queries, dtype=np.float32)
+        if len(queries) == 0:
+            return []
+        if not self._rows or top_k <= 0:
+            empty = (np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32))
+            return [empty] * len(queries)
+        
+        Q = self._normalize(queries.reshape(len(queries), -1))
+        self._maybe_train()
+        
+        if not self.is_trained:
+            alive = self._alive[:self._size]
+            if mask is not None:
+                alive = alive & mask[:self._size]
+            return self._score_batch(Q, np.flatnonzero(alive), top_k)
+        
+        results = self._probe_batch(Q, top_k, mask)
+        if mask is not None:
+            # Selective filter left some probed lists short: redo those exactly
+            short = [i for i, (rows, _) in enumerate(results) if len(rows) < top_k]
+            if short:
+                candidates = np.flatnonzero(self._alive[:self._size] & mask[:self._size])
+                for i, result in zip(short, self._score_batch(Q[short], candidates, top_k)):
+                    results[i] = result
+        return results
+    
+    def search_rows(
+        self,
+        query: Sequence[float],
+        rows: np.ndarray,
+        top_k: int = 5
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """Exact top_k restricted to a candidate row set (e.g. a filter partition)"""
+        if top_k <= 0:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32)
+        q = self._normalize(np.asarray(query, dtype=np.float32).reshape(1, -1))[0]
+        return self._score(q, self._live(rows), top_k)
+    
+    def search_rows_batch(
+        self,
+        queries: Sequence[Sequence[float]],
+        rows: np.ndarray,
+        top_k: int = 5
+    ) -> List[Tuple[np.ndarray, np.ndarray]]:
+        """Exact top_k for many queries restricted to a candidate row set"""
+        queries = np.asarray(queries, dtype=np.float32)
+        if len(queries) == 0:
+            return []
+        if top_k <= 0:
+            empty = (np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32))
+            return [empty] * len(queries)
+        Q = self._normalize(queries.reshape(len(queries), -1))
+        return self._score_batch(Q, self._live(rows), top_k)
+    
+    def _live(self, rows: np.ndarray) -> np.ndarray:
+        rows = np.asarray(rows, dtype=np.int64)
+        rows = rows[rows < self._size]
+        return rows[self._alive[rows]]
+    
+    def train(self):
+        """Train the coarse quantizer on the current vectors and rebuild the lists"""
+        live = np.flatnonzero(self._alive[:self._size])
+        if len(live) == 0:
+            return
+        
+        nlist = self.nlist or max(1, int(np.sqrt(len(live))))
+        nlist = min(nlist, len(live))
+        rng = np.random.default_rng(self.seed)
+        sample_size = min(len(live), nlist * 64)
+        sample = self._vectors[rng.choice(live, size=sample_size, replace=False)]
+        
+        centroids = sample[rng.choice(sample_size, size=nlist, replace=False)].copy()
+        for _ in range(self.kmeans_iterations):
+            labels = np.argmax(sample @ centroids.T, axis=1)
+            order = np.argsort(labels, kind="stable")
+            counts = np.bincount(labels, minlength=nlist)
+            empty = counts == 0
+            sums = np.zeros_like(centroids)
+            starts = np.concatenate(([0], np.cumsum(counts)[:-1]))
+            sums[~empty] = np.add.reduceat(sample[order], starts[~empty], axis=0)
+            # Re-seed empty clusters from random sample points
+            sums[empty] = sample[rng.choice(sample_size, size=int(empty.sum()))]
+            centroids = self._normalize(sums)
+        
+        self._centroids = centroids
+        self._assignments = np.full(len(self._alive), -1, dtype=np.int32)
+        self._lists = [[] for _ in range(nlist)]
+        self._list_cache = {}
+        self._assign(live)
+        self._trained_size = len(live)
+        logger.info(f"IVF index trained: {len(live)} vectors, {nlist} lists")
+    
+    def _maybe_train(self):
+        """Train once past the threshold and retrain after the index doubles"""
+        size = len(self._rows)
+        if size < self.train_threshold:
+            return
+        if not self.is_trained or size >= 2 * self._trained_size:
+            self.train()
+    
+    def _assign(self, rows: np.ndarray):
+        """Assign rows to their nearest centroid list"""
+        for start in range(0, len(rows), 65536):
+            batch = rows[start:start + 65536]
+            labels = np.argmax(self._vectors[batch] @ self._centroids.T, axis=1)
+            self._assignments[batch] = labels
+            
+            order = np.argsort(labels, kind="stable")
+            touched, starts = np.unique(labels[order], return_index=True)
+            for label, rows_in_list in zip(touched.tolist(), np.split(batch[order], starts[1:])):
+                self._lists[label].extend(rows_in_list.tolist())
+                self._list_cache.pop(label, None)
+    
+    def _probe(self, q: np.ndarray) -> np.ndarray:
+        """Rows stored in the nprobe lists closest to q"""
+        coarse = self._centroids @ q
+        nprobe = min(self.nprobe, len(coarse))
+        probes = np.argpartition(-coarse, nprobe - 1)[:nprobe]
+        return np.concatenate([self._list_rows(int(p)) for p in probes])
+    
+    def _list_rows(self, list_id: int) -> np.ndarray:
+        rows = self._list_cache.get(list_id)
+        if rows is None:
+            rows = np.asarray(self._lists[list_id], dtype=np.int64)
+            self._list_cache[list_id] = rows
+        return rows
+    
+    def _score(self, q: np.ndarray, rows: np.ndarray, top_k: int) -> Tuple[np.ndarray, np.ndarray]:
+        """Exact top_k over the given rows"""
+        if self.is_trained:
+            rows = rows[self._alive[rows]]
+        if len(rows) == 0:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32)
+        
+        return self._top_k(rows, self._vectors[rows] @ q, top_k)
+    
+    def _probe_batch(
+        self,
+        Q: np.ndarray,
+        top_k: int,
+        mask: Optional[np.ndarray]
+    ) -> List[Tuple[np.ndarray, np.ndarray]]:
+        """IVF search for a batch: one GEMM per probed list, grouped by list"""
+        coarse = Q @ self._centroids.T
+        nprobe = min(self.nprobe, coarse.shape[1])
+        probes = np.argpartition(-coarse, nprobe - 1, axis=1)[:, :nprobe]
+        
+        flat_lists = probes.ravel()
+        flat_queries = np.repeat(np.arange(len(Q)), nprobe)
+        order = np.argsort(flat_lists, kind="stable")
+        list_ids, starts = np.unique(flat_lists[order], return_index=True)
+        
+        found_rows = [[] for _ in range(len(Q))]
+        found_scores = [[] for _ in range(len(Q))]
+        for list_id, query_ids in zip(list_ids.tolist(), np.split(flat_queries[order], starts[1:])):
+            rows = self._list_rows(list_id)
+            keep = self._alive[rows]
+            if mask is not None:
+                keep &= mask[rows]
+            rows = rows[keep]
+            if len(rows) == 0:
+                continue
+            
+            scores = Q[query_ids] @ self._vectors[rows].T
+            k = min(top_k, len(rows))
+            top = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+            for i, query_id in enumerate(query_ids.tolist()):
+                found_rows[query_id].append(rows[top[i]])
+                found_scores[query_id].append(scores[i, top[i]])
+        
+        results = []
+        for rows, scores in zip(found_rows, found_scores):
+            if not rows:
+                results.append((np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32)))
+                continue
+            results.append(self._top_k(np.concatenate(rows), np.concatenate(scores), top_k))
+        return results
+    
+    def _score_batch(
+        self,
+        Q: np.ndarray,
+        rows: np.ndarray,
+        top_k: int,
+        block_size: int = 65536
+    ) -> List[Tuple[np.ndarray, np.ndarray]]:
+        """Exact top_k over the given rows for every query, block by block"""
+        best_rows = [np.empty(0, dtype=np.int64) for _ in range(len(Q))]
+        best_scores = [np.empty(0, dtype=np.float32) for _ in range(len(Q))]
+        
+        for start in range(0, len(rows), block_size):
+            block = rows[start:start + block_size]
+            scores = Q @ self._vectors[block].T
+            k = min(top_k, len(block))
+            top = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+            for i in range(len(Q)):
+                merged_rows = np.concatenate((best_rows[i], block[top[i]]))
+                merged_scores = np.concatenate((best_scores[i], scores[i, top[i]]))
+                best_rows[i], best_scores[i] = self._top_k(merged_rows, merged_scores, top_k)
+        
+        return list(zip(best_rows, best_scores))
+    
+    @staticmethod
+    def _top_k(rows: np.ndarray, scores: np.ndarray, top_k: int) -> Tuple[np.ndarray, np.ndarray]:
+        if len(rows) > top_k:
+            top = np.argpartition(-scores, top_k - 1)[:top_k]
+            rows, scores = rows[top], scores[top]
+        order = np.argsort(-scores, kind="stable")
+        return rows[order], scores[order]
+    
+    def _reserve(self, capacity: int):
+        """Grow row storage geometrically"""
+        if capacity <= len(self._alive):
+            return
+        new_capacity = max(capacity, 2 * len(self._alive), 1024)
+        vectors = np.empty((new_capacity, self.dimension), dtype=np.float32)
+        vectors[:self._size] = self._vectors[:self._size]
+        alive = np.zeros(new_capacity, dtype=bool)
+        alive[:self._size] = self._alive[:self._size]
+        self._vectors, self._alive = vectors, alive
+        
+        if self.is_trained:
+            assignments = np.full(new_capacity, -1, dtype=np.int32)
+            assignments[:self._size] = self._assignments[:self._size]
+            self._assignments = assignments
+    
+    @staticmethod
+    def _normalize(vectors: np.ndarray) -> np.ndarray:
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        return vectors / norms
@@ -0,0 +1,271 @@
+"""
+BM25 Index
+
+Inverted lexical index over vector index rows
+"""
+
+from array import array
+from collections import Counter
+from typing import Dict, List, Optional, Tuple
+import math
+import re
+import unicodedata
+import numpy as np
+from src.infrastructure.cache.lru_cache import LRUCache
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class BM25Index:
+    """
+    Okapi BM25 scorer sharing row numbers with the vector index
+    
+    Postings are compact (row, term frequency) arrays per term, so a
+    query only touches the postings of its own terms and never scans
+    content. Removed rows get length 0 and are skipped at query time;
+    document frequencies still count them until the next rebuild, which
+    only nudges idf. An index restored from a snapshot keeps the saved
+    postings in flat (possibly memory-mapped) arrays and appends new
+    postings per term as usual.
+    """
+    
+    # Words in any script: letter or underscore first, then letters, digits, underscores
+    TOKEN = re.compile(r"[^\W\d]\w*|\d+")
+    # Parts of camelCase / PascalCase / ACRONYMCase identifiers, matched on
+    # a case mask (U upper, l other letters, d digits) since re has no
+    # Unicode case classes
+    WORD_PART = re.compile(r"U+(?!l)|U?l+|d+")
+    
+    def __init__(self, k1: float = 1.2, b: float = 0.75, cache_size: int = 4096):
+        """
+        Args:
+            k1: Term frequency saturation
+            b: Document length normalisation
+            cache_size: Postings kept as numpy arrays between queries
+        """
+        self.k1 = k1
+        self.b = b
+        self._postings: Dict[str, Tuple[array, array]] = {}
+        # Snapshot postings: term -> slot, rows/tf of slot i at offsets[i]:offsets[i + 1]
+        self._base_terms: Dict[str, int] = {}
+        self._base_offsets = np.zeros(1, dtype=np.int64)
+        self._base_rows = np.empty(0, dtype=np.int32)
+        self._base_tf = np.empty(0, dtype=np.uint16)
+        self._lengths = np.zeros(0, dtype=np.int32)
+        self._documents = 0
+        self._total_length = 0
+        self._cache = LRUCache(max_entries=cache_size)
+    
+    def __len__(self) -> int:
+        return self._documents
+    
+    @classmethod
+    def tokenize(cls, text: str) -> List[str]:
+        """
+        Lowercased identifiers, plus their parts for compound names
+        
+        `getUserById` yields getuserbyid, get, user, by, id and
+        `ERR_CONN_REFUSED` yields err_conn_refused, err, conn, refused, so
+        both exact identifiers and their words match. Accented words stay
+        whole in either Unicode form (`função`, `calcularSaída`).
+        """
+        tokens = []
+        for token in cls.TOKEN.findall(unicodedata.normalize("NFC", text)):
+            lowered = token.lower()
+            tokens.append(lowered)
+            compound = "_" in token or (token[1:] != token[1:].lower() and token != token.upper())
+            if compound:
+                parts = [part.lower() for piece in token.split("_") for part in cls._word_parts(piece)]
+                if len(parts) > 1:
+                    tokens.extend(parts)
+        return tokens
+    
+    @classmethod
+    def _word_parts(cls, piece: str) -> List[str]:
+        mask = "".join("d" if char.isdecimal() else "U" if char.isupper() else "l" for char in piece)
+        return [piece[match.start():match.end()] for match in cls.WORD_PART.finditer(mask)]
+    
+    def add(self, row: int, text: str):
+        self.add_batch([row], [text])
+    
+    def add_batch(self, rows: List[int], texts: List[str]):
+        """Index texts under new vector index rows (rows are never reused)"""
+        if not rows:
+            return
+        
+        self._reserve(max(rows) + 1)
+        touched = set()
+        for row, text in zip(rows, texts):
+            counts = Counter(self.tokenize(text))
+            length = sum(counts.values())
+            self._lengths[row] = length
+            self._documents += 1
+            self._total_length += length
+            
+            for term, tf in counts.items():
+                postings = self._postings.get(term)
+                if postings is None:
+                    postings = self._postings[term] = (array("i"), array("H"))
+                postings[0].append(row)
+                postings[1].append(min(tf, 65535))
+            touched.update(counts)
+        
+        for term in touched:
+            self._cache.delete(term)
+    
+    def remove(self, row: int):
+        """Drop row from scoring"""
+        if row < len(self._lengths) and self._lengths[row]:
+            self._documents -= 1
+            self._total_length -= int(self._lengths[row])
+            self._lengths[row] = 0
+    
+    def search(
+        self,
+        query: str,
+        top_k: int,
+        rows: Optional[np.ndarray] = None
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Top rows by BM25 score
+        
+        Args:
+            query: Query text
+            top_k: Number of results
+            rows: Restrict to these rows (e.g. a metadata filter)
+        
+        Returns:
+            (rows, scores) sorted by descending score; rows without any
+            query term are never returned
+        """
+        empty = (np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32))
+        if not self._documents or top_k <= 0:
+            return empty
+        
+        average_length = self._total_length / self._documents
+        matched_rows, matched_scores = [], []
+        for term in set(self.tokenize(query)):
+            postings = self._posting_arrays(term)
+            if postings is None:
+                continue
+            
+            term_rows, tf = postings
+            df = len(term_rows)
+            idf = math.log(1 + (self._documents - df + 0.5) / (df + 0.5))
+            norm = self.k1 * (1 - self.b + self.b * self._lengths[term_rows] / average_length)
+            matched_rows.append(term_rows)
+            matched_scores.append(idf * tf * (self.k1 + 1) / (tf + norm))
+        
+        if not matched_rows:
+            return empty
+        
+        all_rows = np.concatenate(matched_rows)
+        all_scores = np.concatenate(matched_scores)
+        keep = self._lengths[all_rows] > 0
+        if rows is not None:
+            keep &= np.isin(all_rows, rows)
+        all_rows, all_scores = all_rows[keep], all_scores[keep]
+        if not len(all_rows):
+            return empty
+        
+        # Sum per-term contributions per row: sort-free dense accumulation
+        # when postings are large relative to the index, sparse otherwise
+        if len(all_rows) * 8 >= len(self._lengths):
+            totals = np.bincount(all_rows, weights=all_scores, minlength=len(self._lengths))
+            candidate_rows = np.flatnonzero(totals)
+            totals = totals[candidate_rows]
+        else:
+            candidate_rows, inverse = np.unique(all_rows, return_inverse=True)
+            totals = np.bincount(inverse, weights=all_scores)
+        
+        k = min(top_k, len(candidate_rows))
+        best = np.argpartition(-totals, k - 1)[:k]
+        best = best[np.argsort(-totals[best], kind="stable")]
+        return candidate_rows[best], totals[best].astype(np.float32)
+    
+    def export(self, rows: np.ndarray) -> Tuple[List[str], np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Postings of the given rows, renumbered to their position in `rows`
+        
+        Returns:
+            (terms, offsets, rows, tf, lengths) as taken by from_arrays
+        """
+        self._reserve(int(rows.max()) + 1 if len(rows) else 0)
+        renumber = np.full(len(self._lengths), -1, dtype=np.int64)
+        renumber[rows] = np.arange(len(rows))
+        
+        terms, offsets, kept_rows, kept_tf = [], [0], [], []
+        for term in {**self._base_terms, **self._postings}:
+            term_rows, tf = self._raw_postings(term)
+            mapped = renumber[term_rows]
+            keep = mapped >= 0
+            if not keep.any():
+                continue
+            terms.append(term)
+            kept_rows.append(mapped[keep].astype(np.int32))
+            kept_tf.append(tf[keep])
+            offsets.append(offsets[-1] + int(keep.sum()))
+        
+        return (
+            terms,
+            np.asarray(offsets, dtype=np.int64),
+            np.concatenate(kept_rows) if kept_rows else np.empty(0, dtype=np.int32),
+            np.concatenate(kept_tf) if kept_tf else np.empty(0, dtype=np.uint16),
+            self._lengths[rows]
+        )
+    
+    @classmethod
+    def from_arrays(
+        cls,
+        terms: List[str],
+        offsets: np.ndarray,
+        rows: np.ndarray,
+        tf: np.ndarray,
+        lengths: np.ndarray,
+        **params
+    ) -> "BM25Index":
+        """Index over exported postings; rows/tf may be memory-mapped"""
+        index = cls(**params)
+        index._base_terms = {term: slot for slot, term in enumerate(terms)}
+        index._base_offsets = np.asarray(offsets, dtype=np.int64)
+        index._base_rows = rows
+        index._base_tf = tf
+        index._lengths = np.array(lengths, dtype=np.int32)
+        index._documents = int(np.count_nonzero(index._lengths))
+        index._total_length = int(index._lengths.sum())
+        return index
+    
+    def _raw_postings(self, term: str) -> Tuple[np.ndarray, np.ndarray]:
+        """(int32 rows, uint16 tf) of term, snapshot part first"""
+        rows, tf = [], []
+        slot = self._base_terms.get(term)
+        if slot is not None:
+            start, end = self._base_offsets[slot], self._base_offsets[slot + 1]
+            rows.append(self._base_rows[start:end])
+            tf.append(self._base_tf[start:end])
+        postings = self._postings.get(term)
+        if postings is not None:
+            rows.append(np.frombuffer(postings[0], dtype=np.int32))
+            tf.append(np.frombuffer(postings[1], dtype=np.uint16))
+        if len(rows) == 1:
+            return rows[0], tf[0]
+        return np.concatenate(rows), np.concatenate(tf)
+    
+    def _posting_arrays(self, term: str) -> Optional[Tuple[np.ndarray, np.ndarray]]:
+        cached = self._cache.get(term)
+        if cached is not None:
+            return cached
+        
+        if term not in self._postings and term not in self._base_terms:
+            return None
+        rows, tf = self._raw_postings(term)
+        arrays = (rows.astype(np.int64), tf.astype(np.float32))
+        self._cache.set(term, arrays)
+        return arrays
+    
+    def _reserve(self, size: int):
+        if size > len(self._lengths):
+            grown = np.zeros(max(size, 2 * len(self._lengths), 1024), dtype=np.int32)
+            grown[:len(self._lengths)] = self._lengths
+            self._lengths = grown
@@ -0,0 +1,253 @@
+"""
+Code Chunker
+
+Parser-based code splitting aligned to functions and classes
+"""
+
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Set
+import ast
+import re
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class CodeSpan:
+    """Slice of source aligned to a definition"""
+    content: str
+    start_line: int  # 1-based, inclusive
+    end_line: int
+    symbol: str  # qualified name ("" for module-level code)
+    kind: str  # function, class, method or module
+    part: Optional[int] = None  # 0-based index when a definition is split
+
+
+class PythonChunker:
+    """
+    Split Python along `ast` definitions
+    
+    Each top-level function or class becomes one span (decorators and the
+    comments above it included); runs of other top-level statements are
+    grouped. Classes longer than `max_chars` are split into their methods,
+    the class line travelling with the first span; other definitions
+    longer than `max_chars` are cut into numbered parts, between statements
+    where possible. Every source line ends up in exactly one span.
+    """
+    
+    DEFINITIONS = (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)
+    
+    def __init__(self, max_chars: int = 2000):
+        self.max_chars = max_chars
+    
+    def chunk(self, code: str) -> Optional[List[CodeSpan]]:
+        """Spans in source order, or None if the code does not parse"""
+        try:
+            tree = ast.parse(code)
+        except (SyntaxError, ValueError):
+            return None
+        
+        lines = code.splitlines(keepends=True)
+        spans: List[CodeSpan] = []
+        self._chunk_body(tree.body, lines, 1, len(lines), "", False, spans)
+        return spans
+    
+    def _chunk_body(
+        self,
+        body: List[ast.stmt],
+        lines: List[str],
+        first_line: int,
+        last_line: int,
+        prefix: str,
+        in_class: bool,
+        spans: List[CodeSpan]
+    ):
+        # Each statement owns the lines since the previous one ended
+        items = []
+        cursor = first_line
+        for node in body:
+            items.append([cursor, node.end_lineno, node])
+            cursor = node.end_lineno + 1
+        if items:
+            items[-1][1] = max(items[-1][1], last_line)
+        
+        run = None
+        run_kind = "class" if in_class else "module"
+        for start, end, node in items:
+            if not isinstance(node, self.DEFINITIONS):
+                run = [run[0] if run else start, end]
+                continue
+            
+            if run:
+                self._emit_run(lines, run[0], run[1], prefix, run_kind, spans)
+                run = None
+            self._emit_definition(node, lines, start, end, prefix, in_class, spans)
+        
+        if run:
+            self._emit_run(lines, run[0], run[1], prefix, run_kind, spans)
+    
+    def _emit_definition(self, node, lines, start, end, prefix, in_class, spans):
+        symbol = f"{prefix}.{node.name}" if prefix else node.name
+        is_class = isinstance(node, ast.ClassDef)
+        
+        if is_class and self._size(lines, start, end) > self.max_chars and any(
+            isinstance(child, self.DEFINITIONS) for child in node.body
+        ):
+            self._chunk_body(node.body, lines, start, end, symbol, True, spans)
+            return
+        
+        kind = "class" if is_class else ("method" if in_class else "function")
+        if self._size(lines, start, end) <= self.max_chars:
+            self._emit(lines, start, end, symbol, kind, spans)
+            return
+        
+        first = len(spans)
+        statements = {child.lineno for child in ast.walk(node) if isinstance(child, ast.stmt)}
+        self._emit_run(lines, start, end, symbol, kind, spans, statements)
+        if len(spans) - first > 1:
+            for part, span in enumerate(spans[first:]):
+                span.part = part
+    
+    def _emit_run(self, lines, start, end, symbol, kind, spans, boundaries: Set[int] = frozenset()):
+        """
+        Emit lines, cut when oversized
+        
+        Cuts go before the last line in `boundaries` (statement starts)
+        inside the block, else at the overflowing line.
+        """
+        block_start, size, cut = start, 0, None
+        for line_no in range(start, end + 1):
+            if line_no in boundaries and line_no > block_start:
+                cut = line_no
+            size += len(lines[line_no - 1])
+            if size > self.max_chars and line_no > block_start:
+                split = cut or line_no
+                self._emit(lines, block_start, split - 1, symbol, kind, spans)
+                block_start, size, cut = split, self._size(lines, split, line_no), None
+        self._emit(lines, block_start, end, symbol, kind, spans)
+    
+    @staticmethod
+    def _emit(lines, start, end, symbol, kind, spans):
+        # Trim blank edges so line ranges point at real code
+        while start <= end and not lines[start - 1].strip():
+            start += 1
+        while end >= start and not lines[end - 1].strip():
+            end -= 1
+        if start > end:
+            return
+        spans.append(CodeSpan("".join(lines[start - 1:end]).rstrip(), start, end, symbol, kind))
+    
+    @staticmethod
+    def _size(lines, start, end) -> int:
+        return sum(len(line) for line in lines[start - 1:end])
+
+
+class BraceChunker:
+    """
+    Split brace languages (JavaScript/TypeScript) at top-level declarations
+    
+    A single pass tracks brace depth outside strings, template literals
+    and comments; a line at depth 0 that opens a declaration starts a new
+    span, taking the comments directly above it along. Linear time, so
+    large files cannot make it backtrack.
+    """
+    
+    DECLARATION = re.compile(
+        r"^(?:export\s+(?:default\s+)?)?(?:declare\s+)?(?:abstract\s+)?(?:async\s+)?"
+        r"(?:(function\*?|class|interface|enum|namespace)\s+([\w$]+)"
+        r"|(?:const|let|var)\s+([\w$]+)"
+        r"|type\s+([\w$]+)\s*(?:<[^=]*>)?\s*=)"
+    )
+    
+    def chunk(self, code: str) -> Optional[List[CodeSpan]]:
+        """Spans in source order, or None if no declaration was found"""
+        lines = code.splitlines(keepends=True)
+        depths = self._line_depths(lines)
+        
+        starts = [(0, "", "module")]  # (line index, symbol, kind)
+        for i, line in enumerate(lines):
+            if depths[i] != 0:
+                continue
+            stripped = line.strip()
+            match = self.DECLARATION.match(stripped)
+            if not match:
+                continue
+            
+            keyword, name = match.group(1), next(g for g in match.groups()[1:] if g)
+            if keyword in ("class", "interface", "enum", "namespace"):
+                kind = "class"
+            elif keyword or "=>" in stripped or "function" in stripped:
+                kind = "function"
+            else:
+                # Plain values group with neighbouring module code
+                kind, name = "module", ""
+            
+            if kind == "module" and starts[-1][2] == "module":
+                continue
+            starts.append((self._with_leading_comments(lines, depths, i), name, kind))
+        
+        if len(starts) == 1:
+            return None
+        
+        spans: List[CodeSpan] = []
+        for (start, name, kind), following in zip(starts, starts[1:] + [(len(lines), None, None)]):
+            PythonChunker._emit(lines, start + 1, following[0], name, kind, spans)
+        return spans
+    
+    @staticmethod
+    def _with_leading_comments(lines: List[str], depths: List[int], index: int) -> int:
+        while index > 0 and depths[index - 1] in (0, -1):
+            previous = lines[index - 1].strip()
+            if not (previous.startswith(("//", "/*", "*", "@")) or previous.endswith("*/")):
+                break
+            index -= 1
+        return index
+    
+    @staticmethod
+    def _line_depths(lines: List[str]) -> List[int]:
+        """Brace depth at the start of each line (strings and comments skipped)"""
+        depths = []
+        depth = 0
+        state = None  # None, quote character, "/*" or "`"
+        for line in lines:
+            depths.append(depth if state is None else -1)
+            i, n = 0, len(line)
+            while i < n:
+                ch = line[i]
+                if state == "/*":
+                    if line.startswith("*/", i):
+                        state = None
+                        i += 1
+                elif state in ("'", '"', "`"):
+                    if ch == "\\":
+                        i += 1
+                    elif ch == state:
+                        state = None
+                    elif ch == "\n" and state != "`":
+                        state = None  # unterminated string: recover at end of line
+                elif line.startswith("//", i):
+                    break
+                elif line.startswith("/*", i):
+                    state = "/*"
+                    i += 1
+                elif ch in ("'", '"', "`"):
+                    state = ch
+                elif ch in "{([":
+                    depth += 1
+                elif ch in "})]":
+                    depth = max(0, depth - 1)
+                i += 1
+        return depths
+
+
+CHUNKERS: Dict[str, object] = {
+    "python": PythonChunker(),
+    "javascript": BraceChunker(),
+    "typescript": BraceChunker()
+}
+
+
+def register_chunker(language: str, chunker):
+    """Plug in a chunker (any object with `chunk(code) -> Optional[List[CodeSpan]]`)"""
+    CHUNKERS[language] = chunker
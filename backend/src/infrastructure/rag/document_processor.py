@@ -4,7 +4,13 @@ Document Processor
 Handles document chunking and metadata extraction
 """
 
-from typing import List, Dict, Any
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+from typing import List, Dict, Any, Iterable, Iterator, Optional, TextIO, Tuple
+from src.infrastructure.rag.code_chunker import CHUNKERS
+import io
+import os
 import re
 import logging
 
@@ -23,6 +29,22 @@ class DocumentChunk:
 class DocumentProcessor:
     """Process and chunk documents for RAG"""
     
+    LANGUAGE_BY_EXTENSION = {
+        ".py": "python",
+        ".js": "javascript",
+        ".jsx": "javascript",
+        ".ts": "typescript",
+        ".tsx": "typescript",
+        ".java": "java",
+        ".go": "go",
+        ".rs": "rust",
+        ".rb": "ruby",
+        ".md": "markdown"
+    }
+    READ_BLOCK_SIZE = 65536
+    # Files handed to a pool worker at once (amortises IPC for small files)
+    FILES_PER_TASK = 16
+    
     def __init__(self, chunk_size: int = 500, chunk_overlap: int = 50):
         self.chunk_size = chunk_size
         self.chunk_overlap = chunk_overlap
@@ -39,29 +61,119 @@ class DocumentProcessor:
         Returns:
             List of DocumentChunk objects
         """
-        chunks = []
-        
-        # Split by functions/classes for code
-        if language in ["python", "javascript", "typescript"]:
-            code_chunks = self._split_by_functions(code, language)
-        else:
-            code_chunks = self._split_by_size(code)
+        chunks = list(self.iter_code(io.StringIO(code), language, source))
+        for chunk in chunks:
+            chunk.metadata["total_chunks"] = len(chunks)
         
-        for i, chunk_text in enumerate(code_chunks):
-            chunk = DocumentChunk(
+        logger.info(f"Processed {len(chunks)} chunks from {source}")
+        return chunks
+    
+    def iter_code(self, stream: TextIO, language: str, source: str = "unknown") -> Iterator[DocumentChunk]:
+        """
+        Lazily chunk code read from a text stream
+        
+        Languages with a parser chunker (see code_chunker.CHUNKERS) hold one
+        file at a time and get chunks aligned to functions and classes, with
+        start_line, end_line, symbol and kind in metadata (plus part for
+        pieces of an oversized definition). Other languages,
+        and code that does not parse, are read block by block and split by
+        size, so memory stays flat for any file size. Chunks carry no
+        total_chunks, which is unknown until the end.
+        """
+        pieces = None
+        chunker = CHUNKERS.get(language)
+        if chunker is not None:
+            code = stream.read()
+            spans = chunker.chunk(code)
+            if spans:
+                pieces = (
+                    (span.content, {
+                        "start_line": span.start_line,
+                        "end_line": span.end_line,
+                        "symbol": span.symbol,
+                        "kind": span.kind,
+                        **({"part": span.part} if span.part is not None else {})
+                    })
+                    for span in spans
+                )
+            else:
+                stream = io.StringIO(code)
+        
+        if pieces is None:
+            pieces = ((text, {}) for text in self._iter_by_size(stream))
+        
+        for i, (chunk_text, extra) in enumerate(pieces):
+            yield DocumentChunk(
                 content=chunk_text,
                 metadata={
                     "type": "code",
                     "language": language,
                     "source": source,
                     "chunk_index": i,
-                    "total_chunks": len(code_chunks)
+                    **extra
                 }
             )
-            chunks.append(chunk)
+    
+    def iter_files(self, paths: Iterable[str], language: Optional[str] = None) -> Iterator[DocumentChunk]:
+        """
+        Lazily chunk files one at a time
         
-        logger.info(f"Processed {len(chunks)} chunks from {source}")
-        return chunks
+        Args:
+            paths: File paths (e.g. from iter_source_files)
+            language: Force a language (default: inferred from extension)
+        
+        Yields:
+            DocumentChunks in file order, with the path as source
+        """
+        for path in paths:
+            file_language = language or self.LANGUAGE_BY_EXTENSION.get(os.path.splitext(path)[1], "text")
+            try:
+                with open(path, encoding="utf-8", errors="replace") as f:
+                    yield from self.iter_code(f, file_language, path)
+            except OSError as e:
+                logger.warning(f"Skipping {path}: {e}")
+    
+    def process_files(
+        self,
+        paths: Iterable[str],
+        language: Optional[str] = None,
+        workers: Optional[int] = None
+    ) -> Iterator[Tuple[str, List[DocumentChunk]]]:
+        """
+        Chunk files across a process pool (bulk indexing jobs)
+        
+        Args:
+            paths: File paths, consumed lazily
+            language: Force a language (default: inferred from extension)
+            workers: Worker processes (default: CPU count)
+        
+        Yields:
+            (path, chunks) in input order; only a few tasks per worker are
+            in flight, so results never pile up ahead of the consumer
+        """
+        workers = workers or os.cpu_count() or 1
+        paths = iter(paths)
+        tasks = iter(lambda: list(islice(paths, self.FILES_PER_TASK)), [])
+        
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            def submit(task):
+                return executor.submit(_chunk_files, task, language, self.chunk_size, self.chunk_overlap)
+            
+            in_flight = deque(submit(task) for task in islice(tasks, workers * 2))
+            while in_flight:
+                results = in_flight.popleft().result()
+                for task in islice(tasks, 1):
+                    in_flight.append(submit(task))
+                yield from results
+    
+    def iter_source_files(self, root: str, extensions: Optional[Iterable[str]] = None) -> Iterator[str]:
+        """Walk root lazily, yielding files with known (or given) extensions"""
+        extensions = set(extensions or self.LANGUAGE_BY_EXTENSION)
+        for directory, subdirs, files in os.walk(root):
+            subdirs[:] = sorted(d for d in subdirs if not d.startswith(".") and d not in ("node_modules", "__pycache__"))
+            for name in sorted(files):
+                if os.path.splitext(name)[1] in extensions:
+                    yield os.path.join(directory, name)
     
     def process_documentation(self, text: str, framework: str, version: str = "latest") -> List[DocumentChunk]:
         """Process documentation text"""
@@ -84,28 +196,6 @@ class DocumentProcessor:
         
         return chunks
     
-    def _split_by_functions(self, code: str, language: str) -> List[str]:
-        """Split code by function/class definitions"""
-        chunks = []
-        
-        if language == "python":
-            # Split by def/class
-            pattern = r'((?:^|\n)(?:def|class)\s+\w+.*?(?=\n(?:def|class)\s+|\Z))'
-            matches = re.findall(pattern, code, re.DOTALL | re.MULTILINE)
-            chunks = [m.strip() for m in matches if m.strip()]
-        
-        elif language in ["javascript", "typescript"]:
-            # Split by function/class
-            pattern = r'((?:^|\n)(?:function|class|const\s+\w+\s*=\s*(?:async\s*)?\(.*?\)\s*=>).*?(?=\n(?:function|class|const\s+\w+\s*=)|\Z))'
-            matches = re.findall(pattern, code, re.DOTALL | re.MULTILINE)
-            chunks = [m.strip() for m in matches if m.strip()]
-        
-        # Fallback to size-based splitting
-        if not chunks:
-            chunks = self._split_by_size(code)
-        
-        return chunks
-    
     def _split_by_headers(self, text: str) -> List[str]:
         """Split text by markdown headers"""
         # Split by # headers
@@ -119,16 +209,38 @@ class DocumentProcessor:
     
     def _split_by_size(self, text: str) -> List[str]:
         """Split text by size with overlap"""
-        chunks = []
-        start = 0
-        
-        while start < len(text):
-            end = start + self.chunk_size
-            chunk = text[start:end]
+        return list(self._iter_by_size(io.StringIO(text)))
+    
+    def _iter_by_size(self, stream: TextIO) -> Iterator[str]:
+        """Fixed-size windows with overlap, reading the stream block by block"""
+        step = max(1, self.chunk_size - self.chunk_overlap)
+        buffer, start, eof = "", 0, False
+        
+        while True:
+            if not eof and len(buffer) - start < self.chunk_size:
+                # Keep only the unconsumed tail before reading more
+                block = stream.read(self.READ_BLOCK_SIZE)
+                eof = not block
+                buffer = buffer[start:] + block
+                start = 0
+                continue
             
-            if chunk.strip():
-                chunks.append(chunk.strip())
+            if start >= len(buffer):
+                return
             
-            start = end - self.chunk_overlap
-        
-        return chunks
+            chunk = buffer[start:start + self.chunk_size].strip()
+            if chunk:
+                yield chunk
+            
+            start += step
+
+
+def _chunk_files(
+    paths: List[str],
+    language: Optional[str],
+    chunk_size: int,
+    chunk_overlap: int
+) -> List[Tuple[str, List[DocumentChunk]]]:
+    """Pool worker: chunk a few files"""
+    processor = DocumentProcessor(chunk_size, chunk_overlap)
+    return [(path, list(processor.iter_files([path], language))) for path in paths]
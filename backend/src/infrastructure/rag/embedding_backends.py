@@ -0,0 +1,123 @@
+"""
+Embedding Backends
+
+Interchangeable inference engines behind EmbeddingsService
+"""
+
+import os
+import numpy as np
+from typing import List
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class SentenceTransformerBackend:
+    """Full-precision sentence-transformers model (torch)"""
+    
+    name = "sentence-transformers"
+    
+    def __init__(self, model):
+        """
+        Args:
+            model: Loaded SentenceTransformer instance
+        """
+        self.model = model
+        self.dimension = model.get_sentence_embedding_dimension()
+    
+    def encode(self, texts: List[str], show_progress_bar: bool = False) -> np.ndarray:
+        encoded = self.model.encode(texts, convert_to_numpy=True, show_progress_bar=show_progress_bar)
+        return np.asarray(encoded, dtype=np.float32).reshape(len(texts), -1)
+
+
+class OnnxBackend:
+    """
+    ONNX Runtime model with mean pooling, optionally int8-quantized
+    
+    Expects a directory with `model.onnx` and `tokenizer.json`, e.g. from
+    `optimum-cli export onnx --model sentence-transformers/all-MiniLM-L6-v2 <dir>`.
+    With `quantize`, weights are converted once to `model.int8.onnx` with
+    dynamic int8 quantization and that file is loaded instead.
+    Needs `onnxruntime` and `tokenizers`, but not torch.
+    """
+    
+    MODEL_FILE = "model.onnx"
+    QUANTIZED_FILE = "model.int8.onnx"
+    TOKENIZER_FILE = "tokenizer.json"
+    
+    def __init__(
+        self,
+        model_dir: str,
+        quantize: bool = False,
+        max_length: int = 256,
+        batch_size: int = 32,
+        threads: int = 0,
+        normalize: bool = True
+    ):
+        """
+        Args:
+            model_dir: Directory holding the exported model and tokenizer
+            quantize: Use dynamic int8 weights
+            max_length: Tokens per text (longer texts are truncated)
+            batch_size: Texts per session run
+            threads: ONNX Runtime intra-op threads (0 = runtime default)
+            normalize: L2-normalise outputs, as all-MiniLM-L6-v2 does
+        """
+        import onnxruntime as ort
+        from tokenizers import Tokenizer
+        
+        model_path = os.path.join(model_dir, self.MODEL_FILE)
+        if quantize:
+            model_path = self.quantize(model_path, os.path.join(model_dir, self.QUANTIZED_FILE))
+        
+        options = ort.SessionOptions()
+        if threads:
+            options.intra_op_num_threads = threads
+        self.session = ort.InferenceSession(model_path, options, providers=["CPUExecutionProvider"])
+        self._input_names = {i.name for i in self.session.get_inputs()}
+        
+        self.tokenizer = Tokenizer.from_file(os.path.join(model_dir, self.TOKENIZER_FILE))
+        self.tokenizer.enable_truncation(max_length=max_length)
+        self.tokenizer.enable_padding()
+        
+        self.name = "onnx-int8" if quantize else "onnx"
+        self.batch_size = batch_size
+        self.normalize = normalize
+        self.dimension = self.encode(["dimension probe"]).shape[1]
+        logger.info(f"ONNX embeddings loaded: {model_path}")
+    
+    @staticmethod
+    def quantize(model_path: str, output_path: str) -> str:
+        """Write dynamic int8 weights next to model_path (once)"""
+        if not os.path.exists(output_path):
+            from onnxruntime.quantization import QuantType, quantize_dynamic
+            
+            quantize_dynamic(model_path, output_path, weight_type=QuantType.QInt8)
+            logger.info(f"Quantized embeddings model written: {output_path}")
+        return output_path
+    
+    def encode(self, texts: List[str], show_progress_bar: bool = False) -> np.ndarray:
+        if not texts:
+            return np.empty((0, getattr(self, "dimension", 0)), dtype=np.float32)
+        
+        return np.concatenate([
+            self._encode_batch(texts[start:start + self.batch_size])
+            for start in range(0, len(texts), self.batch_size)
+        ])
+    
+    def _encode_batch(self, texts: List[str]) -> np.ndarray:
+        encodings = self.tokenizer.encode_batch(texts)
+        mask = np.array([e.attention_mask for e in encodings], dtype=np.int64)
+        feeds = {
+            "input_ids": np.array([e.ids for e in encodings], dtype=np.int64),
+            "attention_mask": mask,
+            "token_type_ids": np.array([e.type_ids for e in encodings], dtype=np.int64)
+        }
+        hidden = self.session.run(None, {k: v for k, v in feeds.items() if k in self._input_names})[0]
+        
+        # Mean over real tokens, ignoring padding
+        weights = mask[:, :, None].astype(np.float32)
+        pooled = (hidden * weights).sum(axis=1) / np.maximum(weights.sum(axis=1), 1e-9)
+        if self.normalize:
+            pooled /= np.maximum(np.linalg.norm(pooled, axis=1, keepdims=True), 1e-12)
+        return pooled.astype(np.float32)
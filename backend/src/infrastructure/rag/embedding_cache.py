@@ -0,0 +1,106 @@
+"""
+Embedding Cache
+
+Two-tier cache for text embeddings: in-process LRU plus optional Redis
+"""
+
+import hashlib
+import re
+import numpy as np
+from typing import Dict, List, Optional
+from src.infrastructure.cache.lru_cache import LRUCache
+from src.infrastructure.monitoring.metrics_service import MetricsService
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class EmbeddingCache:
+    """
+    Cache embeddings by sha256(model name + normalised text)
+    
+    L1 is a per-process LRU of float32 arrays. L2 (optional) stores the
+    packed float32 bytes in Redis so replicas share work. Redis errors are
+    logged and treated as misses: the cache never fails an embedding.
+    """
+    
+    TTL_REDIS = 604800  # 7 days
+    
+    def __init__(self, model_name: str, max_entries: int = 10000, redis_client=None, ttl: int = TTL_REDIS):
+        """
+        Args:
+            model_name: Embedding model (part of the key so models never mix)
+            max_entries: L1 capacity
+            redis_client: Optional Redis client (decode_responses=False) for L2
+            ttl: L2 time-to-live in seconds
+        """
+        self.model_name = model_name
+        self.redis = redis_client
+        self.ttl = ttl
+        self._l1 = LRUCache(max_entries=max_entries)
+        self.stats = {"l1_hits": 0, "l2_hits": 0, "misses": 0}
+    
+    def key(self, text: str) -> str:
+        """Cache key for text"""
+        normalized = re.sub(r"\s+", " ", text).strip()
+        digest = hashlib.sha256(f"{self.model_name}\n{normalized}".encode()).hexdigest()
+        return f"embedding:{digest}"
+    
+    def get_many(self, texts: List[str]) -> List[Optional[np.ndarray]]:
+        """Cached vectors for texts (None where missing)"""
+        keys = [self.key(text) for text in texts]
+        vectors = [self._l1.get(key) for key in keys]
+        l1_hits = sum(v is not None for v in vectors)
+        
+        missing = [i for i, vector in enumerate(vectors) if vector is None]
+        l2_hits = 0
+        if missing and self.redis is not None:
+            for i, blob in zip(missing, self._redis_get([keys[i] for i in missing])):
+                if blob:
+                    vectors[i] = np.frombuffer(blob, dtype=np.float32)
+                    self._l1.set(keys[i], vectors[i])
+                    l2_hits += 1
+        
+        misses = len(texts) - l1_hits - l2_hits
+        self._record(l1_hits, l2_hits, misses)
+        return vectors
+    
+    def set_many(self, texts: List[str], vectors: np.ndarray):
+        """Store freshly computed vectors in both tiers"""
+        keys = [self.key(text) for text in texts]
+        for key, vector in zip(keys, vectors):
+            self._l1.set(key, np.asarray(vector, dtype=np.float32))
+        
+        if self.redis is not None and keys:
+            try:
+                pipe = self.redis.pipeline(transaction=False)
+                for key, vector in zip(keys, vectors):
+                    pipe.setex(key, self.ttl, np.asarray(vector, dtype=np.float32).tobytes())
+                pipe.execute()
+            except Exception as e:
+                logger.warning(f"Embedding cache write failed: {e}")
+    
+    def get_stats(self) -> Dict:
+        """Hit/miss counters for this process"""
+        lookups = sum(self.stats.values())
+        hits = self.stats["l1_hits"] + self.stats["l2_hits"]
+        return {
+            **self.stats,
+            "entries": len(self._l1),
+            "hit_rate": round((hits / lookups * 100) if lookups > 0 else 0, 2)
+        }
+    
+    def _redis_get(self, keys: List[str]) -> List[Optional[bytes]]:
+        try:
+            return self.redis.mget(keys)
+        except Exception as e:
+            logger.warning(f"Embedding cache read failed: {e}")
+            return [None] * len(keys)
+    
+    def _record(self, l1_hits: int, l2_hits: int, misses: int):
+        self.stats["l1_hits"] += l1_hits
+        self.stats["l2_hits"] += l2_hits
+        self.stats["misses"] += misses
+        for result, count in (("l1_hit", l1_hits), ("l2_hit", l2_hits), ("miss", misses)):
+            if count:
+                MetricsService.track_embedding_cache(result, count)
@@ -1,45 +1,120 @@
 """
 Embeddings Service
 
-Simple embeddings using sentence-transformers (local, no API cost)
+Simple embeddings using sentence-transformers or ONNX Runtime (local, no API cost)
 """
 
-from sentence_transformers import SentenceTransformer
+import redis
 import numpy as np
-from typing import List
+from typing import List, Optional
+from src.config import get_settings
+from src.infrastructure.rag.embedding_cache import EmbeddingCache
+from src.infrastructure.rag.embedding_batcher import EmbeddingBatcher
+from src.infrastructure.rag.embedding_backends import OnnxBackend, SentenceTransformerBackend
 import logging
 
 logger = logging.getLogger(__name__)
+settings = get_settings()
+
+# Imported on first use: pulling in torch takes seconds, and ONNX-only
+# images ship without it
+SentenceTransformer = None
+
+
+def _load_sentence_transformer(model_name: str):
+    global SentenceTransformer
+    if SentenceTransformer is None:
+        try:
+            from sentence_transformers import SentenceTransformer
+        except ImportError:
+            raise ImportError("sentence-transformers is not installed (or set EMBEDDINGS_BACKEND=onnx)")
+    return SentenceTransformer(model_name)
 
 
 class EmbeddingsService:
     """Generate embeddings for text chunks"""
     
-    def __init__(self, model_name: str = "all-MiniLM-L6-v2"):
+    def __init__(
+        self,
+        model_name: str = "all-MiniLM-L6-v2",
+        cache: Optional[EmbeddingCache] = None,
+        backend=None
+    ):
         """
         Initialize embeddings model
         
         Args:
             model_name: Sentence-transformers model (default: all-MiniLM-L6-v2, 384 dims)
+            cache: Embedding cache (default: L1 LRU, plus Redis when EMBEDDING_CACHE_REDIS)
+            backend: Inference backend (default: chosen by EMBEDDINGS_BACKEND)
         """
-        self.model = SentenceTransformer(model_name)
-        self.dimension = self.model.get_sentence_embedding_dimension()
-        logger.info(f"Embeddings model loaded: {model_name} ({self.dimension} dims)")
+        self.backend = backend or self._create_backend(model_name)
+        self.dimension = self.backend.dimension
+        
+        # Quantized vectors differ slightly, so they never share cache entries
+        cache_namespace = model_name
+        if self.backend.name != SentenceTransformerBackend.name:
+            cache_namespace = f"{model_name}@{self.backend.name}"
+        self.cache = cache or EmbeddingCache(
+            cache_namespace,
+            max_entries=settings.EMBEDDING_CACHE_SIZE,
+            redis_client=redis.from_url(settings.REDIS_URL) if settings.EMBEDDING_CACHE_REDIS else None
+        )
+        self.batcher = EmbeddingBatcher(
+            self._encode,
+            max_batch_size=settings.EMBEDDING_BATCH_MAX_SIZE,
+            max_latency_ms=settings.EMBEDDING_BATCH_MAX_LATENCY_MS
+        ) if settings.EMBEDDING_MICRO_BATCHING else None
+        logger.info(f"Embeddings model loaded: {model_name} via {self.backend.name} ({self.dimension} dims)")
+    
+    @staticmethod
+    def _create_backend(model_name: str):
+        """Build the backend selected by EMBEDDINGS_BACKEND"""
+        if settings.EMBEDDINGS_BACKEND == "onnx":
+            return OnnxBackend(
+                settings.EMBEDDINGS_ONNX_PATH,
+                quantize=settings.EMBEDDINGS_ONNX_QUANTIZE,
+                threads=settings.EMBEDDINGS_ONNX_THREADS
+            )
+        
+        return SentenceTransformerBackend(_load_sentence_transformer(model_name))
     
     def embed(self, text: str) -> List[float]:
         """Generate embedding for single text"""
-        embedding = self.model.encode(text, convert_to_numpy=True)
-        return embedding.tolist()
+        return self._embed_cached([text])[0].tolist()
     
     def embed_batch(self, texts: List[str]) -> List[List[float]]:
         """Generate embeddings for multiple texts"""
-        embeddings = self.model.encode(texts, convert_to_numpy=True, show_progress_bar=True)
-        return embeddings.tolist()
+        return [vector.tolist() for vector in self._embed_cached(texts, show_progress_bar=True)]
     
     def similarity(self, text1: str, text2: str) -> float:
         """Calculate cosine similarity between two texts"""
-        emb1 = self.model.encode(text1, convert_to_numpy=True)
-        emb2 = self.model.encode(text2, convert_to_numpy=True)
+        emb1, emb2 = self._embed_cached([text1, text2])
         
         similarity = np.dot(emb1, emb2) / (np.linalg.norm(emb1) * np.linalg.norm(emb2))
         return float(similarity)
+    
+    def _embed_cached(self, texts: List[str], show_progress_bar: bool = False) -> List[np.ndarray]:
+        """Serve texts from the cache and encode only the misses"""
+        vectors = self.cache.get_many(texts)
+        
+        missing = [i for i, vector in enumerate(vectors) if vector is None]
+        if missing:
+            # Duplicates within one call are encoded once
+            unique = list(dict.fromkeys(texts[i] for i in missing))
+            if self.batcher is not None and len(unique) <= self.batcher.max_batch_size:
+                # Small requests share encode calls with concurrent callers
+                encoded = np.stack(self.batcher.embed(unique))
+            else:
+                encoded = self._encode(unique, show_progress_bar=show_progress_bar)
+            self.cache.set_many(unique, encoded)
+            
+            by_text = dict(zip(unique, encoded))
+            for i in missing:
+                vectors[i] = by_text[texts[i]]
+        
+        return vectors
+    
+    def _encode(self, texts: List[str], show_progress_bar: bool = False) -> np.ndarray:
+        """Run the backend on texts"""
+        return self.backend.encode(texts, show_progress_bar=show_progress_bar)
@@ -0,0 +1,76 @@
+"""
+Metadata Index
+
+Inverted index from metadata field values to vector index rows
+"""
+
+import numpy as np
+from typing import Any, Dict, Hashable, List, Optional, Tuple
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class MetadataIndex:
+    """
+    Postings lists of index rows per (field, value)
+    
+    Rows are appended in increasing order, so every postings list is sorted
+    and unique and filters intersect without touching any document.
+    Postings of removed rows are left in place; callers drop them with the
+    vector index's liveness check.
+    """
+    
+    DEFAULT_FIELDS = ("language", "framework", "type", "source")
+    
+    def __init__(self, fields: Tuple[str, ...] = DEFAULT_FIELDS):
+        self.fields = tuple(fields)
+        self._postings: Dict[str, Dict[Any, List[int]]] = {field: {} for field in self.fields}
+        self._cache: Dict[Tuple[str, Any], np.ndarray] = {}
+    
+    def add(self, row: int, metadata: Dict[str, Any]):
+        """Register row under each indexed field value"""
+        for field in self.fields:
+            value = metadata.get(field)
+            if value is None or not isinstance(value, Hashable):
+                continue
+            self._postings[field].setdefault(value, []).append(row)
+            self._cache.pop((field, value), None)
+    
+    def add_batch(self, rows: List[int], metadata: List[Dict[str, Any]]):
+        for row, meta in zip(rows, metadata):
+            self.add(row, meta)
+    
+    def is_indexed(self, field: str) -> bool:
+        return field in self._postings
+    
+    def candidates(self, filters: Dict[str, Any]) -> Optional[np.ndarray]:
+        """
+        Rows matching every indexed filter field
+        
+        Returns:
+            Sorted row array, or None when no filter field is indexed
+        """
+        indexed = [(field, value) for field, value in filters.items() if field in self._postings]
+        if not indexed:
+            return None
+        
+        # Intersect smallest postings first so selective filters stay cheap
+        postings = sorted((self._rows(field, value) for field, value in indexed), key=len)
+        result = postings[0]
+        for rows in postings[1:]:
+            if len(result) == 0:
+                break
+            result = np.intersect1d(result, rows, assume_unique=True)
+        return result
+    
+    def _rows(self, field: str, value: Any) -> np.ndarray:
+        if not isinstance(value, Hashable):
+            return np.empty(0, dtype=np.int64)
+        
+        key = (field, value)
+        rows = self._cache.get(key)
+        if rows is None:
+            rows = np.asarray(self._postings[field].get(value, ()), dtype=np.int64)
+            self._cache[key] = rows
+        return rows
@@ -0,0 +1,143 @@
+"""
+Cross-Encoder Re-ranker
+
+Optional second-stage scoring of retrieved chunks under a latency budget
+"""
+
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from typing import Dict, List, Optional
+from src.infrastructure.cache.lru_cache import LRUCache
+from src.infrastructure.monitoring.metrics_service import MetricsService
+import hashlib
+import math
+import time
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Imported on first use, like SentenceTransformer in embeddings_service
+CrossEncoder = None
+
+
+def _load_cross_encoder(model_name: str, max_length: int):
+    global CrossEncoder
+    if CrossEncoder is None:
+        try:
+            from sentence_transformers import CrossEncoder
+        except ImportError:
+            raise ImportError("sentence-transformers is not installed (needed by RAG_RERANKER_ENABLED)")
+    return CrossEncoder(model_name, max_length=max_length, device="cpu")
+
+
+class CrossEncoderReranker:
+    """
+    Re-rank retrieved chunks with a cross-encoder
+    
+    All uncached (query, chunk) pairs of a call are scored in one predict
+    on a worker thread. When that does not finish within the budget the
+    results keep their incoming order; the batch still completes in the
+    background and fills the score cache, so a repeated query is re-ranked
+    next time. Scores are cached by (query hash, chunk id), and chunk ids
+    are content hashes, so cached scores never go stale.
+    """
+    
+    DEFAULT_MODEL = "cross-encoder/ms-marco-MiniLM-L-6-v2"
+    
+    def __init__(
+        self,
+        model=None,
+        model_name: str = DEFAULT_MODEL,
+        budget_ms: float = 150.0,
+        cache_size: int = 20000,
+        max_length: int = 512
+    ):
+        """
+        Args:
+            model: Loaded CrossEncoder (default: model_name, loaded here)
+            model_name: Cross-encoder checkpoint
+            budget_ms: Default time allowed per call (math.inf = wait for scores)
+            cache_size: (query, chunk) scores kept
+            max_length: Tokens per pair (longer pairs are truncated)
+        """
+        self.model = model or _load_cross_encoder(model_name, max_length)
+        self.budget_ms = budget_ms
+        self.cache = LRUCache(max_entries=cache_size)
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="reranker")
+    
+    def rerank(self, query: str, results: List[Dict], budget_ms: Optional[float] = None) -> List[Dict]:
+        """
+        Sort results by cross-encoder score
+        
+        Args:
+            query: User query
+            results: Retrieved chunks (with "id" and "content")
+            budget_ms: Override the default budget
+        
+        Returns:
+            Results sorted by "rerank_score", or unchanged if out of budget
+        """
+        return self.rerank_many([query], [results], budget_ms)[0]
+    
+    def rerank_many(
+        self,
+        queries: List[str],
+        result_lists: List[List[Dict]],
+        budget_ms: Optional[float] = None
+    ) -> List[List[Dict]]:
+        """Re-rank several queries' results with a single predict call"""
+        start = time.perf_counter()
+        budget_ms = self.budget_ms if budget_ms is None else budget_ms
+        
+        keys = [
+            [(self._query_hash(query), result["id"]) for result in results]
+            for query, results in zip(queries, result_lists)
+        ]
+        scores = {key: self.cache.get(key) for row in keys for key in row}
+        
+        # Uncached pairs, each once
+        missing: Dict[tuple, tuple] = {}
+        for query, results, row in zip(queries, result_lists, keys):
+            for result, key in zip(results, row):
+                if scores[key] is None and key not in missing:
+                    missing[key] = (query, result["content"])
+        
+        outcome = "cached"
+        if missing:
+            future = self._executor.submit(self._score, list(missing.values()), list(missing))
+            timeout = budget_ms / 1000 if math.isfinite(budget_ms) else None
+            try:
+                scores.update(future.result(timeout=timeout))
+                outcome = "scored"
+            except FutureTimeoutError:
+                future.cancel()  # Only drops it if still queued
+                outcome = "timeout"
+            except Exception as e:
+                logger.warning(f"Re-ranking failed, keeping retrieval order: {e}")
+                outcome = "error"
+        
+        MetricsService.track_rerank(outcome, time.perf_counter() - start)
+        if outcome in ("timeout", "error"):
+            return result_lists
+        
+        reranked = []
+        for results, row in zip(result_lists, keys):
+            for result, key in zip(results, row):
+                result["rerank_score"] = scores[key]
+            reranked.append(sorted(results, key=lambda r: r["rerank_score"], reverse=True))
+        return reranked
+    
+    def _score(self, pairs: List[tuple], keys: List[tuple]) -> Dict[tuple, float]:
+        """Score pairs in one batch and cache them (runs on the worker)"""
+        values = self.model.predict(pairs, batch_size=len(pairs), show_progress_bar=False)
+        scores = {key: float(value) for key, value in zip(keys, values)}
+        for key, value in scores.items():
+            self.cache.set(key, value)
+        return scores
+    
+    @staticmethod
+    def _query_hash(query: str) -> str:
+        return hashlib.sha256(query.strip().encode()).hexdigest()[:16]
+    
+    def close(self):
+        """Stop the worker thread"""
+        self._executor.shutdown(wait=False)
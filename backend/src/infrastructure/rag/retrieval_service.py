@@ -4,54 +4,260 @@ Retrieval Service
 Semantic search and context injection for RAG
 """
 
-from typing import List, Dict, Optional
+from collections import deque
+from functools import lru_cache
+from typing import List, Dict, Iterable, Optional, Tuple
+from src.config import get_settings
+from src.infrastructure.cache.lru_cache import LRUCache
+from src.infrastructure.monitoring.metrics_service import MetricsService
 from src.infrastructure.rag.embeddings_service import EmbeddingsService
 from src.infrastructure.rag.vector_store import VectorStore
-from src.infrastructure.rag.document_processor import DocumentProcessor
+from src.infrastructure.rag.document_processor import DocumentProcessor, DocumentChunk
+from src.infrastructure.rag.reranker import CrossEncoderReranker
+import hashlib
+import math
+import threading
 import logging
 
 logger = logging.getLogger(__name__)
+settings = get_settings()
 
 
 class RetrievalService:
-    """RAG retrieval service"""
-    
-    def __init__(self):
-        # RAG disabled for production (requires sentence-transformers)
-        # Uncomment when needed:
-        # self.embeddings = EmbeddingsService()
-        # self.vector_store = VectorStore()
-        # self.processor = DocumentProcessor()
-        logger.warning("RAG disabled - install sentence-transformers to enable")
-    
-    def index_code(self, code: str, language: str, source: str):
-        """Index code for retrieval"""
-        # Process into chunks
-        chunks = self.processor.process_code(code, language, source)
+    """
+    RAG retrieval service
+    
+    The embeddings model and vector index load in a background thread on
+    first use (or via warm_up at startup), so constructing the service is
+    free. Until they are ready build_context returns empty context instead
+    of blocking the request; indexing and explicit retrieval wait.
+    """
+    
+    # New chunks embedded per embed_batch call when indexing
+    INDEX_BATCH_SIZE = 256
+    
+    def __init__(
+        self,
+        embeddings: Optional[EmbeddingsService] = None,
+        vector_store: Optional[VectorStore] = None,
+        processor: Optional[DocumentProcessor] = None,
+        reranker: Optional[CrossEncoderReranker] = None,
+        enabled: Optional[bool] = None
+    ):
+        """
+        Args:
+            embeddings: Embeddings service (default: loaded lazily)
+            vector_store: Vector store (default: loaded lazily)
+            processor: Document processor (default: loaded lazily)
+            reranker: Cross-encoder re-ranker (default: loaded lazily when
+                RAG_RERANKER_ENABLED)
+            enabled: Override RAG_ENABLED
+        """
+        self.embeddings = embeddings
+        self.vector_store = vector_store
+        self.processor = processor
+        self.reranker = reranker
+        self.enabled = settings.RAG_ENABLED if enabled is None else enabled
+        self.hybrid = settings.RAG_HYBRID_SEARCH
+        # Formatted contexts keyed by (index generation, query, language)
+        self.context_cache = LRUCache(
+            max_entries=settings.RAG_CONTEXT_CACHE_SIZE,
+            ttl=settings.RAG_CONTEXT_CACHE_TTL
+        )
+        self.load_error: Optional[Exception] = None
+        self._loaded = threading.Event()
+        self._loader: Optional[threading.Thread] = None
+        self._loader_lock = threading.Lock()
+    
+    @property
+    def is_ready(self) -> bool:
+        """Whether model and index are loaded"""
+        return self._loaded.is_set() and self.load_error is None
+    
+    @property
+    def status(self) -> str:
+        """disabled, idle, loading, ready or failed"""
+        if not self.enabled:
+            return "disabled"
+        if self.is_ready:
+            return "ready"
+        if self.load_error is not None:
+            return "failed"
+        return "loading" if self._loader is not None else "idle"
+    
+    def warm_up(self) -> Optional[threading.Thread]:
+        """Start loading in the background (no-op if disabled or started)"""
+        if not self.enabled:
+            return None
         
-        # Generate embeddings
-        texts = [chunk.content for chunk in chunks]
-        embeddings = self.embeddings.embed_batch(texts)
+        with self._loader_lock:
+            if self._loader is None:
+                self._loader = threading.Thread(target=self._load, name="rag-loader", daemon=True)
+                self._loader.start()
+        return self._loader
+    
+    def wait_until_ready(self, timeout: Optional[float] = None):
+        """
+        Block until loaded
         
-        # Store in vector DB
-        for i, (chunk, embedding) in enumerate(zip(chunks, embeddings)):
-            chunk_id = f"{source}_{i}"
-            self.vector_store.add(chunk_id, chunk.content, embedding, chunk.metadata)
+        Raises:
+            RuntimeError: RAG disabled, load failed or timed out
+        """
+        loader = self.warm_up()
+        if loader is None:
+            raise RuntimeError("RAG is disabled")
         
-        logger.info(f"Indexed {len(chunks)} chunks from {source}")
+        if not self._loaded.wait(timeout):
+            raise RuntimeError("RAG is still loading")
+        if self.load_error is not None:
+            raise RuntimeError(f"RAG failed to load: {self.load_error}")
+    
+    def _load(self):
+        """Create missing components; injected ones are kept"""
+        try:
+            if self.processor is None:
+                self.processor = DocumentProcessor()
+            if self.vector_store is None:
+                self.vector_store = VectorStore()
+            if self.embeddings is None:
+                self.embeddings = EmbeddingsService()
+            self.vector_store.warm_up()
+            if self.reranker is None and settings.RAG_RERANKER_ENABLED:
+                self.reranker = self._load_reranker()
+        except Exception as e:
+            self.load_error = e
+            logger.error(f"RAG failed to load: {e}")
+        else:
+            logger.info("RAG ready")
+        finally:
+            self._loaded.set()
+    
+    @staticmethod
+    def _load_reranker() -> Optional[CrossEncoderReranker]:
+        """Cross-encoder from settings; retrieval works without it"""
+        try:
+            return CrossEncoderReranker(
+                model_name=settings.RAG_RERANKER_MODEL,
+                budget_ms=settings.RAG_RERANKER_BUDGET_MS,
+                cache_size=settings.RAG_RERANKER_CACHE_SIZE
+            )
+        except Exception as e:
+            logger.warning(f"Re-ranker unavailable, using retrieval order: {e}")
+            return None
     
-    def index_documentation(self, text: str, framework: str, version: str = "latest"):
-        """Index documentation"""
+    def index_code(self, code: str, language: str, source: str) -> Dict:
+        """Index code for retrieval (only new or changed chunks are embedded)"""
+        self.wait_until_ready()
+        chunks = self.processor.process_code(code, language, source)
+        return self._index_chunks(source, chunks)
+    
+    def index_documentation(self, text: str, framework: str, version: str = "latest") -> Dict:
+        """Index documentation (only new or changed sections are embedded)"""
+        self.wait_until_ready()
         chunks = self.processor.process_documentation(text, framework, version)
+        return self._index_chunks(f"{framework}_{version}", chunks)
+    
+    def index_files(self, paths: Iterable[str], language: Optional[str] = None, workers: int = 0) -> Dict:
+        """
+        Stream files into the index
+        
+        Files are read and chunked lazily and new chunks are embedded in
+        INDEX_BATCH_SIZE batches, so memory stays flat for any corpus size.
+        
+        Args:
+            paths: File paths (e.g. DocumentProcessor.iter_source_files(root))
+            language: Force a language (default: inferred from extension)
+            workers: Chunk in this many processes (0 = in this thread)
+        
+        Returns:
+            Counts of added, unchanged and removed chunks, and of sources
+        """
+        self.wait_until_ready()
+        if workers:
+            sources = self.processor.process_files(paths, language, workers=workers)
+        else:
+            sources = ((path, self.processor.iter_files([path], language)) for path in paths)
+        return self._index_sources(sources)
+    
+    def _index_chunks(self, source: str, chunks: Iterable[DocumentChunk]) -> Dict:
+        """Incrementally sync one source's chunks with the vector store"""
+        stats = self._index_sources([(source, chunks)])
+        del stats["sources"]
+        return stats
+    
+    def _index_sources(self, sources: Iterable[Tuple[str, Iterable[DocumentChunk]]]) -> Dict:
+        """
+        Incrementally sync each source's chunks with the vector store
+        
+        Chunk ids are content hashes, so unchanged chunks keep their id and
+        are skipped; chunks missing from the new version are deleted. New
+        chunks of consecutive sources share embedding batches, and a
+        source's manifest is only written once all its new chunks are stored.
+        
+        Returns:
+            Counts of added, unchanged and removed chunks, and of sources
+        """
+        stats = {"added": 0, "unchanged": 0, "removed": 0, "sources": 0}
+        pending: List[Tuple[str, DocumentChunk]] = []
+        # (source, chunk ids, orphan ids, chunks queued up to and including it)
+        waiting: deque = deque()
+        queued = stored = 0
         
-        texts = [chunk.content for chunk in chunks]
-        embeddings = self.embeddings.embed_batch(texts)
+        for source, chunks in sources:
+            by_id = {}
+            for chunk in chunks:
+                by_id.setdefault(self._chunk_id(source, chunk.content), chunk)
+            
+            indexed = self.vector_store.get_manifest(source)
+            new_ids = [chunk_id for chunk_id in by_id if chunk_id not in indexed]
+            orphan_ids = [chunk_id for chunk_id in indexed if chunk_id not in by_id]
+            
+            pending.extend((chunk_id, by_id[chunk_id]) for chunk_id in new_ids)
+            queued += len(new_ids)
+            waiting.append((source, list(by_id), orphan_ids, queued))
+            
+            stats["added"] += len(new_ids)
+            stats["unchanged"] += len(by_id) - len(new_ids)
+            stats["removed"] += len(orphan_ids)
+            stats["sources"] += 1
+            
+            while len(pending) >= self.INDEX_BATCH_SIZE:
+                stored += self._store_batch(pending[:self.INDEX_BATCH_SIZE])
+                del pending[:self.INDEX_BATCH_SIZE]
+                self._finish_sources(waiting, stored)
         
-        for i, (chunk, embedding) in enumerate(zip(chunks, embeddings)):
-            chunk_id = f"{framework}_{version}_{i}"
-            self.vector_store.add(chunk_id, chunk.content, embedding, chunk.metadata)
+        if pending:
+            stored += self._store_batch(pending)
+        self._finish_sources(waiting, stored)
         
-        logger.info(f"Indexed {len(chunks)} docs for {framework}")
+        logger.info(
+            f"Indexed {stats['sources']} source(s): {stats['added']} new, "
+            f"{stats['unchanged']} unchanged, {stats['removed']} removed"
+        )
+        return stats
+    
+    def _store_batch(self, batch: List[Tuple[str, DocumentChunk]]) -> int:
+        """Embed and store one batch of new chunks"""
+        embeddings = self.embeddings.embed_batch([chunk.content for _, chunk in batch])
+        self.vector_store.add_many([
+            (chunk_id, chunk.content, embedding, chunk.metadata)
+            for (chunk_id, chunk), embedding in zip(batch, embeddings)
+        ])
+        return len(batch)
+    
+    def _finish_sources(self, waiting: deque, stored: int):
+        """Drop orphans and write manifests of sources whose chunks are all stored"""
+        while waiting and waiting[0][3] <= stored:
+            source, chunk_ids, orphan_ids, _ = waiting.popleft()
+            if orphan_ids:
+                self.vector_store.delete(orphan_ids)
+            self.vector_store.set_manifest(source, chunk_ids)
+    
+    @staticmethod
+    def _chunk_id(source: str, content: str) -> str:
+        """Content-addressed chunk id"""
+        digest = hashlib.sha256(content.encode()).hexdigest()[:16]
+        return f"{source}_{digest}"
     
     def retrieve(
         self,
@@ -72,6 +278,8 @@ class RetrievalService:
         Returns:
             List of relevant chunks with scores
         """
+        self.wait_until_ready()
+        
         # Generate query embedding
         query_embedding = self.embeddings.embed(query)
         
@@ -82,20 +290,88 @@ class RetrievalService:
         if framework:
             filters["framework"] = framework
         
-        # Search vector store
-        results = self.vector_store.search(
-            query_embedding,
-            top_k=top_k * 2,  # Get more for re-ranking
-            filter_metadata=filters if filters else None
-        )
+        # The cross-encoder picks top_k out of a wider candidate set
+        depth = self._candidate_depth(top_k)
+        if self.hybrid:
+            # BM25 + vector rankings fused in the store
+            results = self.vector_store.search(
+                query_embedding,
+                top_k=depth,
+                filter_metadata=filters if filters else None,
+                query_text=query
+            )
+        else:
+            # Search vector store
+            results = self.vector_store.search(
+                query_embedding,
+                top_k=depth * 2,  # Get more for re-ranking
+                filter_metadata=filters if filters else None
+            )
+            
+            # Re-rank by relevance
+            results = self._rerank(query, results)[:depth]
         
-        # Re-rank by relevance
-        reranked = self._rerank(query, results)
+        if self.reranker is not None:
+            results = self.reranker.rerank(query, results)
         
-        return reranked[:top_k]
+        return results[:top_k]
+    
+    def retrieve_many(
+        self,
+        queries: List[str],
+        top_k: int = 3,
+        filters: Optional[Dict] = None
+    ) -> List[List[Dict]]:
+        """
+        Retrieve context for many queries at once (batch jobs)
+        
+        Args:
+            queries: User queries
+            top_k: Number of results per query
+            filters: Optional metadata filters shared by all queries
+        
+        Returns:
+            One list of relevant chunks per query, in input order
+        """
+        if not queries:
+            return []
+        self.wait_until_ready()
+        
+        # One forward pass and one batched search for the whole set
+        query_embeddings = self.embeddings.embed_batch(queries)
+        depth = self._candidate_depth(top_k)
+        if self.hybrid:
+            batch = self.vector_store.search_many(
+                query_embeddings,
+                top_k=depth,
+                filter_metadata=filters or None,
+                query_texts=queries
+            )
+        else:
+            batch = self.vector_store.search_many(
+                query_embeddings,
+                top_k=depth * 2,  # Get more for re-ranking
+                filter_metadata=filters or None
+            )
+            batch = [
+                self._rerank(query, results)[:depth]
+                for query, results in zip(queries, batch)
+            ]
+        
+        if self.reranker is not None:
+            # Batch jobs wait for scores instead of falling back
+            batch = self.reranker.rerank_many(queries, batch, budget_ms=math.inf)
+        
+        return [results[:top_k] for results in batch]
+    
+    def _candidate_depth(self, top_k: int) -> int:
+        """Results fetched per query before the final cut to top_k"""
+        if self.reranker is None:
+            return top_k
+        return max(top_k, settings.RAG_RERANKER_CANDIDATES)
     
     def _rerank(self, query: str, results: List[Dict]) -> List[Dict]:
-        """Re-rank results by query relevance"""
+        """Re-rank results by query relevance (vector-only search)"""
         # Simple re-ranking: boost exact keyword matches
         query_lower = query.lower()
         keywords = set(query_lower.split())
@@ -118,15 +394,42 @@ class RetrievalService:
         """
         Build context string for LLM prompt
         
+        Results are cached per query (with spacing normalised) and language
+        under the vector store generation, so any write to the index (from
+        this or another process) makes older entries unreachable; a
+        repeated question costs one GET instead of an embed and a search.
+        
         Args:
             query: User query
             language: Programming language filter
         
         Returns:
-            Formatted context string
+            Formatted context string (empty while RAG is disabled or loading)
         """
-        results = self.retrieve(query, top_k=3, language=language)
+        if not self.is_ready:
+            self.warm_up()
+            return ""
         
+        query = self._normalize_query(query)
+        key = (self.vector_store.generation(), query, language)
+        context = self.context_cache.get(key)
+        if context is not None:
+            MetricsService.track_context_cache("hit")
+            return context
+        MetricsService.track_context_cache("miss")
+        
+        context = self._format_context(self.retrieve(query, top_k=3, language=language))
+        self.context_cache.set(key, context)
+        return context
+    
+    @staticmethod
+    def _normalize_query(query: str) -> str:
+        """Spacing variants share an entry; case is kept, as BM25 splits identifiers on it"""
+        return " ".join(query.split())
+    
+    @staticmethod
+    def _format_context(results: List[Dict]) -> str:
+        """[RELEVANT DOCUMENTATION] block for the prompt"""
         if not results:
             return ""
         
@@ -145,7 +448,17 @@ class RetrievalService:
     
     def get_stats(self) -> Dict:
         """Get retrieval statistics"""
+        if not self.is_ready:
+            return {"status": self.status}
+        
         return {
+            "status": self.status,
             "total_documents": self.vector_store.count(),
             "embedding_dimension": self.embeddings.dimension
         }
+
+
+@lru_cache()
+def get_retrieval_service() -> RetrievalService:
+    """Process-wide RetrievalService (loads on first use)"""
+    return RetrievalService()
@@ -1,14 +1,22 @@
 """
 Vector Store
 
-Simple vector storage using Redis with RediSearch
+Redis-backed document storage with an in-process ANN index for search
 """
 
 import redis
+import copy
 import json
+import os
+import shutil
+import threading
+import uuid
 import numpy as np
-from typing import List, Dict, Any, Optional
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple
 from src.config import get_settings
+from src.infrastructure.rag.ann_index import IVFIndex
+from src.infrastructure.rag.metadata_index import MetadataIndex
+from src.infrastructure.rag.bm25_index import BM25Index
 import logging
 
 logger = logging.getLogger(__name__)
@@ -16,25 +24,155 @@ settings = get_settings()
 
 
 class VectorStore:
-    """Simple vector store using Redis"""
+    """
+    Vector store using Redis for persistence and an IVF index for search
     
-    def __init__(self):
+    Redis remains the source of truth: each document is a hash holding
+    content, JSON metadata and the embedding as packed float32 bytes.
+    Each process keeps an in-memory index (one pre-normalised matrix), so
+    a search costs one GET of the shared generation counter plus one
+    pipelined fetch of the top_k contents. Every write bumps the counter
+    and appends the chunk ids it touched to a capped changelog stream in
+    the same transaction; when another process has written, the next
+    search re-reads only those chunks. A full reload from Redis happens
+    on first use, or when the changelog no longer reaches back to the
+    local generation, and is built off to the side and swapped in while
+    searches keep using the previous index. A BM25 index over the same
+    rows backs hybrid (lexical + vector) search.
+    
+    The local index can be saved to and loaded from a directory snapshot
+    (see save/load), so replicas map a prebuilt index instead of
+    rebuilding it, and a flushed Redis is refilled without re-embedding.
+    """
+    
+    GENERATION_KEY = "vector_store:generation"
+    # Random id of the Redis dataset, so generations are only compared
+    # within one dataset (a flush drops it and the counter restarts)
+    EPOCH_KEY = "vector_store:epoch"
+    # Stream with one {op, ids} entry per generation, newest last
+    CHANGES_KEY = "vector_store:changes"
+    CHANGELOG_SIZE = 1000
+    # Extra entries read in case other writers move on during a catch-up
+    CHANGELOG_SLACK = 16
+    LOAD_BATCH_SIZE = 500
+    # Filter partitions up to this size are scored exactly instead of via IVF
+    EXACT_FILTER_LIMIT = 20000
+    # Hybrid search: candidates taken from each ranking, and the RRF constant
+    HYBRID_DEPTH = 50
+    RRF_K = 60
+    SNAPSHOT_FORMAT = 1
+    
+    def __init__(self, index: Optional[IVFIndex] = None):
         self.client = redis.from_url(settings.REDIS_URL, decode_responses=False)
         self.index_name = "cerberus_docs"
+        self.index = index if index is not None else IVFIndex()
+        self._index_params = {
+            "nlist": self.index.nlist,
+            "nprobe": self.index.nprobe,
+            "train_threshold": self.index.train_threshold
+        }
+        self._metadata: List[Optional[Dict[str, Any]]] = []
+        self.metadata_index = MetadataIndex()
+        self.lexical_index = BM25Index()
+        self._generation: Optional[int] = None
+        # Epoch of the dataset the local index was loaded from
+        self._dataset_epoch: Optional[str] = None
+        self._lock = threading.RLock()
+        self._reload_lock = threading.Lock()
     
     def add(self, chunk_id: str, content: str, embedding: List[float], metadata: Dict[str, Any]):
         """Add document chunk to store"""
-        doc = {
-            "content": content,
-            "embedding": embedding,
-            "metadata": metadata
-        }
-        
-        key = f"doc:{chunk_id}"
-        self.client.set(key, json.dumps(doc))
+        self.add_many([(chunk_id, content, embedding, metadata)])
         logger.debug(f"Added document: {chunk_id}")
     
-    def search(self, query_embedding: List[float], top_k: int = 5, filter_metadata: Optional[Dict] = None) -> List[Dict]:
+    def add_many(self, documents: List[Tuple[str, str, List[float], Dict[str, Any]]]):
+        """Add (chunk_id, content, embedding, metadata) tuples in one pipeline"""
+        if not documents:
+            return
+        
+        pipe = self.client.pipeline()
+        for chunk_id, content, embedding, metadata in documents:
+            key = f"doc:{chunk_id}"
+            # DEL first so legacy JSON-string documents are replaced by the hash
+            pipe.delete(key)
+            pipe.hset(key, mapping={
+                "content": content,
+                "metadata": json.dumps(metadata),
+                "embedding": self._pack(embedding)
+            })
+        self._log_change(pipe, "add", [doc[0] for doc in documents])
+        pipe.incr(self.GENERATION_KEY)
+        
+        with self._lock:
+            generation = pipe.execute()[-1]
+            self._apply_local(generation, lambda: self._index_documents(
+                [doc[0] for doc in documents],
+                np.asarray([doc[2] for doc in documents], dtype=np.float32),
+                [doc[3] for doc in documents],
+                [doc[1] for doc in documents]
+            ))
+    
+    def delete(self, chunk_ids: List[str]):
+        """Delete document chunks"""
+        if not chunk_ids:
+            return
+        
+        pipe = self.client.pipeline()
+        pipe.delete(*[f"doc:{chunk_id}" for chunk_id in chunk_ids])
+        self._log_change(pipe, "delete", chunk_ids)
+        pipe.incr(self.GENERATION_KEY)
+        
+        with self._lock:
+            generation = pipe.execute()[-1]
+            self._apply_local(generation, lambda: self._remove_documents(chunk_ids))
+        
+        logger.debug(f"Deleted {len(chunk_ids)} documents")
+    
+    def get_manifest(self, source: str) -> Set[str]:
+        """Chunk ids currently indexed for a source"""
+        members = self.client.smembers(f"manifest:{source}")
+        return {m.decode() if isinstance(m, bytes) else m for m in members}
+    
+    def set_manifest(self, source: str, chunk_ids: List[str]):
+        """Replace the chunk ids recorded for a source"""
+        pipe = self.client.pipeline()
+        pipe.delete(f"manifest:{source}")
+        if chunk_ids:
+            pipe.sadd(f"manifest:{source}", *chunk_ids)
+        pipe.execute()
+    
+    def generation(self) -> int:
+        """Shared counter bumped by every write (one GET)"""
+        return int(self.client.get(self.GENERATION_KEY) or 0)
+    
+    def _log_change(self, pipe, op: str, chunk_ids: List[str]):
+        """Queue the changelog entry of a write (before its INCR, in the same transaction)"""
+        pipe.set(self.EPOCH_KEY, uuid.uuid4().hex, nx=True)
+        pipe.xadd(
+            self.CHANGES_KEY,
+            {"op": op, "ids": json.dumps(chunk_ids)},
+            maxlen=self.CHANGELOG_SIZE,
+            approximate=True
+        )
+    
+    def _apply_local(self, generation: int, apply: Callable[[], None]):
+        """
+        Mirror a write locally if no other writer moved the generation
+        
+        Otherwise the next search replays it from the changelog along with
+        the other writers' changes.
+        """
+        if self._generation is not None and generation == self._generation + 1:
+            apply()
+            self._generation = generation
+    
+    def search(
+        self,
+        query_embedding: List[float],
+        top_k: int = 5,
+        filter_metadata: Optional[Dict] = None,
+        query_text: Optional[str] = None
+    ) -> List[Dict]:
         """
         Search for similar documents
         
@@ -42,45 +180,620 @@ class VectorStore:
             query_embedding: Query vector
             top_k: Number of results
             filter_metadata: Optional metadata filters
+            query_text: Query text; when given, BM25 and vector rankings are
+                merged with reciprocal rank fusion and score is the RRF score
         
         Returns:
             List of matching documents with scores
         """
-        results = []
+        self._sync()
+        with self._lock:
+            candidates = self._filter_rows(filter_metadata)
+            depth = max(top_k, self.HYBRID_DEPTH) if query_text else top_k
+            rows, scores = self._vector_rows(query_embedding, depth, candidates)
+            if query_text:
+                lexical_rows, _ = self.lexical_index.search(query_text, depth, rows=candidates)
+                rows, scores = self._fuse([rows, lexical_rows], top_k)
+            hits = self._hits(rows, scores)
         
-        # Get all documents (simple implementation)
-        keys = self.client.keys("doc:*")
+        if not hits:
+            return []
         
-        for key in keys:
-            doc_json = self.client.get(key)
-            if not doc_json:
+        chunk_ids = [chunk_id for chunk_id, _, _ in hits]
+        return self._to_results(hits, dict(zip(chunk_ids, self._fetch_contents(chunk_ids))))
+    
+    def search_many(
+        self,
+        query_embeddings: List[List[float]],
+        top_k: int = 5,
+        filter_metadata: Optional[Dict] = None,
+        query_texts: Optional[List[str]] = None
+    ) -> List[List[Dict]]:
+        """
+        Search for many queries in one pass
+        
+        Args:
+            query_embeddings: Query vectors
+            top_k: Number of results per query
+            filter_metadata: Optional metadata filters (shared by all queries)
+            query_texts: Query texts for hybrid BM25 + vector search
+        
+        Returns:
+            One result list per query, in input order
+        """
+        self._sync()
+        with self._lock:
+            candidates = self._filter_rows(filter_metadata)
+            depth = max(top_k, self.HYBRID_DEPTH) if query_texts else top_k
+            if candidates is None:
+                batch = self.index.search_batch(query_embeddings, top_k=depth)
+            elif len(candidates) <= self.EXACT_FILTER_LIMIT:
+                batch = self.index.search_rows_batch(query_embeddings, candidates, top_k=depth)
+            else:
+                batch = self.index.search_batch(query_embeddings, top_k=depth, mask=self._mask(candidates))
+            
+            if query_texts:
+                batch = [
+                    self._fuse([rows, self.lexical_index.search(text, depth, rows=candidates)[0]], top_k)
+                    for (rows, _), text in zip(batch, query_texts)
+                ]
+            hits = [self._hits(rows, scores) for rows, scores in batch]
+        
+        # Shared chunks are fetched once for the whole batch
+        chunk_ids = list(dict.fromkeys(chunk_id for query_hits in hits for chunk_id, _, _ in query_hits))
+        contents = dict(zip(chunk_ids, self._fetch_contents(chunk_ids))) if chunk_ids else {}
+        
+        return [self._to_results(query_hits, contents) for query_hits in hits]
+    
+    def _vector_rows(
+        self,
+        query_embedding: List[float],
+        top_k: int,
+        candidates: Optional[np.ndarray]
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        if candidates is None:
+            return self.index.search(query_embedding, top_k=top_k)
+        if len(candidates) <= self.EXACT_FILTER_LIMIT:
+            return self.index.search_rows(query_embedding, candidates, top_k=top_k)
+        return self.index.search(query_embedding, top_k=top_k, mask=self._mask(candidates))
+    
+    def _fuse(self, rankings: List[np.ndarray], top_k: int) -> Tuple[np.ndarray, np.ndarray]:
+        """Reciprocal rank fusion: score = sum of 1 / (RRF_K + rank)"""
+        fused: Dict[int, float] = {}
+        for ranking in rankings:
+            for rank, row in enumerate(ranking.tolist(), start=1):
+                fused[row] = fused.get(row, 0.0) + 1.0 / (self.RRF_K + rank)
+        
+        best = sorted(fused.items(), key=lambda item: item[1], reverse=True)[:top_k]
+        return (
+            np.fromiter((row for row, _ in best), dtype=np.int64, count=len(best)),
+            np.fromiter((score for _, score in best), dtype=np.float32, count=len(best))
+        )
+    
+    def _filter_rows(self, filter_metadata: Optional[Dict]) -> Optional[np.ndarray]:
+        """
+        Rows matching the filters (None when unfiltered)
+        
+        Indexed fields are resolved from the postings lists; any remaining
+        fields are checked only against that candidate partition.
+        """
+        if not filter_metadata:
+            return None
+        
+        rows = self.metadata_index.candidates(filter_metadata)
+        if rows is None:
+            rows = np.arange(len(self._metadata))
+        
+        residual = {
+            key: value for key, value in filter_metadata.items()
+            if not self.metadata_index.is_indexed(key)
+        }
+        if residual and len(rows):
+            keep = np.fromiter(
+                (self._metadata[row] is not None and self._matches_filter(self._metadata[row], residual)
+                 for row in rows.tolist()),
+                dtype=bool,
+                count=len(rows)
+            )
+            rows = rows[keep]
+        return rows
+    
+    def _mask(self, rows: np.ndarray) -> np.ndarray:
+        mask = np.zeros(self.index.size, dtype=bool)
+        mask[rows] = True
+        return mask
+    
+    def _hits(self, rows: np.ndarray, scores: np.ndarray) -> List[tuple]:
+        return [
+            (self.index.key_at(row), self._metadata[row], float(score))
+            for row, score in zip(rows.tolist(), scores.tolist())
+        ]
+    
+    def _to_results(self, hits: List[tuple], contents: Dict[str, Optional[str]]) -> List[Dict]:
+        results = []
+        for chunk_id, metadata, score in hits:
+            content = contents.get(chunk_id)
+            if content is None:
                 continue
+            results.append({
+                "id": chunk_id,
+                "content": content,
+                "metadata": metadata,
+                "score": score
+            })
+        return results
+    
+    def _fetch_contents(self, chunk_ids: List[str]) -> List[Optional[str]]:
+        """Fetch contents for the winners in a single round trip"""
+        pipe = self.client.pipeline(transaction=False)
+        for chunk_id in chunk_ids:
+            pipe.hget(f"doc:{chunk_id}", "content")
+        replies = pipe.execute(raise_on_error=False)
+        
+        contents = []
+        for chunk_id, reply in zip(chunk_ids, replies):
+            if isinstance(reply, redis.ResponseError):
+                doc = self._get_legacy(f"doc:{chunk_id}")
+                contents.append(doc["content"] if doc else None)
+            else:
+                contents.append(reply.decode() if isinstance(reply, bytes) else reply)
+        return contents
+    
+    def warm_up(self):
+        """Load the local index now (from RAG_SNAPSHOT_PATH when set) instead of on the first search"""
+        with self._lock:
+            snapshot = settings.RAG_SNAPSHOT_PATH
+            if snapshot and self._generation is None and os.path.exists(os.path.join(snapshot, "manifest.json")):
+                try:
+                    self.load(snapshot)
+                except Exception as e:
+                    logger.warning(f"Vector snapshot not loaded, rebuilding from Redis: {e}")
+        self._sync()
+    
+    def save(self, path: str) -> Dict[str, Any]:
+        """
+        Write the index to a snapshot directory
+        
+        Live rows are compacted and stored as flat arrays: normalised
+        vectors (`vectors.npy`), BM25 postings, IVF centroids and list
+        assignments, and chunk contents as one UTF-8 blob with offsets.
+        Ids and metadata go to `records.json`, source manifests to
+        `manifests.json`, and `manifest.json` records the epoch and
+        generation the snapshot matches. The directory is replaced as a whole.
+        
+        Args:
+            path: Snapshot directory
+        
+        Returns:
+            The snapshot manifest
+        """
+        self._sync()
+        with self._lock:
+            # Ship the coarse quantizer so loaders never train on first search
+            if not self.index.is_trained and len(self.index) >= self.index.train_threshold:
+                self.index.train()
+            rows = self.index.live_rows()
+            ids = [self.index.key_at(row) for row in rows.tolist()]
+            contents = []
+            for start in range(0, len(ids), self.LOAD_BATCH_SIZE):
+                contents.extend(self._fetch_contents(ids[start:start + self.LOAD_BATCH_SIZE]))
             
-            doc = json.loads(doc_json)
+            # Chunks deleted by another writer meanwhile are left out
+            present = [i for i, content in enumerate(contents) if content is not None]
+            if len(present) < len(ids):
+                rows = rows[present]
+                ids = [ids[i] for i in present]
+                contents = [contents[i] for i in present]
             
-            # Apply metadata filters
-            if filter_metadata:
-                if not self._matches_filter(doc["metadata"], filter_metadata):
-                    continue
+            records = [[chunk_id, self._metadata[row]] for chunk_id, row in zip(ids, rows.tolist())]
+            vectors = self.index.vectors_at(rows)
+            centroids = self.index.centroids
+            assignments = self.index.assignments_at(rows)
+            terms, term_offsets, term_rows, term_tf, lengths = self.lexical_index.export(rows)
+            generation = self._generation
+        
+        manifests = self._read_manifests()
+        self.client.set(self.EPOCH_KEY, uuid.uuid4().hex, nx=True)
+        manifest = {
+            "format": self.SNAPSHOT_FORMAT,
+            "epoch": self._epoch(),
+            "documents": len(ids),
+            "dimension": int(vectors.shape[1]) if vectors.ndim == 2 else 0,
+            "generation": generation,
+            "trained": centroids is not None
+        }
+        
+        tmp_path = f"{path}.tmp"
+        shutil.rmtree(tmp_path, ignore_errors=True)
+        os.makedirs(tmp_path)
+        
+        def write_json(name, value):
+            with open(os.path.join(tmp_path, name), "w", encoding="utf-8") as f:
+                json.dump(value, f)
+        
+        encoded = [content.encode() for content in contents]
+        content_offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+        content_offsets[1:] = np.cumsum([len(blob) for blob in encoded])
+        with open(os.path.join(tmp_path, "contents.bin"), "wb") as f:
+            f.write(b"".join(encoded))
+        
+        np.save(os.path.join(tmp_path, "vectors.npy"), np.ascontiguousarray(vectors, dtype=np.float32))
+        np.save(os.path.join(tmp_path, "content_offsets.npy"), content_offsets)
+        np.save(os.path.join(tmp_path, "lexical_offsets.npy"), term_offsets)
+        np.save(os.path.join(tmp_path, "lexical_rows.npy"), term_rows)
+        np.save(os.path.join(tmp_path, "lexical_tf.npy"), term_tf)
+        np.save(os.path.join(tmp_path, "lexical_lengths.npy"), lengths)
+        if centroids is not None:
+            np.save(os.path.join(tmp_path, "centroids.npy"), centroids)
+            np.save(os.path.join(tmp_path, "assignments.npy"), assignments)
+        write_json("lexical_terms.json", terms)
+        write_json("records.json", records)
+        write_json("manifests.json", manifests)
+        write_json("manifest.json", manifest)
+        
+        # Swap directories so readers never see a half-written snapshot
+        old_path = f"{path}.old"
+        shutil.rmtree(old_path, ignore_errors=True)
+        if os.path.exists(path):
+            os.rename(path, old_path)
+        os.rename(tmp_path, path)
+        shutil.rmtree(old_path, ignore_errors=True)
+        
+        logger.info(f"Vector snapshot saved: {path} ({len(ids)} documents)")
+        return manifest
+    
+    def load(self, path: str, mmap: bool = True) -> Dict[str, Any]:
+        """
+        Replace the local index with a snapshot written by save
+        
+        With mmap, vectors, postings and contents stay in the files and are
+        paged in on use, so worker processes loading the same snapshot
+        share one copy through the page cache. Redis is then reconciled:
+        
+        - at the snapshot's epoch and generation: the index is used as is
+        - without documents (flushed or new node): documents, manifests,
+          epoch and generation are written back from the snapshot, without
+          re-embedding
+        - moved on since the snapshot: the next search replays the
+          changelog from the snapshot's generation, or rebuilds from Redis
+          if it no longer reaches back that far
+        
+        Args:
+            path: Snapshot directory
+            mmap: Memory-map arrays instead of reading them into memory
+        
+        Returns:
+            The snapshot manifest plus "status" (in_sync, restored or stale)
+        
+        Raises:
+            ValueError: Unknown snapshot format
+        """
+        with open(os.path.join(path, "manifest.json"), encoding="utf-8") as f:
+            manifest = json.load(f)
+        if manifest.get("format") != self.SNAPSHOT_FORMAT:
+            raise ValueError(f"Unsupported vector snapshot format: {manifest.get('format')}")
+        
+        def read_array(name):
+            return np.load(os.path.join(path, name), mmap_mode="r" if mmap else None)
+        
+        def read_json(name):
+            with open(os.path.join(path, name), encoding="utf-8") as f:
+                return json.load(f)
+        
+        records = read_json("records.json")
+        ids = [record[0] for record in records]
+        metadata = [record[1] for record in records]
+        vectors = read_array("vectors.npy")
+        
+        index = IVFIndex.from_arrays(
+            ids,
+            vectors,
+            read_array("centroids.npy") if manifest["trained"] else None,
+            read_array("assignments.npy") if manifest["trained"] else None,
+            **self._index_params
+        )
+        lexical_index = BM25Index.from_arrays(
+            read_json("lexical_terms.json"),
+            read_array("lexical_offsets.npy"),
+            read_array("lexical_rows.npy"),
+            read_array("lexical_tf.npy"),
+            read_array("lexical_lengths.npy")
+        )
+        metadata_index = MetadataIndex()
+        metadata_index.add_batch(list(range(len(ids))), metadata)
+        
+        with self._lock:
+            self.index = index
+            self._metadata = metadata
+            self.metadata_index = metadata_index
+            self.lexical_index = lexical_index
             
-            # Calculate cosine similarity
-            similarity = self._cosine_similarity(query_embedding, doc["embedding"])
+            current = self.generation()
+            same_dataset = self._epoch() == manifest["epoch"]
+            if same_dataset and current == manifest["generation"]:
+                status = "in_sync"
+            elif not self._has_documents():
+                status = "restored"
+                self._restore(path, manifest, ids, vectors, metadata)
+            else:
+                status = "stale"
+            if same_dataset or status == "restored":
+                self._generation = manifest["generation"]
+                self._dataset_epoch = manifest["epoch"]
+            else:
+                self._generation = None
+        
+        logger.info(f"Vector snapshot loaded: {path} ({len(ids)} documents, {status})")
+        return {**manifest, "status": status}
+    
+    def _read_manifests(self) -> Dict[str, List[str]]:
+        """Every source manifest, fetched in one pipeline"""
+        sources = [
+            (key.decode() if isinstance(key, bytes) else key)[len("manifest:"):]
+            for key in self.client.scan_iter(match="manifest:*", count=self.LOAD_BATCH_SIZE)
+        ]
+        pipe = self.client.pipeline(transaction=False)
+        for source in sources:
+            pipe.smembers(f"manifest:{source}")
+        members = pipe.execute() if sources else []
+        return {
+            source: sorted(m.decode() if isinstance(m, bytes) else m for m in chunk_ids)
+            for source, chunk_ids in zip(sources, members)
+        }
+    
+    def _epoch(self) -> Optional[str]:
+        epoch = self.client.get(self.EPOCH_KEY)
+        return epoch.decode() if isinstance(epoch, bytes) else epoch
+    
+    def _has_documents(self) -> bool:
+        return next(iter(self.client.scan_iter(match="doc:*", count=self.LOAD_BATCH_SIZE)), None) is not None
+    
+    def _restore(
+        self,
+        path: str,
+        manifest: Dict[str, Any],
+        ids: List[str],
+        vectors: np.ndarray,
+        metadata: List[Dict[str, Any]]
+    ):
+        """Write snapshot documents and manifests back to Redis"""
+        offsets = np.load(os.path.join(path, "content_offsets.npy"))
+        with open(os.path.join(path, "contents.bin"), "rb") as contents:
+            for start in range(0, len(ids), self.LOAD_BATCH_SIZE):
+                end = min(start + self.LOAD_BATCH_SIZE, len(ids))
+                blob = contents.read(int(offsets[end] - offsets[start]))
+                base = int(offsets[start])
+                
+                pipe = self.client.pipeline(transaction=False)
+                for i in range(start, end):
+                    pipe.hset(f"doc:{ids[i]}", mapping={
+                        "content": blob[offsets[i] - base:offsets[i + 1] - base],
+                        "metadata": json.dumps(metadata[i]),
+                        "embedding": np.asarray(vectors[i], dtype=np.float32).tobytes()
+                    })
+                pipe.execute()
+        
+        with open(os.path.join(path, "manifests.json"), encoding="utf-8") as f:
+            manifests = json.load(f)
+        pipe = self.client.pipeline()
+        for source, chunk_ids in manifests.items():
+            pipe.delete(f"manifest:{source}")
+            if chunk_ids:
+                pipe.sadd(f"manifest:{source}", *chunk_ids)
+        # Back to the snapshot's state, so replicas that loaded it stay in
+        # sync; the changelog no longer matches the counter
+        pipe.set(self.EPOCH_KEY, manifest["epoch"])
+        pipe.set(self.GENERATION_KEY, manifest["generation"])
+        pipe.delete(self.CHANGES_KEY)
+        pipe.execute()
+    
+    def _sync(self):
+        """
+        Bring the local index up to the shared generation
+        
+        Replays the changelog when it reaches back to the local generation.
+        Otherwise the first load happens here, and later reloads run in a
+        background thread while searches use the current index.
+        """
+        current = self.generation()
+        if current == self._generation:
+            return
+        if self._generation is None:
+            self._reload()
+        elif not self._reload_lock.locked() and not self._catch_up(current):
+            threading.Thread(target=self._reload, kwargs={"wait": False}, name="vector-reload", daemon=True).start()
+    
+    def _catch_up(self, current: int) -> bool:
+        """
+        Apply the changes made since the local generation
+        
+        Changed chunks are read outside the lock and applied under it.
+        
+        Args:
+            current: Last seen shared generation
+        
+        Returns:
+            False when the changelog cannot bring the index up to date
+            (trimmed, another dataset, or restored from a snapshot)
+        """
+        while True:
+            start = self._generation
+            if start is None or not 0 <= current - start <= self.CHANGELOG_SIZE:
+                return False
+            pipe = self.client.pipeline(transaction=True)
+            pipe.get(self.GENERATION_KEY)
+            pipe.get(self.EPOCH_KEY)
+            pipe.xlen(self.CHANGES_KEY)
+            pipe.xrevrange(self.CHANGES_KEY, count=current - start + self.CHANGELOG_SLACK)
+            current, epoch, length, entries = pipe.execute()
+            current = int(current or 0)
+            behind = current - start
+            if behind == 0:
+                return True
+            epoch = epoch.decode() if isinstance(epoch, bytes) else epoch
+            if epoch != self._dataset_epoch or behind < 0 or length < behind:
+                return False
+            if len(entries) < behind:
+                continue  # Moved on by more than the slack: read again
             
-            results.append({
-                "content": doc["content"],
-                "metadata": doc["metadata"],
-                "score": similarity
-            })
+            # Last operation per chunk; documents are read in their current state
+            changes: Dict[str, str] = {}
+            for _, fields in reversed(entries[:behind]):
+                for chunk_id in json.loads(fields[b"ids"]):
+                    changes[chunk_id] = fields[b"op"].decode()
+            added = [chunk_id for chunk_id, op in changes.items() if op == "add"]
+            batches = [
+                self._read_batch([f"doc:{chunk_id}" for chunk_id in added[i:i + self.LOAD_BATCH_SIZE]])
+                for i in range(0, len(added), self.LOAD_BATCH_SIZE)
+            ]
+            
+            with self._lock:
+                if self._generation != start:
+                    continue  # A local write or reload moved it meanwhile
+                found = {chunk_id for batch in batches for ids, *_ in batch for chunk_id in ids}
+                self._remove_documents([chunk_id for chunk_id in changes if chunk_id not in found])
+                for batch in batches:
+                    for group in batch:
+                        self._index_documents(*group)
+                self._generation = current
+            
+            logger.debug(f"Vector index caught up {behind} generation(s): {len(changes)} chunks")
+            return True
+    
+    def _reload(self, wait: bool = True):
+        """
+        Load every document from Redis into a fresh index and swap it in
+        
+        Writes made while loading are replayed from the changelog after the
+        swap. Returns at once when another thread is reloading, unless wait.
+        """
+        if not self._reload_lock.acquire(blocking=wait):
+            return
+        try:
+            generation, epoch = self.generation(), self._epoch()
+            if generation == self._generation and epoch == self._dataset_epoch:
+                return  # Reloaded by another thread meanwhile
+            
+            fresh = self._empty_copy()
+            batch = []
+            for key in self.client.scan_iter(match="doc:*", count=self.LOAD_BATCH_SIZE):
+                batch.append(key)
+                if len(batch) >= self.LOAD_BATCH_SIZE:
+                    fresh._load_batch(batch)
+                    batch = []
+            if batch:
+                fresh._load_batch(batch)
+            # Train here rather than on the first search after the swap
+            if not fresh.index.is_trained and len(fresh.index) >= fresh.index.train_threshold:
+                fresh.index.train()
+            
+            with self._lock:
+                self.index = fresh.index
+                self._metadata = fresh._metadata
+                self.metadata_index = fresh.metadata_index
+                self.lexical_index = fresh.lexical_index
+                self._generation = generation
+                self._dataset_epoch = epoch
+            logger.info(f"Vector index loaded: {len(fresh.index)} documents")
+        finally:
+            self._reload_lock.release()
+        current = self.generation()
+        if current != self._generation:
+            self._catch_up(current)
+    
+    def _empty_copy(self) -> "VectorStore":
+        """This store (same client) over new, empty local indexes"""
+        fresh = copy.copy(self)
+        fresh.index = IVFIndex(**self._index_params)
+        fresh._metadata = []
+        fresh.metadata_index = MetadataIndex()
+        fresh.lexical_index = BM25Index()
+        return fresh
+    
+    def _load_batch(self, keys: List[bytes]):
+        for group in self._read_batch(keys):
+            self._index_documents(*group)
+    
+    def _read_batch(self, keys: List[bytes]) -> List[Tuple[List[str], np.ndarray, List[Dict[str, Any]], List[str]]]:
+        """(ids, vectors, metadata, contents) of the documents that exist"""
+        pipe = self.client.pipeline(transaction=False)
+        for key in keys:
+            pipe.hmget(key, "embedding", "metadata", "content")
+        replies = pipe.execute(raise_on_error=False)
+        
+        ids, blobs, metadata, contents = [], [], [], []
+        legacy_ids, legacy_vectors, legacy_metadata, legacy_contents = [], [], [], []
+        for key, reply in zip(keys, replies):
+            chunk_id = (key.decode() if isinstance(key, bytes) else key)[len("doc:"):]
+            
+            if isinstance(reply, redis.ResponseError):
+                # WRONGTYPE: document written before the hash format
+                doc = self._get_legacy(key)
+                if doc:
+                    legacy_ids.append(chunk_id)
+                    legacy_vectors.append(doc["embedding"])
+                    legacy_metadata.append(doc["metadata"])
+                    legacy_contents.append(doc["content"])
+                continue
+            
+            blob, metadata_json, content = reply
+            if blob is None:
+                continue
+            ids.append(chunk_id)
+            blobs.append(blob)
+            metadata.append(json.loads(metadata_json))
+            contents.append(content.decode() if isinstance(content, bytes) else content or "")
+        
+        groups = []
+        if ids:
+            # One contiguous float32 matrix straight from the packed blobs
+            vectors = np.frombuffer(b"".join(blobs), dtype=np.float32).reshape(len(ids), -1)
+            groups.append((ids, vectors, metadata, contents))
+        if legacy_ids:
+            groups.append((legacy_ids, np.asarray(legacy_vectors, dtype=np.float32), legacy_metadata, legacy_contents))
+        return groups
+    
+    def _get_legacy(self, key) -> Optional[Dict[str, Any]]:
+        """Read a document stored as a JSON string"""
+        doc_json = self.client.get(key)
+        return json.loads(doc_json) if doc_json else None
+    
+    @staticmethod
+    def _pack(embedding: List[float]) -> bytes:
+        """Serialize an embedding as raw float32 bytes"""
+        return np.asarray(embedding, dtype=np.float32).tobytes()
+    
+    def _index_documents(
+        self,
+        ids: List[str],
+        vectors: np.ndarray,
+        metadata: List[Dict[str, Any]],
+        contents: List[str]
+    ):
+        if len(set(ids)) != len(ids):
+            # Last write wins for ids repeated within one batch
+            keep = sorted({chunk_id: i for i, chunk_id in enumerate(ids)}.values())
+            ids, vectors = [ids[i] for i in keep], vectors[keep]
+            metadata, contents = [metadata[i] for i in keep], [contents[i] for i in keep]
+        
+        for chunk_id in ids:
+            row = self.index.row_of(chunk_id)
+            if row is not None:
+                self._metadata[row] = None
+                self.lexical_index.remove(row)
         
-        # Sort by score and return top_k
-        results.sort(key=lambda x: x["score"], reverse=True)
-        return results[:top_k]
+        rows = self.index.add_batch(ids, vectors)
+        self._metadata.extend(metadata)
+        self.metadata_index.add_batch(rows, metadata)
+        self.lexical_index.add_batch(rows, contents)
     
-    def _cosine_similarity(self, vec1: List[float], vec2: List[float]) -> float:
-        """Calculate cosine similarity"""
-        v1 = np.array(vec1)
-        v2 = np.array(vec2)
-        return float(np.dot(v1, v2) / (np.linalg.norm(v1) * np.linalg.norm(v2)))
+    def _remove_documents(self, ids: List[str]):
+        for chunk_id in ids:
+            row = self.index.row_of(chunk_id)
+            if row is not None:
+                self._metadata[row] = None
+                self.lexical_index.remove(row)
+                self.index.remove(chunk_id)
     
     def _matches_filter(self, metadata: Dict, filters: Dict) -> bool:
         """Check if metadata matches filters"""
@@ -90,12 +803,30 @@ class VectorStore:
         return True
     
     def count(self) -> int:
-        """Count total documents"""
-        return len(self.client.keys("doc:*"))
+        """Count total documents (SCAN, so Redis is never blocked)"""
+        return sum(1 for _ in self.client.scan_iter(match="doc:*", count=self.LOAD_BATCH_SIZE))
     
     def clear(self):
-        """Clear all documents"""
-        keys = self.client.keys("doc:*")
-        if keys:
-            self.client.delete(*keys)
+        """Clear all documents and source manifests"""
+        for pattern in ("doc:*", "manifest:*"):
+            batch = []
+            for key in self.client.scan_iter(match=pattern, count=self.LOAD_BATCH_SIZE):
+                batch.append(key)
+                if len(batch) >= self.LOAD_BATCH_SIZE:
+                    self.client.unlink(*batch)
+                    batch = []
+            if batch:
+                self.client.unlink(*batch)
+        
+        pipe = self.client.pipeline()
+        pipe.delete(self.CHANGES_KEY)
+        pipe.incr(self.GENERATION_KEY)
+        with self._lock:
+            pipe.execute()
+            self._generation = None
+            self.index = IVFIndex(**self._index_params)
+            self._metadata = []
+            self.metadata_index = MetadataIndex()
+            self.lexical_index = BM25Index()
+        
         logger.info("Vector store cleared")
@@ -14,6 +14,8 @@ from src.presentation.user_settings_routes import router as user_settings_router
 from src.infrastructure.database.connection import init_db
 from src.infrastructure.identity import PRODUCT_NAME, API_HEADER_POWERED_BY, API_HEADER_VERSION
 from src.infrastructure.monitoring.metrics_service import MetricsService
+from src.infrastructure.rag.retrieval_service import get_retrieval_service
+from src.config import get_settings
 
 app = FastAPI(
     title=PRODUCT_NAME,
@@ -26,6 +28,9 @@ app = FastAPI(
 @app.on_event("startup")
 async def startup_event():
     init_db()
+    # Background thread: startup and /health never wait for the model
+    if get_settings().RAG_WARM_UP:
+        get_retrieval_service().warm_up()
 
 @app.middleware("http")
 async def add_cerberus_headers(request, call_next):
@@ -71,4 +76,9 @@ async def metrics():
 
 @app.get("/health")
 async def health():
-    return {"status": "ok"}
\ No newline at end of file
+    return {"status": "ok"}
+
+@app.get("/health/rag")
+async def rag_health():
+    """RAG readiness (disabled, idle, loading, ready or failed)"""
+    return {"status": get_retrieval_service().status}
\ No newline at end of file
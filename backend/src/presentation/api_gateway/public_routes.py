@@ -11,12 +11,15 @@ from src.infrastructure.api_gateway.middleware import APIGatewayMiddleware
 from src.infrastructure.database.api_key_repository import APIKeyRepository
 from src.infrastructure.database.connection import get_db
 from src.infrastructure.orchestrator.model_router import ModelRouter
-from src.infrastructure.llm.chain_validator_service import ChainValidatorService
+from src.infrastructure.llm.chain_validator_service import ChainValidatorService, get_llm_service
 from src.infrastructure.monitoring.metrics_service import MetricsService, RequestTimer
 from src.infrastructure.identity import MODEL_JUNIOR, MODEL_SENIOR, MODEL_DEBUG, get_public_model_name
+from src.presentation.streaming import answer_events, completion_events, sse_response
+from src.config import get_settings
 from sqlalchemy.orm import Session
 import time
 
+settings = get_settings()
 router = APIRouter()
 
 
@@ -94,12 +97,15 @@ async def get_api_key(db: Session = Depends(get_db)):
 @router.post("/chat/completions", response_model=ChatCompletionResponse)
 async def chat_completions(
     request: ChatCompletionRequest,
-    auth = Depends(get_api_key)
+    auth = Depends(get_api_key),
+    llm_service: ChainValidatorService = Depends(get_llm_service)
 ):
     """
     OpenAI-compatible chat completions endpoint
     
-    Create a chat completion using Cerberus AI models
+    Create a chat completion using Cerberus AI models. With stream=true
+    the answer is sent as chat.completion.chunk server-sent events,
+    ending with `data: [DONE]`.
     """
     api_key = auth["api_key"]
     
@@ -107,10 +113,13 @@ async def chat_completions(
     router_service = ModelRouter()
     last_message = request.messages[-1].content if request.messages else ""
     
+    # Streamed answers never race Senior, so they are routed (and costed) without speculation
+    speculative = settings.SPECULATIVE_EXECUTION_ENABLED and not request.stream
     route_info = router_service.route(
         question=last_message,
         debug_mode=request.debug_mode,
-        force_model=request.model if request.model != "cerberus-pro" else None
+        force_model=request.model if request.model != "cerberus-pro" else None,
+        speculative_margin=api_key.get_speculative_margin() if speculative else None
     )
     
     # Track metrics
@@ -118,6 +127,12 @@ async def chat_completions(
         # Check cache
         if route_info["use_cache"]:
             MetricsService.track_cache_hit()
+            if request.stream:
+                return sse_response(completion_events(
+                    answer_events(get_public_model_name(MODEL_JUNIOR), "Cached response"),
+                    f"chatcmpl-{int(time.time())}",
+                    "chat"
+                ))
             # Return cached response (simplified)
             return ChatCompletionResponse(
                 id=f"chatcmpl-{int(time.time())}",
@@ -133,19 +148,27 @@ async def chat_completions(
         
         MetricsService.track_cache_miss()
         
-        # Generate response
-        llm_service = ChainValidatorService()
-        
         # Convert messages to conversation history
         history = [
             {"role": msg.role, "parts": [msg.content]}
             for msg in request.messages[:-1]
         ]
         
-        result = llm_service.generate_answer(
+        if request.stream:
+            MetricsService.track_cost(route_info["estimated_cost"])
+            MetricsService.track_model_usage(route_info["model"])
+            events = llm_service.astream_answer(
+                question=last_message,
+                conversation_history=history if history else None,
+                debug_mode=request.debug_mode
+            )
+            return sse_response(completion_events(events, f"chatcmpl-{int(time.time())}", "chat"))
+        
+        result = await llm_service.agenerate_answer(
             question=last_message,
             conversation_history=history if history else None,
-            debug_mode=request.debug_mode
+            debug_mode=request.debug_mode,
+            speculative=route_info.get("speculative", False)
         )
         
         # Track cost
@@ -176,7 +199,8 @@ async def chat_completions(
 @router.post("/code/analyze")
 async def code_analyze(
     request: CodeAnalyzeRequest,
-    auth = Depends(get_api_key)
+    auth = Depends(get_api_key),
+    llm_service: ChainValidatorService = Depends(get_llm_service)
 ):
     """Analyze code for issues"""
     prompt = f"""Analyze this {request.language} code for {', '.join(request.checks)}:
@@ -187,8 +211,7 @@ async def code_analyze(
 
 Provide a JSON response with issues found."""
     
-    llm_service = ChainValidatorService()
-    result = llm_service.generate_answer(prompt, debug_mode=False)
+    result = await llm_service.agenerate_answer(prompt, debug_mode=False)
     
     return {"analysis": result["content"], "model": result["model"]}
 
@@ -196,7 +219,8 @@ Provide a JSON response with issues found."""
 @router.post("/code/debug")
 async def code_debug(
     request: CodeDebugRequest,
-    auth = Depends(get_api_key)
+    auth = Depends(get_api_key),
+    llm_service: ChainValidatorService = Depends(get_llm_service)
 ):
     """Debug code with error"""
     prompt = f"""Debug this {request.language} code error:
@@ -212,8 +236,7 @@ Context: {request.context or 'None'}
 
 Provide root cause and solutions."""
     
-    llm_service = ChainValidatorService()
-    result = llm_service.generate_answer(prompt, debug_mode=True)
+    result = await llm_service.agenerate_answer(prompt, debug_mode=True)
     
     return {"debug_info": result["content"], "model": result["model"]}
 
@@ -221,7 +244,8 @@ Provide root cause and solutions."""
 @router.post("/code/refactor")
 async def code_refactor(
     request: CodeRefactorRequest,
-    auth = Depends(get_api_key)
+    auth = Depends(get_api_key),
+    llm_service: ChainValidatorService = Depends(get_llm_service)
 ):
     """Refactor code"""
     prompt = f"""Refactor this {request.language} code for {', '.join(request.goals)}:
@@ -232,8 +256,7 @@ async def code_refactor(
 
 Provide refactored code and explanation."""
     
-    llm_service = ChainValidatorService()
-    result = llm_service.generate_answer(prompt, debug_mode=False)
+    result = await llm_service.agenerate_answer(prompt, debug_mode=False)
     
     return {"refactored": result["content"], "model": result["model"]}
 
@@ -11,6 +11,7 @@ from pydantic import BaseModel
 from src.infrastructure.database.connection import get_db
 from src.infrastructure.auth.auth_service import get_current_user
 from src.infrastructure.database.models import AnswerModel, LearningSessionModel, QuestionModel
+from src.infrastructure.cache.redis_service import CacheService
 from datetime import datetime
 import uuid
 
@@ -69,6 +70,9 @@ async def submit_feedback(
     )
     db.commit()
     
+    # Low ratings on semantic cache answers feed the false-hit metric
+    CacheService().record_answer_feedback(request.answer_id, request.rating)
+    
     return {
         "id": feedback_id,
         "message": "Feedback submitted successfully"
@@ -1,22 +1,28 @@
 from fastapi import APIRouter, HTTPException, Depends
 from pydantic import BaseModel
 from sqlalchemy.orm import Session
+from src.config import get_settings
 from src.presentation.auth_routes import verify_token
 from src.infrastructure.database.connection import get_db
 from src.infrastructure.database.session_repository import SessionRepository
 from src.infrastructure.database.qa_repository import QuestionRepository, AnswerRepository
 from src.infrastructure.cache.redis_service import CacheService
-from src.infrastructure.llm.chain_validator_service import ChainValidatorService
+from src.infrastructure.cache.single_flight import get_single_flight
+from src.infrastructure.llm.chain_validator_service import ChainValidatorService, get_llm_service
 from src.application.use_cases.create_session import CreateSessionUseCase
 from src.application.use_cases.ask_question import AskQuestionUseCase
+from src.presentation.streaming import completion_events, sse_response
+import time
 
 router = APIRouter()
+settings = get_settings()
 
 from pydantic import BaseModel
 
 class QuestionRequest(BaseModel):
     content: str
     debug_mode: bool = False
+    stream: bool = False  # Server-sent chat.completion.chunk events
 
 class SessionResponse(BaseModel):
     session_id: str
@@ -68,7 +74,8 @@ async def ask_question(
     session_id: str, 
     request: QuestionRequest,
     user_id: str = Depends(verify_token),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_db),
+    llm_service: ChainValidatorService = Depends(get_llm_service)
 ):
     try:
         from src.infrastructure.database.models import UserModel
@@ -85,17 +92,21 @@ async def ask_question(
         question_repo = QuestionRepository(db)
         answer_repo = AnswerRepository(db)
         cache_service = CacheService()
-        llm_service = ChainValidatorService()
         
         use_case = AskQuestionUseCase(
             session_repo,
             question_repo,
             answer_repo,
             cache_service,
-            llm_service
+            llm_service,
+            single_flight=get_single_flight() if settings.SINGLE_FLIGHT_ENABLED else None
         )
         
-        result = use_case.execute(session_id, user_id, request.content, debug_mode, user_language)
+        if request.stream:
+            events = await use_case.aexecute_stream(session_id, user_id, request.content, debug_mode, user_language)
+            return sse_response(_answer_stream(events, session_id, db))
+        
+        result = await use_case.aexecute(session_id, user_id, request.content, debug_mode, user_language)
         
         return AnswerResponse(
             content=result["content"],
@@ -114,6 +125,24 @@ async def ask_question(
         else:
             raise HTTPException(status_code=400, detail=str(e))
 
+async def _answer_stream(events, session_id: str, db: Session):
+    """SSE chunks of a streamed answer; the final chunk carries the saved answer"""
+    def metadata(done: dict) -> dict:
+        return {
+            "answer_id": done.get("answer_id", ""),
+            "used_senior": done.get("used_senior", False),
+            "thinking_process": done.get("thinking_process", [])
+        }
+    
+    try:
+        async for chunk in completion_events(events, f"answer-{session_id}-{int(time.time())}", "session", metadata):
+            yield chunk
+    finally:
+        # Releases the session lock now if the client left mid-answer
+        await events.aclose()
+        # get_db's cleanup has already run when the stream starts
+        db.close()
+
 @router.get("/{session_id}/history")
 async def get_session_history(
     session_id: str,
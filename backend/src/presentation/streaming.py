@@ -0,0 +1,86 @@
+"""
+Streaming Responses
+
+OpenAI-compatible server-sent events for streamed answers
+"""
+
+from fastapi.responses import StreamingResponse
+from typing import Any, AsyncIterator, Callable, Dict, Optional
+from src.infrastructure.monitoring.metrics_service import MetricsService
+import json
+import time
+
+SSE_DONE = "data: [DONE]\n\n"
+
+
+def completion_chunk(
+    completion_id: str,
+    created: int,
+    model: str,
+    delta: Dict[str, Any],
+    finish_reason: Optional[str] = None,
+    metadata: Optional[Dict[str, Any]] = None
+) -> str:
+    """One chat.completion.chunk as an SSE data line"""
+    chunk = {
+        "id": completion_id,
+        "object": "chat.completion.chunk",
+        "created": created,
+        "model": model,
+        "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}]
+    }
+    if metadata:
+        chunk["metadata"] = metadata
+    return f"data: {json.dumps(chunk)}\n\n"
+
+
+async def completion_events(
+    events: AsyncIterator[dict],
+    completion_id: str,
+    endpoint: str,
+    metadata: Callable[[dict], Optional[Dict[str, Any]]] = lambda done: None
+) -> AsyncIterator[str]:
+    """
+    SSE chunks for ChainValidatorService.astream_answer-style events
+    
+    Args:
+        events: start, delta and done events
+        completion_id: Chunk id
+        endpoint: Label for the time-to-first-token metric
+        metadata: Extra fields for the final chunk, from the done event
+    
+    An incomplete done event (the provider failed mid-answer) ends with
+    finish_reason "error" instead of "stop".
+    """
+    start = time.perf_counter()
+    created = int(time.time())
+    model, first = "", True
+    async for event in events:
+        if event["type"] == "start":
+            model = event["model"]
+            yield completion_chunk(completion_id, created, model, {"role": "assistant", "content": ""})
+        elif event["type"] == "delta":
+            if first:
+                MetricsService.track_time_to_first_token(model, endpoint, time.perf_counter() - start)
+                first = False
+            yield completion_chunk(completion_id, created, model, {"content": event["content"]})
+        elif event["type"] == "done":
+            finish_reason = "error" if event.get("incomplete") else "stop"
+            yield completion_chunk(completion_id, created, model, {}, finish_reason, metadata(event))
+    yield SSE_DONE
+
+
+async def answer_events(model: str, content: str) -> AsyncIterator[dict]:
+    """A complete answer as stream events"""
+    yield {"type": "start", "model": model}
+    yield {"type": "delta", "content": content}
+    yield {"type": "done", "content": content, "model": model}
+
+
+def sse_response(chunks: AsyncIterator[str]) -> StreamingResponse:
+    """Stream chunks as text/event-stream, unbuffered by proxies"""
+    return StreamingResponse(
+        chunks,
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
@@ -1,5 +1,6 @@
 import pytest
-from unittest.mock import Mock
+import threading
+from unittest.mock import AsyncMock, Mock
 from src.application.use_cases.ask_question import AskQuestionUseCase
 from src.domain.learning_session import LearningSession, SessionStatus
 from src.domain.qa import Question, Answer
@@ -83,4 +84,174 @@ def test_ask_question_session_locked(mock_repositories):
     use_case = AskQuestionUseCase(**mock_repositories)
     
     with pytest.raises(ValueError, match="processing another question"):
-        use_case.execute("session123", "user123", "What is DDD?")
\ No newline at end of file
+        use_case.execute("session123", "user123", "What is DDD?")
+
+def test_ask_question_shared_answer_is_not_recached(mock_repositories):
+    mock_repositories["session_repo"].get_by_id.return_value = LearningSession(
+        id="session123",
+        user_id="user123",
+        status=SessionStatus.ACTIVE
+    )
+    mock_repositories["cache_service"].is_locked.return_value = False
+    mock_repositories["cache_service"].get_cached_answer.return_value = None
+    mock_repositories["cache_service"].acquire_lock.return_value = True
+    mock_repositories["question_repo"].create.return_value = Mock(id="q123")
+    mock_repositories["answer_repo"].create.return_value = Mock(id="a123", content="DDD is Domain-Driven Design")
+    single_flight = Mock()
+    single_flight.do.return_value = ({"content": "DDD is Domain-Driven Design", "model": "m", "used_senior": False}, True)
+    
+    use_case = AskQuestionUseCase(
+        mock_repositories["session_repo"],
+        mock_repositories["question_repo"],
+        mock_repositories["answer_repo"],
+        mock_repositories["cache_service"],
+        mock_repositories["llm_service"],
+        single_flight=single_flight
+    )
+    result = use_case.execute("session123", "user123", "What is DDD?")
+    
+    assert result["answer_id"] == "a123"
+    assert single_flight.do.call_args[0][0].endswith(":pt-BR:default")
+    mock_repositories["llm_service"].generate_answer.assert_not_called()
+    mock_repositories["cache_service"].cache_answer.assert_not_called()
+
+@pytest.mark.asyncio
+async def test_ask_question_async_awaits_llm(mock_repositories):
+    mock_repositories["session_repo"].get_by_id.return_value = LearningSession(
+        id="session123",
+        user_id="user123",
+        status=SessionStatus.ACTIVE
+    )
+    mock_repositories["cache_service"].is_locked.return_value = False
+    cache_threads = []
+    mock_repositories["cache_service"].get_cached_answer.side_effect = lambda *args, **kwargs: cache_threads.append(threading.current_thread())
+    mock_repositories["cache_service"].cache_answer.side_effect = lambda *args, **kwargs: cache_threads.append(threading.current_thread())
+    mock_repositories["cache_service"].acquire_lock.return_value = True
+    mock_repositories["question_repo"].create.return_value = Mock(id="q123")
+    mock_repositories["answer_repo"].create.return_value = Mock(id="a123", content="DDD is Domain-Driven Design")
+    llm_service = Mock()
+    llm_service.agenerate_answer = AsyncMock(return_value={"content": "DDD is Domain-Driven Design", "model": "m", "used_senior": False})
+    
+    use_case = AskQuestionUseCase(
+        mock_repositories["session_repo"],
+        mock_repositories["question_repo"],
+        mock_repositories["answer_repo"],
+        mock_repositories["cache_service"],
+        llm_service
+    )
+    result = await use_case.aexecute("session123", "user123", "What is DDD?")
+    
+    assert result["answer_id"] == "a123"
+    llm_service.agenerate_answer.assert_awaited_once()
+    llm_service.generate_answer.assert_not_called()
+    # Semantic lookups and writes embed the question: never on the event loop
+    assert len(cache_threads) == 2 and threading.main_thread() not in cache_threads
+    mock_repositories["cache_service"].release_lock.assert_called_once_with("session123")
+
+@pytest.mark.asyncio
+async def test_ask_question_stream_saves_assembled_answer(mock_repositories):
+    mock_repositories["session_repo"].get_by_id.return_value = LearningSession(
+        id="session123",
+        user_id="user123",
+        status=SessionStatus.ACTIVE
+    )
+    mock_repositories["cache_service"].is_locked.return_value = False
+    mock_repositories["cache_service"].get_cached_answer.return_value = None
+    mock_repositories["cache_service"].acquire_lock.return_value = True
+    mock_repositories["question_repo"].create.return_value = Mock(id="q123")
+    mock_repositories["answer_repo"].create.side_effect = lambda answer: Mock(id="a123", content=answer.content)
+    
+    async def astream_answer(*args, **kwargs):
+        yield {"type": "start", "model": "m"}
+        yield {"type": "delta", "content": "DDD is "}
+        yield {"type": "delta", "content": "Domain-Driven Design"}
+        yield {"type": "done", "content": "DDD is Domain-Driven Design", "model": "m", "used_senior": False}
+    
+    llm_service = Mock()
+    llm_service.astream_answer = astream_answer
+    use_case = AskQuestionUseCase(
+        mock_repositories["session_repo"],
+        mock_repositories["question_repo"],
+        mock_repositories["answer_repo"],
+        mock_repositories["cache_service"],
+        llm_service
+    )
+    events = [event async for event in use_case.execute_stream("session123", "user123", "What is DDD?")]
+    
+    assert [event["content"] for event in events if event["type"] == "delta"] == ["DDD is ", "Domain-Driven Design"]
+    assert events[-1]["answer_id"] == "a123"
+    cached = mock_repositories["cache_service"].cache_answer.call_args[0][1]
+    assert cached["content"] == "DDD is Domain-Driven Design"
+    mock_repositories["cache_service"].release_lock.assert_called_once_with("session123")
+
+@pytest.mark.asyncio
+async def test_ask_question_interrupted_stream_is_not_cached(mock_repositories):
+    mock_repositories["session_repo"].get_by_id.return_value = LearningSession(
+        id="session123",
+        user_id="user123",
+        status=SessionStatus.ACTIVE
+    )
+    mock_repositories["cache_service"].is_locked.return_value = False
+    mock_repositories["cache_service"].get_cached_answer.return_value = None
+    mock_repositories["cache_service"].acquire_lock.return_value = True
+    mock_repositories["question_repo"].create.return_value = Mock(id="q123")
+    mock_repositories["answer_repo"].create.side_effect = lambda answer: Mock(id="a123", content=answer.content)
+    
+    async def astream_answer(*args, **kwargs):
+        yield {"type": "start", "model": "m"}
+        yield {"type": "delta", "content": "DDD is "}
+        yield {"type": "done", "content": "DDD is ", "model": "m", "used_senior": False, "incomplete": True}
+    
+    llm_service = Mock()
+    llm_service.astream_answer = astream_answer
+    use_case = AskQuestionUseCase(
+        mock_repositories["session_repo"],
+        mock_repositories["question_repo"],
+        mock_repositories["answer_repo"],
+        mock_repositories["cache_service"],
+        llm_service
+    )
+    events = [event async for event in use_case.execute_stream("session123", "user123", "What is DDD?")]
+    
+    assert events[-1]["incomplete"] is True
+    mock_repositories["answer_repo"].create.assert_called_once()
+    mock_repositories["cache_service"].cache_answer.assert_not_called()
+    mock_repositories["cache_service"].release_lock.assert_called_once_with("session123")
+
+@pytest.mark.asyncio
+async def test_ask_question_stream_locks_session_only_while_consumed(mock_repositories):
+    mock_repositories["session_repo"].get_by_id.return_value = LearningSession(
+        id="session123",
+        user_id="user123",
+        status=SessionStatus.ACTIVE
+    )
+    mock_repositories["cache_service"].is_locked.return_value = False
+    mock_repositories["cache_service"].get_cached_answer.return_value = None
+    mock_repositories["cache_service"].acquire_lock.return_value = True
+    mock_repositories["question_repo"].create.return_value = Mock(id="q123")
+    
+    async def astream_answer(*args, **kwargs):
+        yield {"type": "start", "model": "m"}
+        yield {"type": "delta", "content": "DDD is "}
+    
+    llm_service = Mock()
+    llm_service.astream_answer = astream_answer
+    use_case = AskQuestionUseCase(
+        mock_repositories["session_repo"],
+        mock_repositories["question_repo"],
+        mock_repositories["answer_repo"],
+        mock_repositories["cache_service"],
+        llm_service
+    )
+    cache_service = mock_repositories["cache_service"]
+    
+    # Handed to a response that never started: no lock to leak
+    await use_case.aexecute_stream("session123", "user123", "What is DDD?")
+    cache_service.acquire_lock.assert_not_called()
+    
+    # Client left after the first event
+    events = await use_case.aexecute_stream("session123", "user123", "What is DDD?")
+    assert (await events.__anext__())["type"] == "start"
+    cache_service.acquire_lock.assert_called_once()
+    await events.aclose()
+    cache_service.release_lock.assert_called_once_with("session123")
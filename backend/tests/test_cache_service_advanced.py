@@ -7,11 +7,26 @@ Tests cover:
 - Context caching
 - Cache invalidation
 - Statistics
+- Semantic answer cache
+- In-process L1 cache
+- Single-flight call coalescing
+- Versioned value codec
 """
 
 import pytest
+import asyncio
+import json
+import threading
+import time
+import numpy as np
+from concurrent.futures import ThreadPoolExecutor
 from unittest.mock import Mock, patch
 from src.infrastructure.cache.redis_service import CacheService
+from src.infrastructure.cache.local_cache import LocalCache
+from src.infrastructure.cache.lru_cache import LRUCache
+from src.infrastructure.cache.semantic_cache import SemanticCache
+from src.infrastructure.cache.single_flight import SingleFlight
+from src.infrastructure.cache.value_codec import CodecError, ValueCodec
 
 
 class TestDistributedLock:
@@ -75,9 +90,16 @@ class TestAnswerCache:
         question = "How to use async/await?"
         answer = {"content": "Use async def...", "model": "cerberus-pro"}
         
-        cache.cache_answer(question, answer)
+        cache.cache_answer(question, answer, language="en", user_id="user1")
         
-        mock_client.setex.assert_called_once()
+        pipe = mock_client.pipeline.return_value
+        pipe.setex.assert_called_once()
+        key = pipe.setex.call_args[0][0]
+        tagged = {call[0][0] for call in pipe.zadd.call_args_list}
+        assert tagged == {"tag:model:cerberus-pro", "tag:language:en", "tag:user:user1"}
+        # Expired answers are pruned from each tag on write
+        assert {call[0][0] for call in pipe.zremrangebyscore.call_args_list} == tagged
+        pipe.sadd.assert_called_once_with(f"tags:{key}", *[call[0][0] for call in pipe.zadd.call_args_list])
     
     @patch('src.infrastructure.cache.redis_service.redis.from_url')
     def test_get_cached_answer_hit(self, mock_redis):
@@ -162,25 +184,51 @@ class TestCacheInvalidation:
     @patch('src.infrastructure.cache.redis_service.redis.from_url')
     def test_invalidate_by_pattern(self, mock_redis):
         mock_client = Mock()
-        mock_client.keys.return_value = ["key1", "key2", "key3"]
-        mock_client.delete.return_value = 3
+        mock_client.scan_iter.return_value = iter(["key1", "key2", "key3"])
+        mock_client.pipeline.return_value.execute.return_value = [1, 1, 1]
         mock_redis.return_value = mock_client
         
         cache = CacheService()
         deleted = cache.invalidate_by_pattern("answer:*")
         
         assert deleted == 3
+        mock_client.keys.assert_not_called()
+        mock_client.scan_iter.assert_called_once_with(match="answer:*", count=CacheService.SCAN_BATCH_SIZE)
     
     @patch('src.infrastructure.cache.redis_service.redis.from_url')
-    def test_invalidate_by_version(self, mock_redis):
+    def test_invalidate_by_model(self, mock_redis):
         mock_client = Mock()
-        mock_client.keys.return_value = []
+        mock_client.zscan_iter.return_value = iter([])
         mock_redis.return_value = mock_client
         
         cache = CacheService()
-        deleted = cache.invalidate_by_version("1.0")
+        deleted = cache.invalidate_by_model("cerberus-pro")
         
         assert deleted == 0
+        mock_client.zscan_iter.assert_called_once_with("tag:model:cerberus-pro", count=CacheService.SCAN_BATCH_SIZE)
+    
+    @patch('src.infrastructure.cache.redis_service.redis.from_url')
+    def test_invalidate_by_tag_deletes_in_batches(self, mock_redis):
+        mock_client = Mock()
+        live, expired = time.time() + 60, time.time() - 60
+        mock_client.zscan_iter.return_value = iter([(f"answer:{i}", live) for i in range(5)] + [("answer:old", expired)])
+        mock_client.pipeline.return_value.execute.side_effect = [
+            [{"tag:user:user1"}, {"tag:user:user1"}], [1, 1, 1, 1],
+            [{"tag:user:user1"}, {"tag:user:user1"}], [1, 1, 0, 0],
+            [{"tag:user:user1", "tag:language:en"}], [1, 1, 1]
+        ]
+        mock_redis.return_value = mock_client
+        
+        cache = CacheService()
+        cache.SCAN_BATCH_SIZE = 2
+        deleted = cache.invalidate_by_tag("user", "user1")
+        
+        assert deleted == 4
+        pipe = mock_client.pipeline.return_value
+        assert "answer:old" not in {call[0][0] for call in pipe.unlink.call_args_list}
+        # Deleted answers leave their other tags too
+        pipe.zrem.assert_called_once_with("tag:language:en", "answer:4")
+        mock_client.unlink.assert_called_once_with("tag:user:user1")
 
 
 class TestCacheStats:
@@ -225,3 +273,426 @@ class TestTTLConstants:
         assert CacheService.TTL_ANSWER == 604800
         assert CacheService.TTL_CONTEXT == 3600
         assert CacheService.TTL_SESSION == 86400
+
+
+class TestLRUCache:
+    """Test in-process LRU cache"""
+    
+    def test_evicts_least_recently_used(self):
+        cache = LRUCache(max_entries=2)
+        cache.set("a", 1)
+        cache.set("b", 2)
+        cache.get("a")
+        cache.set("c", 3)
+        
+        assert cache.get("a") == 1
+        assert cache.get("b") is None
+        assert cache.get("c") == 3
+    
+    def test_ttl_expiry(self):
+        with patch('src.infrastructure.cache.lru_cache.time.monotonic') as mock_time:
+            mock_time.return_value = 100.0
+            cache = LRUCache(max_entries=10, ttl=5)
+            cache.set("a", 1)
+            
+            mock_time.return_value = 104.0
+            assert cache.get("a") == 1
+            
+            mock_time.return_value = 106.0
+            assert cache.get("a") is None
+
+
+class TestSemanticCache:
+    """Test near-duplicate question lookup"""
+    
+    @staticmethod
+    def _entry(question_hash, vector):
+        vector = np.asarray(vector, dtype=np.float32)
+        return question_hash.encode() + (vector / np.linalg.norm(vector)).tobytes()
+    
+    def test_lookup_returns_closest_above_threshold(self):
+        client = Mock()
+        client.get.return_value = b"2"
+        client.pipeline.return_value.execute.return_value = [
+            b"2", [self._entry("a" * 64, [1.0, 0.0]), self._entry("b" * 64, [0.6, 0.8])]
+        ]
+        cache = SemanticCache(client, lambda q: [0.99, 0.1], threshold=0.9)
+        
+        match = cache.lookup("how do I await", "en:default")
+        
+        assert match[0] == "a" * 64
+        assert match[1] == pytest.approx(0.995, abs=1e-3)
+        assert cache.lookup("how do I await", "en:default") is not None
+        client.pipeline.return_value.execute.assert_called_once()  # scope unchanged: no re-read
+    
+    def test_lookup_below_threshold_or_without_embeddings(self):
+        client = Mock()
+        client.get.return_value = b"1"
+        client.pipeline.return_value.execute.return_value = [b"1", [self._entry("a" * 64, [1.0, 0.0])]]
+        
+        assert SemanticCache(client, lambda q: [0.0, 1.0], threshold=0.9).lookup("q", "en:default") is None
+        assert SemanticCache(client, lambda q: None).lookup("q", "en:default") is None
+    
+    def test_sync_pulls_only_new_entries(self):
+        client = Mock()
+        client.get.return_value = b"1"
+        execute = client.pipeline.return_value.execute
+        execute.return_value = [b"1", [self._entry("a" * 64, [1.0, 0.0])]]
+        cache = SemanticCache(client, lambda q: [0.0, 1.0], threshold=0.9)
+        assert cache.lookup("q", "en:default") is None
+        
+        client.get.return_value = b"2"
+        execute.return_value = [b"2", [self._entry("a" * 64, [1.0, 0.0]), self._entry("b" * 64, [0.0, 1.0])]]
+        
+        assert cache.lookup("q", "en:default")[0] == "b" * 64
+        assert cache._scopes["en:default:2d"].hashes == ["a" * 64, "b" * 64]
+        client.pipeline.return_value.lrange.assert_called_with("semantic:en:default:2d", -(1 + SemanticCache.SYNC_SLACK), -1)
+    
+    def test_scope_separates_language_and_debug(self):
+        assert SemanticCache.scope("en", False) != SemanticCache.scope("pt-BR", False)
+        assert SemanticCache.scope("en", False) != SemanticCache.scope("en", True)
+    
+    def test_lookup_errors_are_misses(self):
+        client = Mock()
+        client.get.return_value = b"1"
+        client.pipeline.return_value.execute.return_value = [b"1", [self._entry("a" * 64, [1.0, 0.0, 0.0])]]
+        cache = SemanticCache(client, lambda q: [1.0, 0.0, 0.0], threshold=0.9)
+        assert cache.lookup("q", "en:default")[0] == "a" * 64
+        
+        # Entries of another embedding size live under their own key
+        cache = SemanticCache(client, lambda q: [1.0, 0.0], threshold=0.9)
+        assert cache.lookup("q", "en:default") is None
+        client.pipeline.return_value.lrange.assert_called_with("semantic:en:default:2d", 0, -1)
+        assert "en:default:2d" not in cache._scopes
+    
+    @patch('src.infrastructure.cache.redis_service.redis.from_url')
+    def test_answer_key_includes_language_and_mode(self, mock_redis):
+        mock_client = Mock()
+        mock_client.get.return_value = None
+        mock_redis.return_value = mock_client
+        
+        cache = CacheService()
+        cache.cache_answer("q", {"content": "a"}, language="en")
+        assert mock_client.pipeline.return_value.setex.call_args[0][0] == f"answer:{cache._hash_question('q')}:en:default"
+        
+        cache.get_cached_answer("q", language="pt-BR", debug_mode=True)
+        mock_client.get.assert_any_call(f"answer:{cache._hash_question('q')}:pt-BR:debug")
+    
+    @patch('src.infrastructure.cache.redis_service.redis.from_url')
+    def test_cache_service_falls_back_to_similar_answer(self, mock_redis):
+        mock_client = Mock()
+        mock_client.get.side_effect = lambda key: (
+            '{"content": "cached"}' if key == f"answer:{'a' * 64}:en:default" else None
+        )
+        mock_redis.return_value = mock_client
+        semantic = Mock()
+        semantic.lookup.return_value = ("a" * 64, 0.95)
+        
+        cache = CacheService(semantic_cache=semantic)
+        result = cache.get_cached_answer("how to await?", language="en")
+        
+        assert result["content"] == "cached"
+        assert result["semantic_similarity"] == 0.95
+        semantic.lookup.assert_called_once_with("how to await?", "en:default")
+    
+    @patch('src.infrastructure.cache.redis_service.redis.from_url')
+    def test_cache_answer_registers_question(self, mock_redis):
+        mock_redis.return_value = Mock()
+        semantic = Mock()
+        
+        cache = CacheService(semantic_cache=semantic)
+        cache.cache_answer("How to await?", {"content": "x"}, language="en", debug_mode=True)
+        
+        semantic.add.assert_called_once_with("How to await?", cache._hash_question("How to await?"), "en:debug")
+    
+    @patch('src.infrastructure.cache.redis_service.MetricsService')
+    @patch('src.infrastructure.cache.redis_service.redis.from_url')
+    def test_low_rating_on_semantic_answer_is_false_hit(self, mock_redis, mock_metrics):
+        mock_client = Mock()
+        mock_client.delete.return_value = 1
+        mock_redis.return_value = mock_client
+        
+        cache = CacheService(semantic_cache=Mock())
+        
+        assert cache.record_answer_feedback("answer1", rating=1) is True
+        assert cache.record_answer_feedback("answer1", rating=5) is False
+        mock_client.delete.assert_called_once_with("semantic_hit:answer1")
+        mock_metrics.track_semantic_cache.assert_called_once_with("false_hit")
+
+
+class TestLocalCache:
+    """Test the in-process L1 and its invalidation"""
+    
+    @staticmethod
+    def _local():
+        local = LocalCache(Mock(), listen=False)
+        local._handle({"type": "subscribe", "data": 1})
+        return local
+    
+    def test_serves_repeat_reads_locally(self):
+        local = self._local()
+        load = Mock(side_effect=["v1", None])
+        
+        assert local.get("answer:a", load) == "v1"
+        assert local.get("answer:a", load) == "v1"
+        assert local.get("answer:b", load) is None
+        assert local.get("answer:b", load) is None  # Absence is cached too
+        assert load.call_count == 2
+        assert local.stats()["l1_lookups"] == 2
+    
+    def test_bypassed_until_subscribed(self):
+        local = LocalCache(Mock(), listen=False)
+        load = Mock(return_value="v1")
+        
+        local.get("answer:a", load)
+        local.get("answer:a", load)
+        
+        assert load.call_count == 2
+    
+    def test_invalidation_from_other_replica(self):
+        local = self._local()
+        local.get("answer:a", lambda: "v1")
+        
+        local._handle({"type": "message", "data": '{"origin": "other", "keys": ["answer:a"]}'})
+        
+        assert local.get("answer:a", lambda: "v2") == "v2"
+    
+    def test_fill_racing_an_invalidation_is_discarded(self):
+        local = self._local()
+        
+        def load():
+            local._handle({"type": "message", "data": '{"origin": "other", "keys": ["answer:a"]}'})
+            return "stale"
+        
+        local.get("answer:a", load)
+        
+        assert local.get("answer:a", lambda: "fresh") == "fresh"
+    
+    @patch('src.infrastructure.cache.redis_service.redis.from_url')
+    def test_cache_service_writes_publish_invalidations(self, mock_redis):
+        mock_client = Mock()
+        mock_client.get.return_value = '{"content": "v1"}'
+        mock_redis.return_value = mock_client
+        local = self._local()
+        cache = CacheService(semantic_cache=Mock(), local_cache=local)
+        
+        cache.get_cached_answer("q")
+        cache.get_cached_answer("q")
+        mock_client.get.assert_called_once()
+        
+        cache.cache_answer("q", {"content": "v2"})
+        
+        local.client.publish.assert_called_once()
+        assert f"answer:{cache._hash_question('q')}" in local.client.publish.call_args[0][1]
+        cache.get_cached_answer("q")
+        assert mock_client.get.call_count == 2
+
+
+class TestSingleFlight:
+    """Test coalescing of identical in-flight calls"""
+    
+    def test_concurrent_callers_share_one_call(self):
+        client = Mock()
+        client.set.return_value = True
+        flight = SingleFlight(client, listen=False)
+        started, release = threading.Event(), threading.Event()
+        calls = []
+        
+        def fn():
+            calls.append(1)
+            started.set()
+            release.wait(5)
+            return {"content": "answer"}
+        
+        results = []
+        leader = threading.Thread(target=lambda: results.append(flight.do("k", fn)))
+        leader.start()
+        started.wait(5)
+        followers = [threading.Thread(target=lambda: results.append(flight.do("k", fn))) for _ in range(3)]
+        for follower in followers:
+            follower.start()
+        time.sleep(0.05)
+        release.set()
+        for thread in [leader] + followers:
+            thread.join(5)
+        
+        assert len(calls) == 1
+        assert sorted(shared for _, shared in results) == [False, True, True, True]
+        assert all(result == {"content": "answer"} for result, _ in results)
+        client.pipeline.return_value.publish.assert_called_once()
+    
+    @pytest.mark.asyncio
+    async def test_async_callers_share_one_call(self):
+        client = Mock()
+        client.set.return_value = True
+        flight = SingleFlight(client, listen=False)
+        calls = []
+        
+        async def fn():
+            calls.append(1)
+            await asyncio.sleep(0.05)
+            return {"content": "answer"}
+        
+        results = await asyncio.gather(*(flight.ado("k", fn) for _ in range(4)))
+        
+        assert len(calls) == 1
+        assert sorted(shared for _, shared in results) == [False, True, True, True]
+    
+    @pytest.mark.asyncio
+    async def test_async_waiters_take_over_from_cancelled_caller(self):
+        client = Mock()
+        client.set.return_value = True
+        flight = SingleFlight(client, listen=False)
+        
+        async def slow():
+            await asyncio.sleep(10)
+        
+        async def fast():
+            return "own"
+        
+        leader = asyncio.ensure_future(flight.ado("k", slow))
+        await asyncio.sleep(0.01)
+        follower = asyncio.ensure_future(flight.ado("k", fast))
+        await asyncio.sleep(0.01)
+        leader.cancel()
+        
+        assert await follower == ("own", False)
+    
+    def test_waiter_runs_call_when_leader_overruns(self):
+        client = Mock()
+        client.set.return_value = True
+        flight = SingleFlight(client, wait_timeout=0.05, listen=False)
+        started, release = threading.Event(), threading.Event()
+        
+        def stuck():
+            started.set()
+            release.wait(5)
+            return "leader"
+        
+        leader = threading.Thread(target=flight.do, args=("k", stuck))
+        leader.start()
+        started.wait(5)
+        try:
+            assert flight.do("k", lambda: "own") == ("own", False)
+        finally:
+            release.set()
+            leader.join(5)
+    
+    @pytest.mark.asyncio
+    async def test_async_waiter_runs_call_when_leader_overruns(self):
+        client = Mock()
+        client.set.return_value = True
+        flight = SingleFlight(client, wait_timeout=0.05, listen=False)
+        
+        async def stuck():
+            await asyncio.sleep(10)
+        
+        async def own():
+            return "own"
+        
+        leader = asyncio.ensure_future(flight.ado("k", stuck))
+        await asyncio.sleep(0.01)
+        try:
+            assert await asyncio.wait_for(flight.ado("k", own), 2) == ("own", False)
+        finally:
+            leader.cancel()
+    
+    def test_waits_for_other_replica_result(self):
+        client = Mock()
+        client.set.return_value = False  # Another replica holds the key
+        client.pipeline.return_value.execute.return_value = ['{"content": "remote"}', 1]
+        flight = SingleFlight(client, listen=False)
+        flight.POLL_INTERVAL = 0.01
+        fn = Mock()
+        
+        assert flight.do("k", fn) == ({"content": "remote"}, True)
+        fn.assert_not_called()
+    
+    @pytest.mark.asyncio
+    async def test_async_waiters_on_other_replica_hold_no_threads(self):
+        client = Mock()
+        client.set.return_value = False  # Another replica holds every key
+        client.pipeline.return_value.execute.return_value = [None, 1]
+        flight = SingleFlight(client, listen=False)
+        fn = Mock()
+        loop = asyncio.get_running_loop()
+        # Waiters parked in the executor would starve the other 18
+        executor = ThreadPoolExecutor(max_workers=2)
+        loop.set_default_executor(executor)
+        
+        waiters = [asyncio.ensure_future(flight.ado(f"k{i}", fn)) for i in range(20)]
+        await asyncio.sleep(0.05)
+        for i in range(20):
+            message = {"type": "message", "data": json.dumps({"key": f"k{i}", "ok": True, "result": "remote"})}
+            threading.Thread(target=flight._handle, args=(message,)).start()
+        results = await asyncio.wait_for(asyncio.gather(*waiters), 2)
+        executor.shutdown()
+        
+        assert results == [("remote", True)] * 20
+        fn.assert_not_called()
+    
+    @pytest.mark.asyncio
+    async def test_async_redis_calls_leave_event_loop(self):
+        client = Mock()
+        client.pipeline.return_value.execute.return_value = [None, 0]  # Lock gone, no result
+        threads = []
+        client.set.side_effect = lambda *args, **kwargs: threads.append(threading.current_thread()) or False
+        client.pipeline.side_effect = lambda **kwargs: threads.append(threading.current_thread()) or client.pipeline.return_value
+        flight = SingleFlight(client, listen=False)
+        flight.POLL_INTERVAL = 0.01
+        
+        async def own():
+            return "own"
+        
+        assert await flight.ado("k", own) == ("own", False)
+        assert len(threads) == 2
+        assert threading.main_thread() not in threads
+    
+    def test_runs_call_when_other_replica_gave_up(self):
+        client = Mock()
+        client.set.return_value = False
+        client.pipeline.return_value.execute.return_value = [None, 0]  # Lock gone, no result
+        flight = SingleFlight(client, listen=False)
+        flight.POLL_INTERVAL = 0.01
+        
+        assert flight.do("k", lambda: "own") == ("own", False)
+
+
+class TestValueCodec:
+    """Test cached value encoding"""
+    
+    def test_large_values_are_compressed(self):
+        codec = ValueCodec(serializer="json", compressor="zlib", threshold=64)
+        answer = {"content": "def handler():\n    return None\n" * 50, "model": "m"}
+        
+        encoded = codec.encode(answer)
+        
+        assert encoded[:2] == bytes((ValueCodec.MAGIC, 0x11))
+        assert codec.decode(encoded) == answer
+        assert codec.stats()["compression_ratio"] > 5
+    
+    def test_small_values_are_stored_uncompressed(self):
+        codec = ValueCodec(serializer="json", compressor="zlib", threshold=64)
+        
+        encoded = codec.encode({"content": "short"})
+        
+        assert encoded[1] == 0x10
+        assert codec.decode(encoded) == {"content": "short"}
+    
+    def test_legacy_json_still_decodes(self):
+        codec = ValueCodec(serializer="json", compressor="zlib")
+        
+        assert codec.decode('{"content": "old"}') == {"content": "old"}
+        assert codec.decode(b'[{"role": "user"}]') == [{"role": "user"}]
+        assert codec.stats()["legacy_decoded"] == 2
+    
+    def test_unknown_format_is_a_cache_miss(self):
+        codec = ValueCodec(serializer="json", compressor="zlib")
+        with pytest.raises(CodecError):
+            codec.decode(bytes((ValueCodec.MAGIC, 0x7F)) + b"payload")
+        
+        with patch('src.infrastructure.cache.redis_service.redis.from_url') as mock_redis:
+            mock_redis.return_value.get.return_value = bytes((ValueCodec.MAGIC, 0x7F)) + b"payload"
+            cache = CacheService(semantic_cache=Mock(), codec=codec)
+            
+            assert cache.get_cached_context("session1") is None
@@ -1,6 +1,10 @@
 import pytest
-from unittest.mock import Mock, patch
+import asyncio
+import time
+from unittest.mock import AsyncMock, Mock, patch
 from src.infrastructure.llm.chain_validator_service import ChainValidatorService
+from src.infrastructure.llm.junior_llm_service import JuniorLLMService
+from src.infrastructure.llm.senior_llm_service import SeniorLLMService
 
 @pytest.fixture
 def chain_service():
@@ -59,3 +63,160 @@ def test_chain_returns_standard_format(chain_service):
         assert "explanation" in result
         assert "edge_cases" in result
         assert "metadata" in result
+
+@pytest.mark.asyncio
+async def test_agenerate_answer_uses_async_clients(chain_service):
+    """Testa que o caminho async não chama os clientes bloqueantes"""
+    with patch.object(chain_service.junior, 'agenerate', new_callable=AsyncMock) as mock_junior, \
+         patch.object(chain_service.senior, 'avalidate', new_callable=AsyncMock) as mock_senior, \
+         patch.object(chain_service.junior, 'generate') as mock_blocking:
+        
+        mock_junior.return_value = {"content": "Draft", "confidence": 50, "needs_validation": True}
+        mock_senior.return_value = {"content": "Better", "validated": True}
+        
+        result = await chain_service.agenerate_answer("Complex question", language="en-US")
+        
+        assert result["content"] == "Better"
+        assert result["used_senior"] is True
+        mock_senior.assert_awaited_once_with("Complex question", "Draft", None, "en-US")
+        mock_blocking.assert_not_called()
+
+@pytest.mark.asyncio
+async def test_rag_context_is_sent_to_junior_and_senior():
+    """Testa que o contexto do RAG acompanha a pergunta, e que falhas do RAG não bloqueiam a resposta"""
+    retrieval = Mock()
+    retrieval.build_context.return_value = "[RELEVANT DOCUMENTATION]\nasyncio.gather runs awaitables concurrently"
+    service = ChainValidatorService(Mock(), Mock(), retrieval=retrieval)
+    service.junior.agenerate = AsyncMock(return_value={"content": "Draft", "confidence": 50, "needs_validation": True})
+    service.senior.avalidate = AsyncMock(return_value={"content": "Better", "validated": True})
+    
+    await service.agenerate_answer("How to gather?", language="en-US")
+    
+    prompt = service.junior.agenerate.call_args[0][0]
+    assert prompt.startswith("[RELEVANT DOCUMENTATION]") and prompt.endswith("How to gather?")
+    assert service.senior.avalidate.call_args[0][0] == prompt
+    
+    retrieval.build_context.side_effect = ConnectionError("redis down")
+    await service.agenerate_answer("How to gather?", language="en-US")
+    assert service.junior.agenerate.call_args[0][0] == "How to gather?"
+
+@pytest.mark.asyncio
+async def test_speculative_answer_uses_first_sufficient_result_and_cancels_other(chain_service):
+    """Testa que o modo especulativo usa o primeiro resultado suficiente e cancela o outro"""
+    cancelled = []
+    
+    def slow(result):
+        async def call(*args):
+            try:
+                await asyncio.sleep(10)
+            except asyncio.CancelledError:
+                cancelled.append(result["content"])
+                raise
+            return result
+        return call
+    
+    junior = {"content": "Draft", "confidence": 95, "needs_validation": False}
+    senior = {"content": "Better", "validated": True}
+    
+    with patch.object(chain_service.junior, 'agenerate', new_callable=AsyncMock, return_value=junior), \
+         patch.object(chain_service.senior, 'agenerate', side_effect=slow(senior)):
+        result = await chain_service.agenerate_answer("Question", speculative=True)
+    assert result["content"] == "Draft" and result["used_senior"] is False
+    
+    with patch.object(chain_service.junior, 'agenerate', side_effect=slow(junior)), \
+         patch.object(chain_service.senior, 'agenerate', new_callable=AsyncMock, return_value=senior):
+        result = await chain_service.agenerate_answer("Question", speculative=True)
+    assert result["content"] == "Better" and result["used_senior"] is True
+    
+    await asyncio.sleep(0)
+    assert cancelled == ["Better", "Draft"]
+
+@pytest.mark.asyncio
+async def test_astream_answer_assembles_full_text(chain_service):
+    """Testa que o streaming emite deltas e o texto completo no final"""
+    async def chunks(*args):
+        for text in ["Use ", "asyncio"]:
+            yield text
+    
+    with patch.object(chain_service.junior, 'astream', side_effect=chunks):
+        events = [event async for event in chain_service.astream_answer("Question")]
+    
+    assert [event["type"] for event in events] == ["start", "delta", "delta", "done"]
+    assert events[-1]["content"] == "Use asyncio"
+    assert events[-1]["used_senior"] is False
+
+def _streaming_client(chunks, delay=0.0, error=None):
+    """Sync provider client whose stream blocks between chunks, like requests' iter_lines"""
+    def generate_content_stream(**request):
+        for text in chunks:
+            time.sleep(delay)
+            yield Mock(text=text)
+        if error is not None:
+            raise error
+    return Mock(models=Mock(generate_content_stream=generate_content_stream))
+
+@pytest.mark.asyncio
+async def test_astream_does_not_block_event_loop():
+    """Testa que o loop continua respondendo enquanto os chunks chegam"""
+    junior = JuniorLLMService(client=_streaming_client(["a", "b", "c", "d"], delay=0.1))
+    ticks = 0
+    
+    async def ticker():
+        nonlocal ticks
+        while True:
+            await asyncio.sleep(0.01)
+            ticks += 1
+    
+    task = asyncio.create_task(ticker())
+    chunks = [text async for text in junior.astream("Question")]
+    task.cancel()
+    
+    assert chunks == ["a", "b", "c", "d"]
+    # About 40 ticks in 0.4 s; a blocked loop would manage only a few
+    assert ticks >= 20
+
+@pytest.mark.asyncio
+async def test_astream_answer_marks_interrupted_stream_incomplete():
+    """Testa que uma falha no meio do streaming não vira uma resposta completa"""
+    client = _streaming_client(["Use "], error=RuntimeError("connection reset"))
+    service = ChainValidatorService(JuniorLLMService(client=client), SeniorLLMService(client=client))
+    
+    events = [event async for event in service.astream_answer("Question")]
+    
+    assert [event["type"] for event in events] == ["start", "delta", "done"]
+    assert events[-1]["content"] == "Use "
+    assert events[-1]["incomplete"] is True
+
+@pytest.mark.asyncio
+async def test_astream_answer_error_before_output_is_incomplete():
+    """Testa que uma falha antes do primeiro chunk é mostrada, mas marcada como incompleta"""
+    client = _streaming_client([], error=RuntimeError("quota exceeded"))
+    client.aio.models.generate_content = AsyncMock(side_effect=RuntimeError("quota exceeded"))
+    service = ChainValidatorService(JuniorLLMService(client=client), SeniorLLMService(client=client))
+    
+    for debug_mode in (False, True):
+        events = [event async for event in service.astream_answer("Question", debug_mode=debug_mode)]
+        
+        assert [event["type"] for event in events] == ["start", "delta", "done"]
+        assert "quota exceeded" in events[-1]["content"]
+        assert events[-1]["incomplete"] is True
+
+@pytest.mark.asyncio
+async def test_llm_service_is_shared_and_reuses_one_connection_pool():
+    """Testa que o serviço e o cliente do provedor são reutilizados entre requisições"""
+    from src.infrastructure.llm.chain_validator_service import get_llm_service
+    from src.infrastructure.llm.client_registry import get_llm_client
+    
+    service = get_llm_service()
+    assert get_llm_service() is service
+    assert service.junior.client is service.senior.client is get_llm_client()
+    
+    client = get_llm_client()
+    response = Mock(status_code=200, headers={}, text='{"candidates": [{"content": {"parts": [{"text": "ok"}]}}]}')
+    # The SDK's own transport opens a new Session per call; it must not be reached
+    with patch('google.genai._api_client.requests.Session', side_effect=AssertionError("per-call session")), \
+         patch.object(client._api_client.session, 'request', return_value=response) as mock_request:
+        assert client.models.generate_content(model="test-model", contents="hi").text == "ok"
+        assert (await client.aio.models.generate_content(model="test-model", contents="hi")).text == "ok"
+    
+    assert mock_request.call_count == 2
@@ -0,0 +1,70 @@
+"""
+Unit tests for the Junior confidence estimator
+
+Tests cover:
+- Log-prob and heuristic base scores
+- Length, truncation and code-block penalties
+- needs_validation against CONFIDENCE_THRESHOLD
+"""
+
+import math
+from types import SimpleNamespace
+from google.genai import types
+from src.config import get_settings
+from src.infrastructure.llm.confidence import estimate_confidence, provider_signals, HEURISTIC_BASE
+from src.infrastructure.llm.junior_llm_service import JuniorLLMService
+
+GOOD_ANSWER = "Use a list comprehension:\n\n```python\nsquares = [n * n for n in range(10)]\n```\n"
+BROKEN_ANSWER = "Use a list comprehension:\n\n```python\nsquares = [n * n for n in range(10)\n```\n"
+
+
+def _response(text, avg_logprobs=None, finish_reason=types.FinishReason.STOP):
+    candidate = SimpleNamespace(avg_logprobs=avg_logprobs, finish_reason=finish_reason)
+    return SimpleNamespace(text=text, candidates=[candidate])
+
+
+class TestEstimateConfidence:
+    """Test confidence scoring"""
+    
+    def test_heuristic_base_without_logprobs(self):
+        assert estimate_confidence(GOOD_ANSWER) == HEURISTIC_BASE
+    
+    def test_logprobs_set_base(self):
+        assert estimate_confidence(GOOD_ANSWER, avg_logprobs=-0.1) == round(100 * math.exp(-0.1))
+        assert estimate_confidence(GOOD_ANSWER, avg_logprobs=-2.0) < estimate_confidence(GOOD_ANSWER, avg_logprobs=-0.1)
+    
+    def test_python_syntax_error_lowers_confidence(self):
+        assert estimate_confidence(BROKEN_ANSWER) < estimate_confidence(GOOD_ANSWER)
+        # Only Python blocks are parsed
+        assert estimate_confidence(BROKEN_ANSWER.replace("python", "javascript")) == HEURISTIC_BASE
+    
+    def test_short_truncated_and_unclosed_answers_lower_confidence(self):
+        assert estimate_confidence("Yes.") < HEURISTIC_BASE
+        assert estimate_confidence(GOOD_ANSWER, truncated=True) < HEURISTIC_BASE
+        assert estimate_confidence(GOOD_ANSWER.rstrip().rstrip("`")) < HEURISTIC_BASE
+        assert estimate_confidence("") >= 0
+
+
+class TestProviderSignals:
+    """Test reading log-probs and truncation from responses"""
+    
+    def test_reads_candidate(self):
+        assert provider_signals(_response(GOOD_ANSWER, -0.2)) == (-0.2, False)
+        assert provider_signals(_response(GOOD_ANSWER, finish_reason=types.FinishReason.MAX_TOKENS)) == (None, True)
+    
+    def test_missing_candidates(self):
+        assert provider_signals(SimpleNamespace(text=GOOD_ANSWER)) == (None, False)
+
+
+class TestJuniorValidation:
+    """Test that confidence drives Senior validation"""
+    
+    def test_needs_validation_below_threshold(self):
+        junior = JuniorLLMService(client=object())
+        threshold = get_settings().CONFIDENCE_THRESHOLD
+        
+        good = junior._result(_response(GOOD_ANSWER))
+        broken = junior._result(_response(BROKEN_ANSWER))
+        
+        assert good["confidence"] >= threshold and good["needs_validation"] is False
+        assert broken["confidence"] < threshold and broken["needs_validation"] is True
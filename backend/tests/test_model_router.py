@@ -112,6 +112,21 @@ class TestRouting:
         
         assert result["model"] == MODEL_SENIOR
         assert result["reason"] == "forced"
+    
+    @patch('src.infrastructure.orchestrator.model_router.CacheService')
+    def test_route_speculative_near_threshold(self, mock_cache):
+        mock_cache_instance = Mock()
+        mock_cache_instance.get_cached_answer.return_value = None
+        mock_cache.return_value = mock_cache_instance
+        
+        router = ModelRouter(mock_cache_instance)
+        # Complexity 7: one point below COMPLEXITY_HIGH
+        near_q = "Explain architecture scalability performance optimization async concurrent thread"
+        
+        assert router.route(near_q, speculative_margin=1)["speculative"] is True
+        assert router.route(near_q, speculative_margin=None)["speculative"] is False
+        assert router.route("Simple question?", speculative_margin=1)["speculative"] is False
+        assert router.get_metrics()["speculative_used"] == 1
 
 
 class TestFallback:
@@ -8,11 +8,23 @@ Tests cover:
 - Retrieval service
 """
 
+import io
 import pytest
+import threading
+import unicodedata
+import numpy as np
 from unittest.mock import Mock, patch
 from src.infrastructure.rag.document_processor import DocumentProcessor, DocumentChunk
+from src.infrastructure.rag.code_chunker import BraceChunker, PythonChunker
 from src.infrastructure.rag.embeddings_service import EmbeddingsService
 from src.infrastructure.rag.vector_store import VectorStore
+from src.infrastructure.rag.ann_index import IVFIndex
+from src.infrastructure.rag.metadata_index import MetadataIndex
+from src.infrastructure.rag.bm25_index import BM25Index
+from src.infrastructure.rag.embedding_cache import EmbeddingCache
+from src.infrastructure.rag.embedding_batcher import EmbeddingBatcher
+from src.infrastructure.rag.embedding_backends import OnnxBackend
+from src.infrastructure.rag.reranker import CrossEncoderReranker
 from src.infrastructure.rag.retrieval_service import RetrievalService
 
 
@@ -58,6 +70,143 @@ Content 2
         chunks = processor._split_by_size(long_text)
         
         assert all(len(c) <= 150 for c in chunks)  # 100 + overlap
+    
+    def test_streamed_split_matches_in_memory(self):
+        """Test block-by-block reads give the same windows"""
+        processor = DocumentProcessor(chunk_size=100, chunk_overlap=30)
+        text = "".join(f"line {i}\n" for i in range(300))
+        expected = processor._split_by_size(text)
+        
+        processor.READ_BLOCK_SIZE = 7
+        
+        assert list(processor._iter_by_size(io.StringIO(text))) == expected
+    
+    def test_iter_files_is_lazy(self, tmp_path):
+        """Test files are chunked one at a time with inferred languages"""
+        (tmp_path / "app.py").write_text("def foo():\n    return 1\n")
+        (tmp_path / "notes.txt").write_text("plain text")
+        (tmp_path / "main.go").write_text("package main\n")
+        processor = DocumentProcessor()
+        
+        paths = processor.iter_source_files(str(tmp_path))
+        chunks = processor.iter_files(paths)
+        first = next(chunks)
+        
+        assert first.metadata["language"] == "python"
+        assert first.metadata["source"].endswith("app.py")
+        assert [c.metadata["language"] for c in chunks] == ["go"]
+
+
+class TestCodeChunker:
+    """Test parser-based code chunking"""
+    
+    def test_python_spans_follow_definitions(self):
+        """Test decorators, comments and nested defs stay with their function"""
+        code = (
+            "import os\n"
+            "\n"
+            "# Loads config\n"
+            "@cache\n"
+            "def load():\n"
+            "    def inner():\n"
+            "        return 1\n"
+            "    return inner()\n"
+            "\n"
+            "class Small:\n"
+            "    def a(self):\n"
+            "        pass\n"
+        )
+        
+        spans = PythonChunker().chunk(code)
+        
+        assert [(s.kind, s.symbol, s.start_line, s.end_line) for s in spans] == [
+            ("module", "", 1, 1),
+            ("function", "load", 3, 8),
+            ("class", "Small", 10, 12)
+        ]
+        assert spans[1].content.startswith("# Loads config\n@cache")
+    
+    def test_python_large_class_split_into_methods(self):
+        """Test oversized classes become one chunk per method"""
+        methods = "".join(f"    def m{i}(self):\n        return {i}\n\n" for i in range(3))
+        code = "class Big:\n    LIMIT = 3\n\n" + methods
+        
+        spans = PythonChunker(max_chars=40).chunk(code)
+        
+        assert [s.symbol for s in spans] == ["Big", "Big.m0", "Big.m1", "Big.m2"]
+        assert spans[0].content == "class Big:\n    LIMIT = 3"
+        assert spans[1].kind == "method"
+    
+    def test_python_large_function_split_between_statements(self):
+        """Test oversized functions become bounded parts of the same symbol"""
+        body = "".join(f"    total += compute_{i}(\n        value,\n    )\n" for i in range(60))
+        code = f"def handler(value):\n    total = 0\n{body}    return total\n"
+        
+        spans = PythonChunker(max_chars=120).chunk(code)
+        
+        assert len(spans) > 1
+        assert all(len(span.content) <= 120 for span in spans)
+        assert [span.part for span in spans] == list(range(len(spans)))
+        assert {(span.symbol, span.kind) for span in spans} == {("handler", "function")}
+        # Multi-line calls are never cut in half
+        assert all(span.content.count("(") == span.content.count(")") for span in spans)
+        assert "\n".join(span.content for span in spans) == code.rstrip()
+        
+        chunks = DocumentProcessor().process_code(code, "python", "big.py")
+        assert [chunk.metadata["part"] for chunk in chunks] == list(range(len(chunks)))
+    
+    def test_python_syntax_error_falls_back_to_size(self):
+        """Test unparseable code is still chunked"""
+        processor = DocumentProcessor(chunk_size=20, chunk_overlap=0)
+        
+        chunks = processor.process_code("def broken(:\n    pass\n" * 3, "python", "bad.py")
+        
+        assert len(chunks) > 1
+        assert "start_line" not in chunks[0].metadata
+    
+    def test_brace_chunker_ignores_braces_in_strings(self):
+        """Test strings, templates and comments do not shift depth"""
+        code = (
+            "const LIMIT = 5;\n"
+            "// helper }\n"
+            "export function add(a, b) {\n"
+            "  const s = `${a} }`;\n"
+            "  return '}' + s;\n"
+            "}\n"
+            "const mul = (a, b) => {\n"
+            "  return a * b;\n"
+            "};\n"
+        )
+        
+        spans = BraceChunker().chunk(code)
+        
+        assert [(s.kind, s.symbol, s.start_line, s.end_line) for s in spans] == [
+            ("module", "", 1, 1),
+            ("function", "add", 2, 6),
+            ("function", "mul", 7, 9)
+        ]
+    
+    def test_chunk_metadata_has_line_ranges(self):
+        """Test code chunks carry symbol and line range"""
+        chunks = DocumentProcessor().process_code("def foo():\n    return 1\n", "python", "a.py")
+        
+        assert chunks[0].metadata["symbol"] == "foo"
+        assert (chunks[0].metadata["start_line"], chunks[0].metadata["end_line"]) == (1, 2)
+    
+    def test_process_files_matches_serial(self, tmp_path):
+        """Test the process pool yields the same chunks in input order"""
+        paths = []
+        for i in range(3):
+            path = tmp_path / f"m{i}.py"
+            path.write_text(f"def f{i}():\n    return {i}\n")
+            paths.append(str(path))
+        processor = DocumentProcessor()
+        processor.FILES_PER_TASK = 2
+        
+        results = list(processor.process_files(iter(paths), workers=2))
+        
+        assert [path for path, _ in results] == paths
+        assert [chunks[0].metadata["symbol"] for _, chunks in results] == ["f0", "f1", "f2"]
 
 
 class TestEmbeddingsService:
@@ -89,34 +238,731 @@ class TestEmbeddingsService:
         embeddings = service.embed_batch(["text1", "text2"])
         
         assert len(embeddings) == 2
+    
+    @patch('src.infrastructure.rag.embeddings_service.SentenceTransformer')
+    def test_repeated_text_hits_cache(self, mock_model):
+        """Test repeated texts skip the forward pass"""
+        mock_instance = Mock()
+        mock_instance.encode.return_value = [[0.1, 0.2]]
+        mock_model.return_value = mock_instance
+        
+        service = EmbeddingsService()
+        first = service.embed("how to use async?")
+        second = service.embed("  how to use   async? ")
+        
+        assert first == second
+        assert mock_instance.encode.call_count == 1
+        assert service.cache.get_stats()["l1_hits"] == 1
+    
+    @patch('src.infrastructure.rag.embeddings_service.SentenceTransformer')
+    def test_batch_encodes_only_misses(self, mock_model):
+        """Test batch embedding only encodes uncached texts"""
+        mock_instance = Mock()
+        mock_instance.encode.side_effect = lambda texts, **kwargs: [[float(len(t)), 1.0] for t in texts]
+        mock_model.return_value = mock_instance
+        
+        service = EmbeddingsService()
+        service.embed("cached")
+        embeddings = service.embed_batch(["cached", "new", "new"])
+        
+        assert mock_instance.encode.call_args.args[0] == ["new"]
+        assert [e[0] for e in embeddings] == pytest.approx([6.0, 3.0, 3.0])
+    
+    @patch('src.infrastructure.rag.embeddings_service.SentenceTransformer')
+    def test_similarity_uses_cache(self, mock_model):
+        """Test similarity encodes each text once"""
+        mock_instance = Mock()
+        mock_instance.encode.return_value = [[1.0, 0.0], [1.0, 0.0]]
+        mock_model.return_value = mock_instance
+        
+        service = EmbeddingsService()
+        service.similarity("a", "b")
+        score = service.similarity("a", "b")
+        
+        assert score == pytest.approx(1.0)
+        assert mock_instance.encode.call_count == 1
+    
+    def test_custom_backend_gets_own_cache_namespace(self):
+        """Test vectors from other backends never share cache keys"""
+        backend = Mock()
+        backend.name = "onnx-int8"
+        backend.dimension = 2
+        backend.encode.return_value = np.array([[0.5, 0.5]], dtype=np.float32)
+        
+        service = EmbeddingsService(backend=backend)
+        
+        assert service.embed("text") == [0.5, 0.5]
+        assert service.dimension == 2
+        assert service.cache.model_name == "all-MiniLM-L6-v2@onnx-int8"
+
+
+class TestOnnxBackend:
+    """Test ONNX Runtime backend pooling"""
+    
+    def test_mean_pooling_ignores_padding(self):
+        """Test padded tokens do not change the sentence vector"""
+        encodings = [
+            Mock(ids=[1, 2], attention_mask=[1, 1], type_ids=[0, 0]),
+            Mock(ids=[3, 0], attention_mask=[1, 0], type_ids=[0, 0])
+        ]
+        hidden = np.array([
+            [[1.0, 0.0], [0.0, 1.0]],
+            [[3.0, 4.0], [100.0, 100.0]]
+        ], dtype=np.float32)
+        
+        mock_ort = Mock()
+        session = mock_ort.InferenceSession.return_value
+        session.get_inputs.return_value = [Mock(), Mock()]
+        session.get_inputs.return_value[0].name = "input_ids"
+        session.get_inputs.return_value[1].name = "attention_mask"
+        session.run.side_effect = lambda outputs, feeds: [hidden[:len(feeds["input_ids"])]]
+        mock_tokenizers = Mock()
+        mock_tokenizers.Tokenizer.from_file.return_value.encode_batch.side_effect = lambda texts: encodings[:len(texts)]
+        
+        with patch.dict("sys.modules", {"onnxruntime": mock_ort, "tokenizers": mock_tokenizers}):
+            backend = OnnxBackend("/models/minilm")
+        vectors = backend.encode(["a b", "c"])
+        
+        assert backend.dimension == 2
+        assert "token_type_ids" not in session.run.call_args.args[1]
+        assert vectors[0] == pytest.approx([0.7071, 0.7071], abs=1e-4)
+        assert vectors[1] == pytest.approx([0.6, 0.8])
+
+
+class TestEmbeddingCache:
+    """Test two-tier embedding cache"""
+    
+    def test_key_includes_model_name(self):
+        """Test different models never share entries"""
+        assert EmbeddingCache("model-a").key("text") != EmbeddingCache("model-b").key("text")
+    
+    def test_redis_tier_fills_l1(self):
+        """Test L2 hits are promoted to the in-process tier"""
+        vector = np.array([0.5, 0.5], dtype=np.float32)
+        mock_redis = Mock()
+        mock_redis.mget.return_value = [vector.tobytes()]
+        cache = EmbeddingCache("model", redis_client=mock_redis)
+        
+        first = cache.get_many(["text"])
+        second = cache.get_many(["text"])
+        
+        assert first[0].tolist() == second[0].tolist() == [0.5, 0.5]
+        mock_redis.mget.assert_called_once()
+        assert cache.get_stats()["l2_hits"] == 1
+        assert cache.get_stats()["l1_hits"] == 1
+    
+    def test_redis_errors_are_misses(self):
+        """Test a Redis outage degrades to a miss"""
+        mock_redis = Mock()
+        mock_redis.mget.side_effect = ConnectionError("down")
+        cache = EmbeddingCache("model", redis_client=mock_redis)
+        
+        assert cache.get_many(["text"]) == [None]
+        assert cache.get_stats()["misses"] == 1
+
+
+class TestEmbeddingBatcher:
+    """Test micro-batching of concurrent embeddings"""
+    
+    def test_concurrent_requests_share_encode(self):
+        """Test requests queued within the latency window run as one batch"""
+        encode = Mock(side_effect=lambda texts: np.ones((len(texts), 2)) * len(texts))
+        batcher = EmbeddingBatcher(encode, max_batch_size=8, max_latency_ms=200)
+        
+        futures = [batcher.submit(f"text {i}") for i in range(4)]
+        vectors = [future.result(timeout=5) for future in futures]
+        batcher.close()
+        
+        assert encode.call_count == 1
+        assert all(vector.tolist() == [4.0, 4.0] for vector in vectors)
+        assert batcher.get_stats()["avg_batch_size"] == 4
+    
+    def test_max_batch_size_splits(self):
+        """Test batches never exceed max_batch_size"""
+        sizes = []
+        encode = Mock(side_effect=lambda texts: sizes.append(len(texts)) or np.zeros((len(texts), 2)))
+        batcher = EmbeddingBatcher(encode, max_batch_size=2, max_latency_ms=200)
+        
+        batcher.embed(["a", "b", "c", "d", "e"])
+        batcher.close()
+        
+        assert sum(sizes) == 5
+        assert max(sizes) <= 2
+    
+    def test_encode_error_reaches_callers(self):
+        """Test a failed batch fails every caller's future"""
+        batcher = EmbeddingBatcher(Mock(side_effect=RuntimeError("oom")), max_latency_ms=1)
+        
+        with pytest.raises(RuntimeError):
+            batcher.submit("text").result(timeout=5)
+        batcher.close()
 
 
 class TestVectorStore:
     """Test vector storage"""
     
+    @staticmethod
+    def _packed(embedding, metadata="{}", content=b""):
+        return [np.asarray(embedding, dtype=np.float32).tobytes(), metadata, content]
+    
     @patch('src.infrastructure.rag.vector_store.redis.from_url')
     def test_add_document(self, mock_redis):
-        """Test adding document"""
+        """Test adding document stores a hash with a float32 blob"""
         mock_client = Mock()
+        mock_pipe = mock_client.pipeline.return_value
+        mock_pipe.execute.return_value = [0, 3, 1]
         mock_redis.return_value = mock_client
         
         store = VectorStore()
         store.add("doc1", "content", [0.1, 0.2], {"lang": "python"})
         
-        mock_client.set.assert_called_once()
+        mapping = mock_pipe.hset.call_args.kwargs["mapping"]
+        assert mapping["content"] == "content"
+        assert np.frombuffer(mapping["embedding"], dtype=np.float32).tolist() == pytest.approx([0.1, 0.2])
+        mock_client.set.assert_not_called()
     
     @patch('src.infrastructure.rag.vector_store.redis.from_url')
     def test_search_returns_results(self, mock_redis):
         """Test search returns results"""
         mock_client = Mock()
-        mock_client.keys.return_value = [b"doc:1"]
-        mock_client.get.return_value = '{"content": "test", "embedding": [0.1, 0.2], "metadata": {}}'
+        mock_client.get.return_value = b"1"
+        mock_client.scan_iter.return_value = [b"doc:1"]
+        mock_client.pipeline.return_value.execute.side_effect = [
+            [self._packed([0.1, 0.2])],
+            [b"test"]
+        ]
+        mock_redis.return_value = mock_client
+        
+        store = VectorStore()
+        results = store.search([0.1, 0.2], top_k=1)
+        
+        assert len(results) == 1
+        assert results[0]["id"] == "1"
+        assert results[0]["content"] == "test"
+    
+    @patch('src.infrastructure.rag.vector_store.redis.from_url')
+    def test_search_does_not_scan_keyspace(self, mock_redis):
+        """Test repeated searches reuse the in-process index"""
+        mock_client = Mock()
+        mock_client.get.return_value = b"1"
+        mock_client.scan_iter.return_value = [b"doc:1"]
+        mock_client.pipeline.return_value.execute.side_effect = [
+            [self._packed([0.1, 0.2])],
+            [b"test"],
+            [b"test"]
+        ]
+        mock_redis.return_value = mock_client
+        
+        store = VectorStore()
+        store.search([0.1, 0.2], top_k=1)
+        store.search([0.1, 0.2], top_k=1)
+        
+        mock_client.scan_iter.assert_called_once()
+        mock_client.keys.assert_not_called()
+    
+    @patch('src.infrastructure.rag.vector_store.redis.from_url')
+    def test_search_applies_filters(self, mock_redis):
+        """Test metadata filters restrict results"""
+        mock_client = Mock()
+        mock_client.get.return_value = b"1"
+        mock_client.scan_iter.return_value = [b"doc:py", b"doc:js"]
+        mock_client.pipeline.return_value.execute.side_effect = [
+            [
+                self._packed([1.0, 0.0], '{"language": "python"}'),
+                self._packed([1.0, 0.1], '{"language": "javascript"}')
+            ],
+            [b"py"]
+        ]
+        mock_redis.return_value = mock_client
+        
+        store = VectorStore()
+        results = store.search([1.0, 0.1], top_k=2, filter_metadata={"language": "python"})
+        
+        assert [r["content"] for r in results] == ["py"]
+    
+    @patch('src.infrastructure.rag.vector_store.redis.from_url')
+    def test_loads_legacy_json_documents(self, mock_redis):
+        """Test documents stored as JSON strings are still indexed"""
+        import redis
+        
+        legacy = '{"content": "old", "embedding": [0.1, 0.2], "metadata": {}}'
+        mock_client = Mock()
+        mock_client.get.side_effect = lambda key: b"1" if key == VectorStore.GENERATION_KEY else legacy
+        mock_client.scan_iter.return_value = [b"doc:old"]
+        mock_client.pipeline.return_value.execute.side_effect = [
+            [redis.ResponseError("WRONGTYPE")],
+            [redis.ResponseError("WRONGTYPE")]
+        ]
         mock_redis.return_value = mock_client
         
         store = VectorStore()
         results = store.search([0.1, 0.2], top_k=1)
         
-        assert len(results) <= 1
+        assert [r["content"] for r in results] == ["old"]
+    
+    @patch('src.infrastructure.rag.vector_store.redis.from_url')
+    def test_search_many_returns_one_list_per_query(self, mock_redis):
+        """Test batched search fetches shared contents once"""
+        mock_client = Mock()
+        mock_client.get.return_value = b"1"
+        mock_client.scan_iter.return_value = [b"doc:a", b"doc:b"]
+        mock_pipe = mock_client.pipeline.return_value
+        mock_pipe.execute.side_effect = [
+            [self._packed([1.0, 0.0]), self._packed([0.0, 1.0])],
+            [b"A", b"B"]
+        ]
+        mock_redis.return_value = mock_client
+        
+        store = VectorStore()
+        results = store.search_many([[1.0, 0.0], [0.0, 1.0], [1.0, 0.1]], top_k=1)
+        
+        assert [[r["content"] for r in query] for query in results] == [["A"], ["B"], ["A"]]
+        assert mock_pipe.hget.call_count == 2
+    
+    @patch('src.infrastructure.rag.vector_store.redis.from_url')
+    def test_search_applies_unindexed_filters(self, mock_redis):
+        """Test filters on fields outside the metadata index still apply"""
+        mock_client = Mock()
+        mock_client.get.return_value = b"1"
+        mock_client.scan_iter.return_value = [b"doc:v1", b"doc:v2"]
+        mock_client.pipeline.return_value.execute.side_effect = [
+            [
+                self._packed([1.0, 0.0], '{"framework": "fastapi", "version": "1"}'),
+                self._packed([1.0, 0.1], '{"framework": "fastapi", "version": "2"}')
+            ],
+            [b"v2"]
+        ]
+        mock_redis.return_value = mock_client
+        
+        store = VectorStore()
+        results = store.search([1.0, 0.0], top_k=2, filter_metadata={"framework": "fastapi", "version": "2"})
+        
+        assert [r["content"] for r in results] == ["v2"]
+    
+    @patch('src.infrastructure.rag.vector_store.redis.from_url')
+    def test_delete_removes_from_local_index(self, mock_redis):
+        """Test deleted chunks disappear from search without a reload"""
+        mock_client = Mock()
+        mock_client.get.return_value = b"1"
+        mock_client.scan_iter.return_value = [b"doc:a", b"doc:b"]
+        mock_pipe = mock_client.pipeline.return_value
+        mock_pipe.execute.side_effect = [
+            [self._packed([1.0, 0.0]), self._packed([0.9, 0.1])],
+            [b"A"],
+            [1, 2],
+            [b"B"]
+        ]
+        mock_redis.return_value = mock_client
+        
+        store = VectorStore()
+        assert [r["id"] for r in store.search([1.0, 0.0], top_k=1)] == ["a"]
+        
+        store.delete(["a"])
+        mock_client.get.return_value = b"2"
+        
+        assert [r["id"] for r in store.search([1.0, 0.0], top_k=1)] == ["b"]
+        mock_client.scan_iter.assert_called_once()
+    
+    @patch('src.infrastructure.rag.vector_store.redis.from_url')
+    def test_other_writers_changes_replayed_from_changelog(self, mock_redis):
+        """Test a moved generation re-reads only the changed chunks"""
+        state = {VectorStore.GENERATION_KEY: b"1"}
+        mock_client = Mock()
+        mock_client.get.side_effect = state.get
+        mock_client.scan_iter.return_value = [b"doc:a", b"doc:b"]
+        mock_pipe = mock_client.pipeline.return_value
+        mock_redis.return_value = mock_client
+        
+        store = VectorStore()
+        mock_pipe.execute.side_effect = [[self._packed([1.0, 0.0]), self._packed([0.9, 0.1])], [b"A"]]
+        assert [r["id"] for r in store.search([1.0, 0.0], top_k=1)] == ["a"]
+        
+        # Another replica deleted a and added c
+        state[VectorStore.GENERATION_KEY] = b"3"
+        mock_pipe.execute.side_effect = [
+            [b"3", None, 2, [
+                (b"3-0", {b"op": b"delete", b"ids": b'["a"]'}),
+                (b"2-0", {b"op": b"add", b"ids": b'["c"]'})
+            ]],
+            [self._packed([0.95, 0.05])],
+            [b"C"]
+        ]
+        
+        assert [r["id"] for r in store.search([1.0, 0.0], top_k=1)] == ["c"]
+        assert [c.args[0] for c in mock_pipe.hmget.call_args_list[-1:]] == ["doc:c"]
+        mock_client.scan_iter.assert_called_once()
+    
+    @patch('src.infrastructure.rag.vector_store.redis.from_url')
+    def test_reload_runs_beside_searches(self, mock_redis):
+        """Test a trimmed changelog reloads in the background while searches use the old index"""
+        state = {VectorStore.GENERATION_KEY: b"1"}
+        scanning, release = threading.Event(), threading.Event()
+        
+        def scan_iter(match, count):
+            if mock_client.scan_iter.call_count > 1:
+                scanning.set()
+                release.wait(5)
+            return [b"doc:a"]
+        
+        mock_client = Mock()
+        mock_client.get.side_effect = state.get
+        mock_client.scan_iter.side_effect = scan_iter
+        mock_pipe = mock_client.pipeline.return_value
+        mock_redis.return_value = mock_client
+        
+        store = VectorStore()
+        mock_pipe.execute.side_effect = [[self._packed([1.0, 0.0])], [b"old"]]
+        store.search([1.0, 0.0], top_k=1)
+        
+        # Changelog holds 1 entry but the index is 5 generations behind
+        state[VectorStore.GENERATION_KEY] = b"6"
+        mock_pipe.execute.side_effect = [[b"6", None, 1, []], [b"old"], [self._packed([0.0, 1.0])]]
+        results = store.search([1.0, 0.0], top_k=1)
+        
+        assert scanning.wait(5)
+        assert [r["content"] for r in results] == ["old"]
+        release.set()
+        for thread in threading.enumerate():
+            if thread.name == "vector-reload":
+                thread.join(5)
+        assert store._generation == 6
+        assert store.index.vectors_at(store.index.live_rows()).tolist() == [[0.0, 1.0]]
+    
+    @staticmethod
+    def _snapshot_client(redis_state):
+        mock_client = Mock()
+        mock_client.get.side_effect = redis_state.get
+        mock_client.scan_iter.side_effect = lambda match, count: {
+            "doc:*": [b"doc:a", b"doc:b"] if redis_state.get("docs") else [],
+            "manifest:*": [b"manifest:src"]
+        }[match]
+        return mock_client
+    
+    @patch('src.infrastructure.rag.vector_store.redis.from_url')
+    def test_snapshot_round_trip(self, mock_redis, tmp_path):
+        """Test a saved snapshot is mapped and used without reloading Redis"""
+        state = {VectorStore.GENERATION_KEY: b"4", VectorStore.EPOCH_KEY: b"e1", "docs": True}
+        mock_client = self._snapshot_client(state)
+        mock_client.pipeline.return_value.execute.side_effect = [
+            [
+                self._packed([1.0, 0.0], '{"language": "python"}', b"def load_user"),
+                self._packed([0.0, 1.0], '{"language": "javascript"}', b"function saveUser")
+            ],
+            [b"def load_user", b"function saveUser"],
+            [{b"a", b"b"}],
+            [b"function saveUser"]
+        ]
+        mock_redis.return_value = mock_client
+        
+        manifest = VectorStore().save(str(tmp_path / "snap"))
+        assert manifest["documents"] == 2
+        assert manifest["epoch"] == "e1"
+        
+        store = VectorStore()
+        loaded = store.load(str(tmp_path / "snap"))
+        results = store.search([1.0, 0.0], top_k=1, filter_metadata={"language": "javascript"}, query_text="saveUser")
+        
+        assert loaded["status"] == "in_sync"
+        assert isinstance(store.index._vectors, np.memmap)
+        assert [r["id"] for r in results] == ["b"]
+        # Only save scanned Redis (documents, manifests); load did not
+        assert mock_client.scan_iter.call_count == 2
+    
+    @patch('src.infrastructure.rag.vector_store.redis.from_url')
+    def test_snapshot_restores_flushed_redis(self, mock_redis, tmp_path):
+        """Test loading into an empty Redis writes documents back without embeddings"""
+        state = {VectorStore.GENERATION_KEY: b"4", VectorStore.EPOCH_KEY: b"e1", "docs": True}
+        mock_client = self._snapshot_client(state)
+        mock_pipe = mock_client.pipeline.return_value
+        mock_pipe.execute.side_effect = [
+            [self._packed([1.0, 0.0], "{}", b"A"), self._packed([0.0, 1.0], "{}", b"B")],
+            [b"A", b"B"],
+            [{b"a", b"b"}]
+        ]
+        mock_redis.return_value = mock_client
+        VectorStore().save(str(tmp_path / "snap"))
+        
+        state.clear()  # FLUSHALL
+        mock_pipe.execute.side_effect = None
+        loaded = VectorStore().load(str(tmp_path / "snap"))
+        
+        assert loaded["status"] == "restored"
+        restored = {c.args[0]: c.kwargs["mapping"]["content"] for c in mock_pipe.hset.call_args_list}
+        assert restored == {"doc:a": b"A", "doc:b": b"B"}
+        mock_pipe.sadd.assert_called_once_with("manifest:src", "a", "b")
+        mock_pipe.set.assert_any_call(VectorStore.GENERATION_KEY, 4)
+
+
+class TestHybridSearch:
+    """Test BM25 + vector fusion in VectorStore"""
+    
+    @patch('src.infrastructure.rag.vector_store.redis.from_url')
+    def test_exact_identifier_recalled_by_lexical_ranking(self, mock_redis):
+        """Test a chunk far in vector space is still returned for its identifier"""
+        mock_client = Mock()
+        mock_client.get.return_value = b"1"
+        mock_client.scan_iter.return_value = [b"doc:near", b"doc:far"]
+        mock_client.pipeline.return_value.execute.side_effect = [
+            [
+                TestVectorStore._packed([1.0, 0.0], content=b"generic error handling"),
+                TestVectorStore._packed([0.0, 1.0], content=b"raise E1101 when config is missing")
+            ],
+            [b"raise E1101 when config is missing", b"generic error handling"]
+        ]
+        mock_redis.return_value = mock_client
+        
+        store = VectorStore()
+        results = store.search([1.0, 0.0], top_k=2, query_text="E1101")
+        
+        assert results[0]["id"] == "far"
+        assert {r["id"] for r in results} == {"near", "far"}
+    
+    def test_fuse_rewards_agreement(self):
+        """Test rows ranked by both lists beat rows ranked by one"""
+        store = VectorStore.__new__(VectorStore)
+        
+        rows, scores = store._fuse([np.array([1, 2, 3]), np.array([3, 4])], top_k=2)
+        
+        assert rows.tolist() == [3, 1]
+        assert scores[0] == pytest.approx(1 / 63 + 1 / 61)
+
+
+class TestBM25Index:
+    """Test lexical index"""
+    
+    def test_tokenize_splits_compound_identifiers(self):
+        """Test identifiers match whole and by their parts"""
+        tokens = BM25Index.tokenize("getUserById ERR_CONN_REFUSED Error")
+        
+        assert "getuserbyid" in tokens and "user" in tokens
+        assert "err_conn_refused" in tokens and "refused" in tokens
+        assert tokens.count("error") == 1
+    
+    def test_tokenize_keeps_accented_words(self):
+        """Test non-ASCII letters stay inside words and identifiers"""
+        tokens = BM25Index.tokenize("A função calcularSaída lê o ÍNDICE_ÚNICO")
+        
+        assert "função" in tokens and "fun" not in tokens
+        assert "calcularsaída" in tokens and "saída" in tokens
+        assert "índice_único" in tokens and "único" in tokens
+        # Decomposed accents (NFD) match the composed form
+        assert BM25Index.tokenize(unicodedata.normalize("NFD", "função")) == ["função"]
+    
+    def test_rare_identifier_ranks_first(self):
+        """Test an exact error code beats documents with common words"""
+        index = BM25Index()
+        index.add_batch([0, 1, 2], [
+            "connection handling for the database client",
+            "raise ConnectionError('ERR_CONN_REFUSED') when the database is down",
+            "database connection pool settings"
+        ])
+        
+        rows, scores = index.search("ERR_CONN_REFUSED database", top_k=3)
+        
+        assert rows[0] == 1
+        assert list(scores) == sorted(scores, reverse=True)
+    
+    def test_removed_and_filtered_rows_excluded(self):
+        """Test removed rows and rows outside the filter never match"""
+        index = BM25Index()
+        index.add_batch([0, 1, 2], ["async def a", "async def b", "async def c"])
+        index.remove(0)
+        
+        rows, _ = index.search("async", top_k=3, rows=np.array([0, 2]))
+        
+        assert rows.tolist() == [2]
+        assert len(index) == 2
+    
+    def test_export_round_trip_renumbers_rows(self):
+        """Test exported postings search like the original, compacted"""
+        index = BM25Index()
+        index.add_batch([0, 1, 2, 3], ["getUserById", "async def get", "removed get", "class User"])
+        index.remove(2)
+        
+        restored = BM25Index.from_arrays(*index.export(np.array([0, 1, 3])))
+        restored.add_batch([3], ["get get get"])
+        
+        assert len(restored) == 4
+        assert set(restored.search("user", top_k=5)[0].tolist()) == {0, 2}
+        assert set(restored.search("get", top_k=5)[0].tolist()) == {0, 1, 3}
+
+
+class TestCrossEncoderReranker:
+    """Test cross-encoder re-ranking"""
+    
+    @staticmethod
+    def _results():
+        return [
+            {"id": "a", "content": "class Foo", "metadata": {}, "score": 0.9},
+            {"id": "b", "content": "async def fetch", "metadata": {}, "score": 0.8}
+        ]
+    
+    def test_rerank_scores_in_one_batch_and_caches(self):
+        """Test pairs are scored together and reused by (query, chunk)"""
+        model = Mock()
+        model.predict.return_value = np.array([0.1, 2.5])
+        reranker = CrossEncoderReranker(model=model)
+        
+        first = reranker.rerank("async fetch", self._results())
+        second = reranker.rerank("async fetch", self._results())
+        
+        model.predict.assert_called_once()
+        assert model.predict.call_args[0][0] == [("async fetch", "class Foo"), ("async fetch", "async def fetch")]
+        assert [r["id"] for r in first] == ["b", "a"]
+        assert [r["id"] for r in second] == ["b", "a"]
+        assert first[0]["rerank_score"] == pytest.approx(2.5)
+    
+    def test_over_budget_keeps_order_and_fills_cache(self):
+        """Test a slow model falls back to retrieval order"""
+        release = threading.Event()
+        model = Mock()
+        model.predict.side_effect = lambda pairs, **kwargs: release.wait(5) and np.array([0.1, 2.5])
+        reranker = CrossEncoderReranker(model=model, budget_ms=10)
+        
+        results = reranker.rerank("async fetch", self._results())
+        assert [r["id"] for r in results] == ["a", "b"]
+        assert "rerank_score" not in results[0]
+        
+        # The timed-out batch still completes and serves the next request
+        release.set()
+        reranker._executor.submit(lambda: None).result(timeout=5)
+        results = reranker.rerank("async fetch", self._results(), budget_ms=0)
+        assert [r["id"] for r in results] == ["b", "a"]
+        assert model.predict.call_count == 1
+    
+    def test_model_error_keeps_order(self):
+        """Test scoring failures never fail retrieval"""
+        model = Mock()
+        model.predict.side_effect = RuntimeError("out of memory")
+        reranker = CrossEncoderReranker(model=model)
+        
+        assert [r["id"] for r in reranker.rerank("q", self._results())] == ["a", "b"]
+
+
+class TestMetadataIndex:
+    """Test inverted metadata index"""
+    
+    def test_candidates_intersect_fields(self):
+        """Test candidates match every indexed filter"""
+        index = MetadataIndex()
+        index.add_batch([0, 1, 2], [
+            {"language": "python", "type": "code"},
+            {"language": "python", "type": "documentation"},
+            {"language": "go", "type": "code"}
+        ])
+        
+        rows = index.candidates({"language": "python", "type": "code"})
+        
+        assert rows.tolist() == [0]
+    
+    def test_candidates_unknown_value_is_empty(self):
+        """Test unseen values produce an empty partition"""
+        index = MetadataIndex()
+        index.add(0, {"language": "python"})
+        
+        assert index.candidates({"language": "rust"}).tolist() == []
+    
+    def test_candidates_none_when_no_indexed_field(self):
+        """Test unindexed filters leave candidate selection to the caller"""
+        index = MetadataIndex()
+        index.add(0, {"language": "python"})
+        
+        assert index.candidates({"version": "1.0"}) is None
+
+
+class TestIVFIndex:
+    """Test in-process ANN index"""
+    
+    def test_exact_search_below_threshold(self):
+        """Test small indexes return exact neighbours"""
+        index = IVFIndex()
+        index.add("a", [1.0, 0.0])
+        index.add("b", [0.0, 1.0])
+        
+        rows, scores = index.search([0.9, 0.1], top_k=1)
+        
+        assert index.key_at(rows[0]) == "a"
+        assert scores[0] == pytest.approx(0.9939, abs=1e-3)
+    
+    def test_replace_and_remove(self):
+        """Test re-adding a key replaces its vector"""
+        index = IVFIndex()
+        index.add("a", [1.0, 0.0])
+        index.add("a", [0.0, 1.0])
+        
+        rows, _ = index.search([0.0, 1.0], top_k=5)
+        
+        assert len(index) == 1
+        assert [index.key_at(r) for r in rows] == ["a"]
+        
+        index.remove("a")
+        rows, _ = index.search([0.0, 1.0], top_k=5)
+        assert len(rows) == 0
+    
+    def test_trained_index_recall(self):
+        """Test IVF search finds the true neighbour on clustered data"""
+        rng = np.random.default_rng(0)
+        centers = rng.normal(size=(16, 32))
+        vectors = centers[rng.integers(0, 16, size=2000)] + 0.05 * rng.normal(size=(2000, 32))
+        
+        index = IVFIndex(nprobe=4, train_threshold=1000)
+        index.add_batch([str(i) for i in range(2000)], vectors)
+        
+        rows, _ = index.search(vectors[7], top_k=1)
+        
+        assert index.is_trained
+        assert index.key_at(rows[0]) == "7"
+    
+    def test_search_batch_matches_single_search(self):
+        """Test batched search returns the same neighbours as single search"""
+        rng = np.random.default_rng(1)
+        centers = rng.normal(size=(16, 32))
+        vectors = centers[rng.integers(0, 16, size=2000)] + 0.05 * rng.normal(size=(2000, 32))
+        queries = vectors[:20] + 0.01 * rng.normal(size=(20, 32))
+        
+        for threshold in (100000, 1000):
+            index = IVFIndex(nprobe=4, train_threshold=threshold)
+            index.add_batch([str(i) for i in range(2000)], vectors)
+            
+            batch = index.search_batch(queries, top_k=3)
+            
+            for q, (rows, _) in zip(queries, batch):
+                single_rows, _ = index.search(q, top_k=3)
+                assert rows.tolist() == single_rows.tolist()
+    
+    def test_mask_restricts_candidates(self):
+        """Test mask limits search to allowed rows"""
+        index = IVFIndex()
+        index.add_batch(["a", "b"], np.array([[1.0, 0.0], [0.9, 0.1]]))
+        
+        rows, _ = index.search([1.0, 0.0], top_k=2, mask=np.array([False, True]))
+        
+        assert [index.key_at(r) for r in rows] == ["b"]
+    
+    def test_from_arrays_keeps_trained_lists(self):
+        """Test an index rebuilt from its arrays searches identically"""
+        rng = np.random.default_rng(2)
+        vectors = rng.normal(size=(1500, 16)).astype(np.float32)
+        index = IVFIndex(nprobe=2, train_threshold=1000)
+        index.add_batch([str(i) for i in range(1500)], vectors)
+        index.remove("3")
+        index.train()
+        
+        rows = index.live_rows()
+        copy = IVFIndex.from_arrays(
+            [index.key_at(row) for row in rows.tolist()],
+            index.vectors_at(rows),
+            index.centroids,
+            index.assignments_at(rows),
+            nprobe=2,
+            train_threshold=1000
+        )
+        
+        for query in vectors[:10]:
+            expected = [index.key_at(r) for r in index.search(query, top_k=3)[0]]
+            assert [copy.key_at(r) for r in copy.search(query, top_k=3)[0]] == expected
+        copy.add("new", vectors[0])
+        assert copy.key_at(copy.search(vectors[0], top_k=1)[0][0]) in ("0", "new")
 
 
 class TestRetrievalService:
@@ -139,12 +985,71 @@ class TestRetrievalService:
         mock_embeddings.return_value = mock_emb_instance
         
         mock_store_instance = Mock()
+        mock_store_instance.get_manifest.return_value = set()
         mock_store.return_value = mock_store_instance
         
         service = RetrievalService()
         service.index_code("def foo(): pass", "python", "test.py")
         
-        mock_store_instance.add.assert_called_once()
+        mock_store_instance.add_many.assert_called_once()
+    
+    def _incremental_service(self, indexed_contents, source="app.py"):
+        service = RetrievalService()
+        service.processor = DocumentProcessor()
+        service.embeddings = Mock()
+        service.embeddings.embed_batch.side_effect = lambda texts: [[0.1, 0.2] for _ in texts]
+        service.vector_store = Mock()
+        service.vector_store.get_manifest.return_value = {
+            RetrievalService._chunk_id(source, content) for content in indexed_contents
+        }
+        return service
+    
+    def test_reindex_embeds_only_changed_chunks(self):
+        """Test unchanged chunks are skipped and orphans deleted"""
+        service = self._incremental_service([
+            "def foo():\n    return 1",
+            "def old():\n    return 0"
+        ])
+        code = "def foo():\n    return 1\n\ndef bar():\n    return 2\n"
+        
+        stats = service.index_code(code, "python", "app.py")
+        
+        assert stats == {"added": 1, "unchanged": 1, "removed": 1}
+        service.embeddings.embed_batch.assert_called_once_with(["def bar():\n    return 2"])
+        service.vector_store.delete.assert_called_once_with(
+            [RetrievalService._chunk_id("app.py", "def old():\n    return 0")]
+        )
+        manifest = service.vector_store.set_manifest.call_args.args[1]
+        assert len(manifest) == 2
+    
+    def test_index_files_batches_across_sources(self, tmp_path):
+        """Test streamed indexing embeds fixed-size batches spanning files"""
+        for name in ("a.py", "b.py", "c.py"):
+            (tmp_path / name).write_text(f"def {name[0]}1():\n    return 1\n\ndef {name[0]}2():\n    return 2\n")
+        stale = str(tmp_path / "gone.py")
+        (tmp_path / "gone.py").write_text("")
+        service = self._incremental_service([])
+        service.vector_store.get_manifest.side_effect = lambda source: {"old"} if source == stale else set()
+        service.INDEX_BATCH_SIZE = 4
+        
+        stats = service.index_files(sorted(str(p) for p in tmp_path.iterdir()))
+        
+        batch_sizes = [len(c.args[0]) for c in service.embeddings.embed_batch.call_args_list]
+        assert batch_sizes == [4, 2]
+        assert stats == {"added": 6, "unchanged": 0, "removed": 1, "sources": 4}
+        service.vector_store.delete.assert_called_once_with(["old"])
+        assert service.vector_store.set_manifest.call_count == 4
+    
+    def test_reindex_unchanged_source_embeds_nothing(self):
+        """Test re-indexing identical code is a no-op for embeddings"""
+        code = "def foo():\n    return 1\n"
+        service = self._incremental_service(["def foo():\n    return 1"])
+        
+        stats = service.index_code(code, "python", "app.py")
+        
+        assert stats["added"] == 0
+        service.embeddings.embed_batch.assert_not_called()
+        service.vector_store.add_many.assert_not_called()
     
     @patch('src.infrastructure.rag.retrieval_service.EmbeddingsService')
     @patch('src.infrastructure.rag.retrieval_service.VectorStore')
@@ -165,6 +1070,60 @@ class TestRetrievalService:
         
         assert len(results) >= 0
     
+    def test_retrieve_many_embeds_once(self):
+        """Test batch retrieval uses one embed_batch and one search_many"""
+        service = RetrievalService()
+        service.embeddings = Mock()
+        service.embeddings.embed_batch.return_value = [[0.1, 0.2], [0.3, 0.4]]
+        service.vector_store = Mock()
+        service.vector_store.search_many.return_value = [
+            [{"content": "async def", "metadata": {}, "score": 0.5}],
+            [{"content": "class Foo", "metadata": {}, "score": 0.7}]
+        ]
+        
+        results = service.retrieve_many(["async", "class"], top_k=1, filters={"language": "python"})
+        
+        service.embeddings.embed_batch.assert_called_once_with(["async", "class"])
+        service.vector_store.search_many.assert_called_once_with(
+            [[0.1, 0.2], [0.3, 0.4]], top_k=1, filter_metadata={"language": "python"}, query_texts=["async", "class"]
+        )
+        assert [r[0]["content"] for r in results] == ["async def", "class Foo"]
+    
+    def test_retrieve_many_vector_only_reranks(self):
+        """Test RAG_HYBRID_SEARCH=false keeps the keyword re-rank path"""
+        service = RetrievalService()
+        service.hybrid = False
+        service.embeddings = Mock()
+        service.embeddings.embed_batch.return_value = [[0.1, 0.2]]
+        service.vector_store = Mock()
+        service.vector_store.search_many.return_value = [[
+            {"content": "class Foo", "metadata": {}, "score": 0.6},
+            {"content": "async def", "metadata": {}, "score": 0.58}
+        ]]
+        
+        results = service.retrieve_many(["async"], top_k=1)
+        
+        service.vector_store.search_many.assert_called_once_with([[0.1, 0.2]], top_k=2, filter_metadata=None)
+        assert results[0][0]["content"] == "async def"
+    
+    def test_retrieve_reranks_wider_candidate_set(self):
+        """Test the cross-encoder picks top_k out of RAG_RERANKER_CANDIDATES"""
+        reranker = Mock()
+        reranker.rerank.side_effect = lambda query, results: results[::-1]
+        service = RetrievalService(reranker=reranker)
+        service.embeddings = Mock()
+        service.embeddings.embed.return_value = [0.1, 0.2]
+        service.vector_store = Mock()
+        service.vector_store.search.return_value = [
+            {"id": str(i), "content": f"chunk {i}", "metadata": {}, "score": 1 - i / 10}
+            for i in range(5)
+        ]
+        
+        results = service.retrieve("query", top_k=2)
+        
+        assert service.vector_store.search.call_args.kwargs["top_k"] == 20
+        assert [r["id"] for r in results] == ["4", "3"]
+    
     @patch('src.infrastructure.rag.retrieval_service.EmbeddingsService')
     @patch('src.infrastructure.rag.retrieval_service.VectorStore')
     def test_build_context(self, mock_store, mock_embeddings):
@@ -180,6 +1139,73 @@ class TestRetrievalService:
         mock_store.return_value = mock_store_instance
         
         service = RetrievalService()
+        service.wait_until_ready(timeout=5)
         context = service.build_context("test query")
         
-        assert "RELEVANT DOCUMENTATION" in context or context == ""
+        assert "RELEVANT DOCUMENTATION" in context
+    
+    def test_build_context_cached_until_generation_moves(self):
+        """Test repeated questions skip retrieval until the index changes"""
+        service = RetrievalService()
+        service.embeddings = Mock()
+        service.embeddings.embed.return_value = [0.1, 0.2]
+        service.vector_store = Mock()
+        service.vector_store.generation.return_value = 7
+        service.vector_store.search.return_value = [
+            {"id": "a", "content": "test content", "metadata": {"source": "test.py"}, "score": 0.9}
+        ]
+        service.wait_until_ready(timeout=5)
+        
+        first = service.build_context(" how do i  test?", language="python")
+        second = service.build_context("how do i test?", language="python")
+        assert first == second
+        assert "test content" in first
+        service.vector_store.search.assert_called_once()
+        assert service.vector_store.search.call_args[1]["query_text"] == "how do i test?"
+        
+        service.build_context("how do i test?", language="javascript")
+        assert service.vector_store.search.call_count == 2
+        
+        # BM25 tokenizes "getUser" and "getuser" differently
+        service.build_context("call getUser", language="python")
+        service.build_context("call getuser", language="python")
+        assert service.vector_store.search.call_count == 4
+        
+        service.vector_store.generation.return_value = 8
+        service.build_context("how do i test?", language="python")
+        assert service.vector_store.search.call_count == 5
+    
+    def test_build_context_empty_while_loading(self):
+        """Test requests never block on the model load"""
+        release = threading.Event()
+        
+        def slow_model():
+            release.wait(5)
+            return Mock()
+        
+        service = RetrievalService(vector_store=Mock(), processor=Mock(), enabled=True)
+        with patch('src.infrastructure.rag.retrieval_service.EmbeddingsService', side_effect=slow_model):
+            assert service.build_context("test query") == ""
+            assert service.status == "loading"
+            release.set()
+            service.wait_until_ready(timeout=5)
+        
+        assert service.status == "ready"
+    
+    def test_load_failure_reported(self):
+        """Test a failed load surfaces instead of hanging callers"""
+        service = RetrievalService(vector_store=Mock(), processor=Mock(), enabled=True)
+        with patch('src.infrastructure.rag.retrieval_service.EmbeddingsService', side_effect=ImportError("no torch")):
+            with pytest.raises(RuntimeError, match="no torch"):
+                service.wait_until_ready(timeout=5)
+        
+        assert service.status == "failed"
+        assert service.build_context("test query") == ""
+    
+    def test_disabled_never_loads(self):
+        """Test RAG_ENABLED=false keeps the service inert"""
+        service = RetrievalService(enabled=False)
+        
+        assert service.build_context("test query") == ""
+        assert service.warm_up() is None
+        assert service.status == "disabled"